@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+כתיבה בטוחה לקבצים: קריסה או Ctrl-C באמצע כתיבה לא משאירים קובץ קטוע.
+
+atomic_open כותב לקובץ זמני באותה תיקייה, מבצע fsync ומחליף את הקובץ המקורי ב-os.replace,
+כך שהקובץ על הדיסק הוא תמיד הגרסה הישנה המלאה או החדשה המלאה.
+append_lines מוסיף שורות לקובץ יומן (append-only) ומבצע fsync לפני החזרה.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+def fsync_directory(directory):
+    """מוודא שפעולת שינוי השם נשמרה בתיקייה (לא נתמך בכל מערכות ההפעלה)."""
+    try:
+        fd = os.open(directory or '.', os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def atomic_open(path, mode='w', encoding='utf-8', durable=True):
+    """
+    פותח קובץ זמני לכתיבה במקום path. ביציאה תקינה הקובץ מחליף את path באופן אטומי;
+    אם נזרקה שגיאה, הקובץ הזמני נמחק ו-path נשאר ללא שינוי.
+    :param mode: 'w' לטקסט או 'wb' לבינארי.
+    :param durable: האם לבצע fsync (לנתונים); קבצים שאפשר להפיק מחדש (דוחות) יכולים לוותר עליו.
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory or '.', prefix=f".{os.path.basename(path)}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=None if 'b' in mode else encoding) as f:
+            # mkstemp creates the file as 0600; keep the permissions of the file being replaced
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o777 if os.path.exists(path) else 0o644)
+            yield f
+            if durable:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    if durable:
+        fsync_directory(directory)
+
+
+def append_lines(path, lines, encoding='utf-8'):
+    """מוסיף שורות לסוף הקובץ (ויוצר אותו אם צריך) ומבצע fsync."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, 'a', encoding=encoding) as f:
+        for line in lines:
+            f.write(line + '\n')
+        f.flush()
+        os.fsync(f.fileno())
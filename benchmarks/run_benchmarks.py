@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מדידת ביצועים לכל שלבי הצינור על היסטוריות סינתטיות.
+
+לכל תרחיש (מספר רשומות × מספר סימבולים) נוצרת מטריצת מחירים סינתטית שמוגשת דרך StubProvider,
+וכל שלב נמדד בנפרד: זמן (הטוב מבין --repeat הרצות) ושיא זיכרון (tracemalloc, בהרצה נפרדת).
+התוצאות נכתבות לקובץ JSON כדי להשוות לפני ואחרי כל אופטימיזציה.
+
+הרצה מתיקיית הפרויקט:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --records 1000 10000 100000 --symbols 10 100 1000 5000
+    python benchmarks/run_benchmarks.py --stages calculate_performance_frame generate_graphs_report
+"""
+
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import contextlib
+import subprocess
+import tracemalloc
+from datetime import datetime
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import numpy as np
+import pandas as pd
+
+import config
+from price_cache import PriceCache
+from price_providers import StubProvider, set_price_provider
+from performance_engine import calculate_performance_frame, build_history_records
+from history_store import JsonHistoryStore, ColumnarHistoryStore
+from report_generator import ReportGenerator
+
+RESULTS_DIR = os.path.join(ROOT_DIR, "benchmarks", "results")
+
+DEFAULT_RECORDS = [1000, 10000]
+DEFAULT_SYMBOLS = [10]
+# מדדי הייחוס נשארים הסימבולים האמיתיים, כי הדוחות מציגים אותם בשמם
+BENCHMARKS = ["SPY", "QQQ", "TQQQ"]
+
+# תרחיש גדול מזה (רשומות × סימבולים) מדולג - מטריצה של 5e7 תאים היא כבר 400MB
+DEFAULT_MAX_CELLS = 5 * 10**7
+# שלבים איטיים במיוחד (כתיבה תא-תא או דרך SQLite) מקבלים תקרה נמוכה יותר
+SLOW_STAGE_MAX_CELLS = {
+    'provider_fetch_with_cache': 2 * 10**6,
+    'history_persist_columnar': 2 * 10**5,
+    'main_daily_run': 5 * 10**6,
+}
+
+
+class Scenario:
+    """נתונים סינתטיים לתרחיש אחד: מחירים, ביצועים ורשומות היסטוריה."""
+
+    def __init__(self, records, symbols, work_dir, seed=0):
+        self.records = records
+        self.stocks = [f"S{i:04d}" for i in range(symbols)]
+        self.benchmarks = list(BENCHMARKS)
+        self.symbols = self.stocks + self.benchmarks
+        self.work_dir = work_dir
+        self._counter = 0
+
+        # ימים קלנדריים ולא ימי מסחר, כדי ש-100k רשומות ייכנסו לטווח התאריכים של pandas
+        dates = pd.date_range(end=pd.Timestamp.now().normalize(), periods=records, freq='D')
+        rng = np.random.default_rng(seed)
+        returns = rng.normal(0.0005, 0.02, size=(records, len(self.symbols)))
+        start_prices = rng.uniform(20, 800, size=len(self.symbols))
+        self.closes = pd.DataFrame(start_prices * np.exp(np.cumsum(returns, axis=0)),
+                                   index=dates, columns=self.symbols)
+        self.provider = StubProvider(self.closes)
+        self.base_date = dates[0].strftime('%Y-%m-%d')
+        self.start_date = self.base_date
+        self.end_date = (dates[-1] + pd.Timedelta(days=1)).strftime('%Y-%m-%d')
+        self.base_prices = self.closes.iloc[0].to_dict()
+        self.performance = self.calculate_frame()
+        self.history = build_history_records(self.performance, self.base_date)
+        self.current = self.history[-1]
+
+    def fresh_path(self, name):
+        """נתיב חדש בתיקיית העבודה (שלבים שכותבים לדיסק צריכים יעד נקי בכל הרצה)."""
+        self._counter += 1
+        return os.path.join(self.work_dir, f"{name}-{self._counter}")
+
+    def calculate_frame(self):
+        return calculate_performance_frame(
+            self.closes, self.base_prices, config.INVESTMENT_PER_STOCK, self.stocks, self.benchmarks
+        )
+
+
+# --- שלבים ---
+
+def stage_provider_fetch(scenario):
+    from main import fetch_price_matrix_from_yahoo
+    cache = PriceCache(scenario.fresh_path("price_cache") + ".sqlite")
+    try:
+        return fetch_price_matrix_from_yahoo(
+            scenario.symbols, scenario.start_date, scenario.end_date, cache=cache, provider=scenario.provider
+        )
+    finally:
+        cache.close()
+
+def stage_calculate_performance_frame(scenario):
+    return scenario.calculate_frame()
+
+def stage_calculate_performance(scenario):
+    from main import calculate_performance
+    current_prices = scenario.closes.iloc[-1].to_dict()
+    return calculate_performance(
+        scenario.base_prices, current_prices, config.INVESTMENT_PER_STOCK, scenario.stocks, scenario.benchmarks
+    )
+
+def stage_build_history_records(scenario):
+    return build_history_records(scenario.performance, scenario.base_date)
+
+def stage_history_persist_json(scenario):
+    store = JsonHistoryStore(scenario.fresh_path("history") + ".json")
+    for record in scenario.history:
+        store.upsert(record)
+    store.compact()
+    return store.path
+
+def prepare_history_json(scenario):
+    if not getattr(scenario, 'json_history_path', None):
+        scenario.json_history_path = stage_history_persist_json(scenario)
+
+def stage_history_load_json(scenario):
+    prepare_history_json(scenario)
+    return JsonHistoryStore(scenario.json_history_path).records()
+
+def stage_history_persist_columnar(scenario):
+    store = ColumnarHistoryStore(scenario.fresh_path("history_columnar"))
+    for record in scenario.history:
+        store.upsert(record)
+    return store.directory
+
+def prepare_history_columnar(scenario):
+    if not getattr(scenario, 'columnar_history_dir', None):
+        scenario.columnar_history_dir = stage_history_persist_columnar(scenario)
+
+def stage_history_load_columnar(scenario):
+    prepare_history_columnar(scenario)
+    return ColumnarHistoryStore(scenario.columnar_history_dir).records()
+
+def stage_generate_main_report(scenario):
+    return ReportGenerator().generate_main_report(scenario.current)
+
+def stage_generate_summary_image_report(scenario):
+    return ReportGenerator().generate_summary_image_report(scenario.current)
+
+def stage_generate_history_report(scenario):
+    return ReportGenerator().generate_history_report(scenario.history)
+
+def stage_generate_graphs_report(scenario):
+    return ReportGenerator().generate_graphs_report(scenario.history)
+
+def stage_render_reports(scenario):
+    return ReportGenerator().render_reports(
+        scenario.current, scenario.history, scenario.fresh_path("reports"), force=True, mode='serial'
+    )
+
+def stage_main_daily_run(scenario):
+    """ריצה יומית מלאה של main() על היסטוריה קיימת, בתיקייה זמנית ועם ספק המחירים הסינתטי."""
+    import main
+    run_dir = scenario.fresh_path("main_run")
+    os.makedirs(run_dir)
+    history_path = os.path.join(run_dir, "history_data.json")
+    store = JsonHistoryStore(history_path)
+    for record in scenario.history[:-1]:
+        store.upsert(record)
+    store.compact()
+
+    overrides = {
+        'AI_STOCKS': scenario.stocks, 'BENCHMARK_SYMBOLS': scenario.benchmarks,
+        'ALL_SYMBOLS': scenario.symbols, 'BASE_DATE': scenario.base_date,
+        'HISTORY_BACKEND': 'json', 'HISTORY_FILE': history_path,
+    }
+    saved = {name: getattr(config, name) for name in overrides}
+    cwd = os.getcwd()
+    try:
+        for name, value in overrides.items():
+            setattr(config, name, value)
+        set_price_provider(scenario.provider)
+        os.chdir(run_dir)
+        main.main(['--no-browser', '--render-mode', 'serial'])
+    finally:
+        os.chdir(cwd)
+        set_price_provider(None)
+        for name, value in saved.items():
+            setattr(config, name, value)
+    return run_dir
+
+
+STAGES = {
+    'provider_fetch_with_cache': stage_provider_fetch,
+    'calculate_performance_frame': stage_calculate_performance_frame,
+    'calculate_performance': stage_calculate_performance,
+    'build_history_records': stage_build_history_records,
+    'history_persist_json': stage_history_persist_json,
+    'history_load_json': stage_history_load_json,
+    'history_persist_columnar': stage_history_persist_columnar,
+    'history_load_columnar': stage_history_load_columnar,
+    'generate_main_report': stage_generate_main_report,
+    'generate_summary_image_report': stage_generate_summary_image_report,
+    'generate_history_report': stage_generate_history_report,
+    'generate_graphs_report': stage_generate_graphs_report,
+    'render_reports': stage_render_reports,
+    'main_daily_run': stage_main_daily_run,
+}
+
+# הכנה שאינה חלק מהשלב הנמדד (למשל כתיבת ההיסטוריה שהשלב טוען)
+STAGE_SETUP = {
+    'history_load_json': prepare_history_json,
+    'history_load_columnar': prepare_history_columnar,
+}
+
+
+def measure(func, scenario, repeat):
+    """
+    :return: מילון עם זמן מינימלי/ממוצע (שניות) ושיא זיכרון (בתים) של func(scenario).
+    הודעות הסטטוס שהשלבים מדפיסים מושתקות.
+    """
+    times = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(repeat):
+            gc.collect()
+            start = time.perf_counter()
+            func(scenario)
+            times.append(time.perf_counter() - start)
+        # Peak memory is measured in a separate run, so tracemalloc overhead does not skew the timings
+        gc.collect()
+        tracemalloc.start()
+        try:
+            func(scenario)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return {
+        'seconds': min(times),
+        'mean_seconds': sum(times) / len(times),
+        'peak_memory_bytes': peak,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmarks(records_list, symbols_list, stages, repeat=3, max_cells=DEFAULT_MAX_CELLS):
+    results = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'git_revision': git_revision(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': repeat,
+        'scenarios': [],
+    }
+    for records in records_list:
+        for symbols in symbols_list:
+            scenario_result = {'records': records, 'symbols': symbols, 'stages': {}, 'skipped': {}}
+            results['scenarios'].append(scenario_result)
+            cells = records * (symbols + len(BENCHMARKS))
+            if cells > max_cells:
+                scenario_result['skipped']['*'] = f"{cells} cells > max_cells {max_cells}"
+                print(f"⏭️ {records} רשומות × {symbols} סימבולים: דולג ({cells} תאים).")
+                continue
+
+            work_dir = tempfile.mkdtemp(prefix="portfolio-bench-")
+            try:
+                print(f"🧪 {records} רשומות × {symbols} סימבולים: יוצר נתונים סינתטיים...")
+                with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                    scenario = Scenario(records, symbols, work_dir)
+                for name in stages:
+                    limit = SLOW_STAGE_MAX_CELLS.get(name)
+                    if limit is not None and cells > limit:
+                        scenario_result['skipped'][name] = f"{cells} cells > {limit}"
+                        continue
+                    setup = STAGE_SETUP.get(name)
+                    if setup is not None:
+                        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+                            setup(scenario)
+                    measurement = measure(STAGES[name], scenario, repeat)
+                    scenario_result['stages'][name] = measurement
+                    print(f"   {name:<32} {measurement['seconds'] * 1000:>10.1f} ms"
+                          f" {measurement['peak_memory_bytes'] / 2**20:>10.1f} MiB")
+            finally:
+                shutil.rmtree(work_dir, ignore_errors=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="מדידת ביצועי הצינור על היסטוריות סינתטיות")
+    parser.add_argument('--records', type=int, nargs='+', default=DEFAULT_RECORDS,
+                        help="מספרי רשומות (ימים) להיסטוריה הסינתטית")
+    parser.add_argument('--symbols', type=int, nargs='+', default=DEFAULT_SYMBOLS,
+                        help="מספרי מניות בתיק (בנוסף למדדי הייחוס)")
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(STAGES),
+                        help="השלבים למדידה (ברירת מחדל: כולם)")
+    parser.add_argument('--repeat', type=int, default=3, help="מספר הרצות מדידת זמן לכל שלב")
+    parser.add_argument('--max-cells', type=int, default=DEFAULT_MAX_CELLS,
+                        help="דילוג על תרחישים שבהם רשומות × סימבולים גדול מזה")
+    parser.add_argument('--output', default=None,
+                        help="קובץ התוצאות (ברירת מחדל: benchmarks/results/benchmark-<זמן>.json)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmarks(args.records, args.symbols, args.stages, args.repeat, args.max_cells)
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"benchmark-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"✅ התוצאות נשמרו: {output}")
+
+
+if __name__ == "__main__":
+    main()
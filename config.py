@@ -25,4 +25,92 @@ AI_STOCKS = [
 BENCHMARK_SYMBOLS = ["SPY", "QQQ", "TQQQ"]
 
 # כל הסימבולים שצריך לנטר
-ALL_SYMBOLS = list(set(AI_STOCKS + BENCHMARK_SYMBOLS))
\ No newline at end of file
+ALL_SYMBOLS = list(set(AI_STOCKS + BENCHMARK_SYMBOLS))
+
+# מטמון מחירים מקומי (SQLite) - מחירי עבר נשמרים לצמיתות. לכל ספק שאינו yfinance קובץ נפרד לצידו
+# (למשל data/price_cache.stub.sqlite), כדי שמחירים סינתטיים לא יוגשו לריצה מול השוק
+PRICE_CACHE_FILE = "data/price_cache.sqlite"
+# כמה זמן (בשניות) מחיר "אחרון" שנשמר במטמון נחשב טרי
+PRICE_CACHE_TTL_SECONDS = 15 * 60
+
+# אחסון היסטוריה: 'json' (history_data.json) או 'columnar' (תיקייה עמודתית, ראה history_store.py).
+# ליקום של אלפי מניות מומלץ 'columnar': רשומת JSON של 5,000 מניות היא כ-1.3MB שנטענת ומפוענחת כולה
+HISTORY_BACKEND = "json"
+HISTORY_FILE = "history_data.json"
+HISTORY_DIR = "data/history"
+
+# מטמון bytecode של תבניות Jinja2 לדוחות
+TEMPLATE_CACHE_DIR = "data/template_cache"
+
+# מקור ספריית plotly.js בדף הגרפים: 'local' (קובץ ב-reports/assets, עובד ללא רשת) או 'cdn'
+PLOTLY_JS_MODE = "cdn"
+
+# הפקת דוחות: 'serial', 'thread' או 'process' (דפים בלתי תלויים מופקים במקביל)
+REPORT_RENDER_MODE = "serial"
+# מספר עובדים מקביליים (None = לפי מספר המעבדים)
+REPORT_RENDER_WORKERS = None
+
+# ספק מחירים: 'yfinance', 'fixture' (קבצי CSV/Parquet בתיקייה) או 'stub' (מחירים סינתטיים בזיכרון)
+PRICE_PROVIDER = "yfinance"
+PRICE_FIXTURE_DIR = "data/fixtures"
+
+# משיכת מחירים מקבילית: גודל מקטע בניסיון הראשון (None = בקשה אחת לכל הסימבולים - yfinance כבר מוריד
+# טיקרים במקביל, ופיצול רק מכפיל את מספר ההורדות), גודל מקטע בניסיונות החוזרים לסימבולים שנכשלו,
+# מספר תהליכונים, מספר ניסיונות חוזרים, השהיה בסיסית (מוכפלת בכל ניסיון) ומועד אחרון כולל למשיכה (בשניות)
+PRICE_FETCH_CHUNK_SIZE = None
+PRICE_FETCH_RETRY_CHUNK_SIZE = 5
+PRICE_FETCH_MAX_WORKERS = 4
+PRICE_FETCH_RETRIES = 3
+PRICE_FETCH_BACKOFF_SECONDS = 1.0
+PRICE_FETCH_DEADLINE_SECONDS = 60
+
+# תכנון הורדות: תאריכים נדרשים שהפער ביניהם עד מספר ימים זה מאוחדים להורדת טווח אחת
+PRICE_PLAN_MAX_GAP_DAYS = 31
+# כמה ימים אחורה לחפש את בר הסגירה האחרון (סופי שבוע וחגים)
+PRICE_LATEST_LOOKBACK_DAYS = 7
+# ריצה יומית: סימבול שמשיכתו נכשלה מקבל את המחיר השמור האחרון רק כל עוד אלו מיעוט הסימבולים -
+# מחלק זה ומעלה (למשל ללא רשת) הרשומה של היום לא נשמרת
+PRICE_MAX_STALE_FRACTION = 0.5
+
+# יומן עדכוני היסטוריה (JSON): אחרי כמה רשומות ביומן הקובץ הראשי נכתב מחדש והיומן נדחס
+HISTORY_JOURNAL_MAX_ENTRIES = 30
+# מאגר עמודתי: עדכון יום קיים משאיר שורה מתה; אחרי כמה שורות מתות העמודות נכתבות מחדש עם השורות החיות בלבד
+HISTORY_MAX_DEAD_ROWS = 30
+
+# יומן מדידות שלבים (JSONL, שורה לכל שלב בכל ריצה); None מבטל את הרישום
+INSTRUMENTATION_LOG = "data/instrumentation.jsonl"
+# מדידת שיא זיכרון לכל שלב (tracemalloc) - מאטה את הריצה, ולכן כבויה כברירת מחדל
+INSTRUMENTATION_TRACE_MEMORY = False
+
+# רישום תיקים: קובץ JSON לכל תיק (ראה portfolio_registry.py), ותיקיית ההיסטוריה של כל תיק
+PORTFOLIOS_DIR = "portfolios"
+PORTFOLIOS_DATA_DIR = "data/portfolios"
+
+# דוח ראשי ליקום גדול: עד כמה מניות מוצגת טבלת מניות מלאה; מעבר לכך מוצגים נתונים מצטברים
+# ו-N המניות החזקות והחלשות, כך שגודל הדף וזמן ההפקה לא גדלים עם מספר המניות
+REPORT_FULL_TABLE_MAX_STOCKS = 50
+REPORT_TOP_N_STOCKS = 20
+
+# מצב תוך-יומי (--intraday): מרווח ברים ('1m' או '5m'), תיקיית המחיצות היומיות (ראה intraday_store.py)
+# וכמה ימי מסחר אחרונים נשמרים
+INTRADAY_INTERVAL = "5m"
+INTRADAY_DIR = "data/intraday"
+INTRADAY_RETENTION_DAYS = 7
+# אזור הזמן ושעות המסחר של הבורסה (זמני הברים התוך-יומיים נשמרים בזמן זה)
+MARKET_TIMEZONE = "America/New_York"
+MARKET_OPEN = "09:30"
+MARKET_CLOSE = "16:00"
+
+# מצב מתמשך (--daemon, ראה daemon.py): כל כמה שניות מתבצע רענון תוך-יומי בשעות המסחר,
+# האם לבצע רענון תוך-יומי כלל (False = רק ריצה יומית אחרי הסגירה),
+# וכמה דקות אחרי הסגירה מתבצעת הריצה היומית (כדי שמחירי הסגירה הסופיים יתפרסמו)
+DAEMON_REFRESH_SECONDS = 5 * 60
+DAEMON_INTRADAY = True
+DAEMON_CLOSE_DELAY_MINUTES = 20
+
+# שרת הדוחות המקומי (--serve, ראה report_server.py): כתובת ופורט, גודל מינימלי (בתים) לדחיסת תשובה,
+# והאם להדפיס שורה לכל בקשה
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8000
+SERVER_COMPRESS_MIN_BYTES = 1024
+SERVER_ACCESS_LOG = False
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מצב מתמשך (python main.py --daemon): תהליך אחד שרץ לאורך זמן במקום הפעלה ידנית לכל עדכון.
+
+מטמון המחירים, מאגרי ההיסטוריה, המאגר התוך-יומי ותבניות Jinja2 המהודרות נפתחים פעם אחת ונשארים בזיכרון,
+כך שכל רענון משלם רק על הנתונים החדשים - בלי הפעלת תהליך, ייבוא מודולים וטעינה מלאה של ההיסטוריה.
+הדוחות מופקים מחדש רק אם הקלטים שלהם השתנו (המניפסט בתיקיית הדוחות).
+
+לוח הזמנים לפי שעות המסחר (config.MARKET_TIMEZONE / MARKET_OPEN / MARKET_CLOSE, ימים א'-ה' בשבוע האמריקאי):
+    בזמן המסחר     - רענון תוך-יומי כל config.DAEMON_REFRESH_SECONDS (אם config.DAEMON_INTRADAY)
+    אחרי הסגירה    - ריצה יומית אחת, config.DAEMON_CLOSE_DELAY_MINUTES דקות אחרי הסגירה
+    מחוץ לשעות     - המתנה עד הפתיחה הבאה
+חגי בורסה אינם מוכרים: ביום כזה הרענון פשוט לא מוצא ברים חדשים.
+ההנחה היא שהתהליך הוא הכותב היחיד להיסטוריה בזמן שהוא רץ.
+"""
+
+import signal
+import argparse
+import threading
+from datetime import datetime, timedelta
+
+import config
+from instrumentation import start_run, finish_run
+from intraday_store import IntradayStore, market_now
+from price_cache import PriceCache
+
+
+def market_hours(day):
+    """זמני הפתיחה והסגירה (בזמן השוק) של יום נתון."""
+    day = datetime(day.year, day.month, day.day)
+    opening, closing = (datetime.strptime(value, '%H:%M') for value in (config.MARKET_OPEN, config.MARKET_CLOSE))
+    return (day.replace(hour=opening.hour, minute=opening.minute),
+            day.replace(hour=closing.hour, minute=closing.minute))
+
+
+def is_trading_day(day):
+    """יום עסקים (שני עד שישי). חגים אינם מוכרים."""
+    return day.weekday() < 5
+
+
+def next_action(now, daily_done_for, refresh_seconds=None, intraday=None):
+    """
+    מחליט מה לעשות עכשיו ומתי להתעורר הבא.
+    :param now: השעה בזמן השוק.
+    :param daily_done_for: תאריך ('YYYY-MM-DD') של הריצה היומית האחרונה שבוצעה, או None.
+    :return: (action, wake_at) - action הוא 'intraday', 'daily' או None.
+    """
+    refresh = timedelta(seconds=refresh_seconds or config.DAEMON_REFRESH_SECONDS)
+    intraday = config.DAEMON_INTRADAY if intraday is None else intraday
+    delay = timedelta(minutes=config.DAEMON_CLOSE_DELAY_MINUTES)
+    if is_trading_day(now):
+        opening, closing = market_hours(now)
+        daily_at = closing + delay
+        if opening <= now < closing and intraday:
+            return 'intraday', min(now + refresh, daily_at)
+        if now < opening:
+            return None, opening if intraday else daily_at
+        if now >= daily_at:
+            if daily_done_for != now.strftime('%Y-%m-%d'):
+                return 'daily', now
+        else:
+            return None, daily_at
+    day = now + timedelta(days=1)
+    while not is_trading_day(day):
+        day += timedelta(days=1)
+    opening, closing = market_hours(day)
+    return None, opening if intraday else closing + delay
+
+
+class TrackerDaemon:
+    """מחזיק את המצב החם בין רענונים ומריץ את לוח הזמנים עד לעצירה (Ctrl+C או SIGTERM)."""
+
+    def __init__(self, args, portfolios):
+        # The browser is never opened from the daemon; reports are refreshed in place
+        self.args = argparse.Namespace(**dict(vars(args), no_browser=True))
+        self.portfolios = portfolios
+        self.cache = PriceCache()
+        self.history_stores = [portfolio.open_history_store() for portfolio in portfolios]
+        self.intraday_store = IntradayStore(interval=args.intraday) if config.DAEMON_INTRADAY else None
+        self.daily_done_for = None
+        self.stop_event = threading.Event()
+
+    def refresh(self, action, now):
+        """
+        מריץ רענון אחד ('intraday' או 'daily') כריצה מדודה נפרדת.
+        :param now: השעה בזמן השוק שלפיה הוחלט על הרענון - תאריך הרשומה היומית נלקח ממנה, כמו daily_done_for.
+        """
+        from main import run_daily, run_intraday
+
+        start_run(f"daemon:{action}", trace_memory=self.args.trace_memory or None)
+        try:
+            if action == 'intraday':
+                run_intraday(self.args, self.portfolios, history_stores=self.history_stores,
+                             cache=self.cache, store=self.intraday_store)
+            else:
+                run_daily(self.args, self.portfolios, history_stores=self.history_stores, cache=self.cache,
+                          today_date=now)
+        finally:
+            finish_run(print_summary=self.args.timings)
+
+    def run(self):
+        """לולאת הרענון. שגיאה ברענון בודד נרשמת והלולאה ממשיכה."""
+        print(f"🕒 מצב מתמשך הופעל ({len(self.portfolios)} תיקים). לעצירה: Ctrl+C.")
+        try:
+            while not self.stop_event.is_set():
+                now = market_now()
+                action, wake_at = next_action(now, self.daily_done_for, intraday=self.intraday_store is not None)
+                if action:
+                    try:
+                        self.refresh(action, now)
+                        if action == 'daily':
+                            self.daily_done_for = now.strftime('%Y-%m-%d')
+                    except Exception as e:
+                        print(f"❌ שגיאה ברענון ({action}): {e}")
+                        wake_at = market_now() + timedelta(seconds=config.DAEMON_REFRESH_SECONDS)
+                else:
+                    print(f"💤 הרענון הבא: {wake_at.strftime('%Y-%m-%d %H:%M')} ({config.MARKET_TIMEZONE}).")
+                self.stop_event.wait(max((wake_at - market_now()).total_seconds(), 0))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.cache.close()
+            for history_store in self.history_stores:
+                history_store.close()
+        print("👋 המצב המתמשך הופסק.")
+
+    def stop(self, *_):
+        """עוצר את הלולאה אחרי הרענון הנוכחי (משמש גם כמטפל ב-SIGTERM)."""
+        self.stop_event.set()
+
+
+def run_daemon(args, portfolios):
+    """נקודת הכניסה של main.py --daemon."""
+    daemon = TrackerDaemon(args, portfolios)
+    signal.signal(signal.SIGTERM, daemon.stop)
+    daemon.run()
+    return daemon
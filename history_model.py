@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מודל רשומות היסטוריה קומפקטי.
+
+ברשומה של history_data.json כל מניה היא מילון שחוזר על 'symbol', 'investment_amount'
+ו-'base_price' בכל יום, יחד עם מחירי הבסיס של המדדים - נתונים שלא משתנים אחרי תאריך הבסיס.
+כאן הנתונים הקבועים נשמרים פעם אחת ב-PortfolioInvariants (מופע משותף לכל הרשומות הזהות),
+והנתונים היומיים נארזים כ-float64 במערך array('d') אחד לכל DayRecord.
+
+DayRecord תומך בגישה כמו למילון (record['date'], record.get(...), dict(record)) וכמאפיינים
+(record.total_return), כך שהדוחות והתבניות עובדים איתו ללא שינוי; to_dict() מחזיר את המבנה המקורי.
+"""
+
+import math
+from array import array
+from dataclasses import dataclass
+
+# שדות יומיים לכל מניה, לפי סדר האריזה במערך
+STOCK_FIELDS = ('current_price', 'quantity', 'current_value', 'profit_loss', 'percentage_return')
+
+# מפתחות הרשומה במבנה המקורי, לפי הסדר
+RECORD_KEYS = (
+    'date', 'timestamp', 'portfolio_value', 'total_profit', 'total_return', 'days_invested',
+    'benchmarks_returns', 'outperformance', 'stocks_performance',
+    'benchmarks_current_prices', 'benchmarks_base_prices'
+)
+
+NAN = float('nan')
+
+
+def to_float(value):
+    """
+    ממיר ערך מספרי (גם numpy/pandas) ל-float רגיל; NaN, None וערך לא מספרי הופכים ל-None.
+    ערך חסר הוא NaN במערכים ובמטריצות ו-None ברשומות ובמילונים. ההמרה בין השניים עוברת כאן וב-nan_if_none,
+    מלבד פריסת מערך הערכים של DayRecord (stocks_performance), שבודקת NaN במקום כי היא נקראת לכל מניה בכל רשומה.
+    """
+    if value is None:
+        return None
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
+
+def nan_if_none(value):
+    """הכיוון ההפוך ל-to_float: None הופך ל-NaN."""
+    return NAN if value is None else float(value)
+
+
+@dataclass(frozen=True, slots=True)
+class PortfolioInvariants:
+    """
+    הנתונים הקבועים של רשומה: סימבולים, סכומי השקעה ומחירי בסיס.
+    benchmark_price_symbols / benchmarks_base_prices הם None כשהמפתח חסר ברשומה (רשומות ישנות).
+    """
+
+    stocks: tuple
+    investment_amounts: tuple
+    base_prices: tuple
+    benchmarks: tuple
+    benchmark_price_symbols: tuple | None
+    benchmarks_base_prices: tuple | None
+
+
+_interned = {}
+
+def intern_invariants(invariants):
+    """מחזיר מופע משותף יחיד לכל קבוצת נתונים קבועים זהה."""
+    return _interned.setdefault(invariants, invariants)
+
+
+@dataclass(slots=True)
+class DayRecord:
+    """
+    רשומת יום בהיסטוריה.
+    values: לכל מניה STOCK_FIELDS, אחריהם תשואת כל מדד, ואחריהם מחירי המדדים
+    (לפי invariants.benchmark_price_symbols). NaN מייצג None.
+    """
+
+    date: str
+    timestamp: str
+    portfolio_value: float
+    total_profit: float
+    total_return: float
+    days_invested: int
+    invariants: PortfolioInvariants
+    values: array
+
+    @classmethod
+    def from_dict(cls, record):
+        """ממיר רשומה במבנה של history_data.json ל-DayRecord."""
+        if isinstance(record, DayRecord):
+            return record
+        stocks = record.get('stocks_performance', [])
+        benchmarks_returns = record.get('benchmarks_returns', {})
+        benchmarks_current_prices = record.get('benchmarks_current_prices')
+        benchmarks_base_prices = record.get('benchmarks_base_prices')
+        invariants = intern_invariants(PortfolioInvariants(
+            stocks=tuple(stock['symbol'] for stock in stocks),
+            investment_amounts=tuple(stock['investment_amount'] for stock in stocks),
+            base_prices=tuple(stock['base_price'] for stock in stocks),
+            benchmarks=tuple(benchmarks_returns),
+            benchmark_price_symbols=None if benchmarks_current_prices is None else tuple(benchmarks_current_prices),
+            benchmarks_base_prices=None if benchmarks_base_prices is None else tuple(benchmarks_base_prices.items()),
+        ))
+        values = array('d', [nan_if_none(stock[field]) for stock in stocks for field in STOCK_FIELDS])
+        values.extend(nan_if_none(value) for value in benchmarks_returns.values())
+        values.extend(nan_if_none(value) for value in (benchmarks_current_prices or {}).values())
+        return cls(
+            date=record['date'],
+            timestamp=record['timestamp'],
+            portfolio_value=record.get('portfolio_value'),
+            total_profit=record.get('total_profit'),
+            total_return=record.get('total_return'),
+            days_invested=record.get('days_invested', 0),
+            invariants=invariants,
+            values=values,
+        )
+
+    # --- מבנה מקורי ---
+
+    @property
+    def stocks_performance(self):
+        invariants = self.invariants
+        width = len(STOCK_FIELDS)
+        # Unpacked in one pass, then sliced per stock. NaN != NaN is checked inline: to_float per value
+        # makes this loop about 2.5x slower on a 5,000-stock record
+        values = [None if value != value else value for value in self.values[:len(invariants.stocks) * width]]
+        stocks = []
+        for i, symbol in enumerate(invariants.stocks):
+            current_price, quantity, current_value, profit_loss, percentage_return = values[i * width:(i + 1) * width]
+            stocks.append({
+                'symbol': symbol,
+                'base_price': invariants.base_prices[i],
+                'current_price': current_price,
+                'quantity': quantity,
+                'investment_amount': invariants.investment_amounts[i],
+                'current_value': current_value,
+                'profit_loss': profit_loss,
+                'percentage_return': percentage_return
+            })
+        return stocks
+
+    @property
+    def benchmarks_returns(self):
+        offset = len(self.invariants.stocks) * len(STOCK_FIELDS)
+        return {
+            symbol: to_float(self.values[offset + i]) for i, symbol in enumerate(self.invariants.benchmarks)
+        }
+
+    @property
+    def outperformance(self):
+        total_return = self.total_return
+        return {
+            symbol: {
+                'benchmark_return': benchmark_return,
+                'portfolio_return': total_return,
+                'outperformance': (total_return - benchmark_return
+                                   if total_return is not None and benchmark_return is not None else None)
+            }
+            for symbol, benchmark_return in self.benchmarks_returns.items()
+        }
+
+    @property
+    def benchmarks_current_prices(self):
+        symbols = self.invariants.benchmark_price_symbols
+        if symbols is None:
+            return None
+        offset = len(self.invariants.stocks) * len(STOCK_FIELDS) + len(self.invariants.benchmarks)
+        return {symbol: to_float(self.values[offset + i]) for i, symbol in enumerate(symbols)}
+
+    @property
+    def benchmarks_base_prices(self):
+        items = self.invariants.benchmarks_base_prices
+        return None if items is None else dict(items)
+
+    def _has(self, key):
+        if key == 'benchmarks_current_prices':
+            return self.invariants.benchmark_price_symbols is not None
+        if key == 'benchmarks_base_prices':
+            return self.invariants.benchmarks_base_prices is not None
+        return key in RECORD_KEYS
+
+    def keys(self):
+        return [key for key in RECORD_KEYS if self._has(key)]
+
+    def to_dict(self):
+        """מחזיר את הרשומה במבנה המקורי של history_data.json."""
+        return {key: getattr(self, key) for key in self.keys()}
+
+    # --- גישה כמו למילון ---
+
+    def __getitem__(self, key):
+        if not self._has(key):
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if self._has(key) else default
+
+    def __contains__(self, key):
+        return self._has(key)
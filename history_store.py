@@ -0,0 +1,638 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+שכבת אחסון להיסטוריית ביצועי התיק.
+
+בשני המימושים הרשומות מאונדקסות לפי תאריך ב-DateIndex (מילון + מערך תאריכים ממוין),
+כך שחיפוש תאריך הוא O(1), ושאילתות טווח ו-N אחרונות הן O(log n) בלי למיין מחדש.
+הרשומות בזיכרון הן DayRecord קומפקטיים (ראה history_model.py).
+
+שני מימושים:
+- JsonHistoryStore: קובץ history_data.json המקורי, ועדכונים יומיים ביומן append-only שנדחס מדי פעם.
+- ColumnarHistoryStore: תיקייה עם קובץ בינארי לכל שדה (float64 לכל יום),
+  הוספת יום או עדכון יום קיים היא הוספת שורה ב-O(1), והעמודות נדחסות מדי פעם.
+"""
+
+import os
+import json
+import math
+import shutil
+import argparse
+import bisect
+from array import array
+from datetime import datetime, date, timedelta
+
+import config
+from atomic_io import atomic_open, append_lines, fsync_directory
+from history_model import STOCK_FIELDS, DayRecord, PortfolioInvariants, intern_invariants, NAN, to_float, nan_if_none
+
+# שדות מספריים ברמת הרשומה
+SCALAR_FIELDS = ('portfolio_value', 'total_profit', 'total_return', 'days_invested')
+
+EPOCH = datetime(1970, 1, 1)
+# float64 ('<f8') - numpy is imported lazily, only by the columnar backend
+CELL_SIZE = 8
+
+
+def _date_to_ordinal(date_str):
+    return datetime.strptime(date_str, '%Y-%m-%d').toordinal()
+
+def _ordinal_to_date(ordinal):
+    return date.fromordinal(int(ordinal)).strftime('%Y-%m-%d')
+
+def _timestamp_to_float(timestamp):
+    return (datetime.fromisoformat(timestamp) - EPOCH).total_seconds()
+
+def _float_to_timestamp(value):
+    return (EPOCH + timedelta(seconds=float(value))).isoformat()
+
+
+
+class DateIndex:
+    """
+    מיפוי מסודר {date_str: value}: מילון לחיפוש O(1) ומערך מפתחות ממוין (bisect) לטווחים.
+    הוספת תאריך חדש אחרי האחרון (המקרה היומי) היא O(1); תאריך מוקדם יותר מוכנס במקומו.
+    """
+
+    def __init__(self, items=()):
+        self._values = dict(items)
+        self._keys = sorted(self._values)
+
+    def get(self, key, default=None):
+        return self._values.get(key, default)
+
+    def upsert(self, key, value):
+        """:return: True אם ערך קיים הוחלף, False אם נוסף מפתח חדש."""
+        exists = key in self._values
+        self._values[key] = value
+        if not exists:
+            if not self._keys or key > self._keys[-1]:
+                self._keys.append(key)
+            else:
+                bisect.insort(self._keys, key)
+        return exists
+
+    def range_keys(self, start=None, end=None):
+        """מפתחות בטווח [start, end] (כולל; None = ללא גבול) לפי הסדר."""
+        lo = 0 if start is None else bisect.bisect_left(self._keys, start)
+        hi = len(self._keys) if end is None else bisect.bisect_right(self._keys, end)
+        return self._keys[lo:hi]
+
+    def range(self, start=None, end=None):
+        """ערכים בטווח [start, end] לפי סדר המפתחות."""
+        return [self._values[key] for key in self.range_keys(start, end)]
+
+    def latest(self, n=1, end=None):
+        """n הערכים האחרונים לפי סדר המפתחות (עם end: רק מפתחות שאינם אחריו)."""
+        hi = len(self._keys) if end is None else bisect.bisect_right(self._keys, end)
+        return [self._values[key] for key in self._keys[max(hi - n, 0):hi]] if n > 0 else []
+
+    def keys(self):
+        return list(self._keys)
+
+    def values(self):
+        return [self._values[key] for key in self._keys]
+
+    def __contains__(self, key):
+        return key in self._values
+
+    def __len__(self):
+        return len(self._keys)
+
+
+class HistoryStore:
+    """ממשק בסיס לאחסון היסטוריה - רשומה אחת לכל תאריך."""
+
+    def records(self):
+        """מחזיר את כל הרשומות (DayRecord, נגישות גם כמילון) ממוינות לפי תאריך."""
+        raise NotImplementedError
+
+    def get(self, date_str):
+        """מחזיר את הרשומה של תאריך מסוים, או None."""
+        for record in self.records():
+            if record['date'] == date_str:
+                return record
+        return None
+
+    def upsert(self, record):
+        """
+        מוסיף או מעדכן את הרשומה של record['date'].
+        :return: True אם רשומה קיימת עודכנה, False אם נוספה רשומה חדשה.
+        """
+        raise NotImplementedError
+
+    def range(self, start_date_str=None, end_date_str=None):
+        """מחזיר את הרשומות בטווח התאריכים [start, end] (כולל; None = ללא גבול) ממוינות לפי תאריך."""
+        return [record for record in self.records()
+                if (start_date_str is None or record['date'] >= start_date_str)
+                and (end_date_str is None or record['date'] <= end_date_str)]
+
+    def latest(self, n=1, end_date_str=None):
+        """מחזיר את n הרשומות האחרונות לפי תאריך (עם end_date_str: האחרונות עד התאריך הזה, כולל)."""
+        return self.range(None, end_date_str)[-n:] if n > 0 else []
+
+    def flush(self):
+        """כותב לדיסק שינויים שעדיין לא נשמרו."""
+
+    def close(self):
+        """סגירה בסיום התהליך: כותב לדיסק שינויים שעדיין לא נשמרו."""
+        self.flush()
+
+    def compact(self):
+        """דוחס את המאגר על הדיסק לצורתו המלאה (python history_store.py --compact)."""
+
+    def __contains__(self, date_str):
+        return self.get(date_str) is not None
+
+    def __len__(self):
+        return len(self.records())
+
+
+class JsonHistoryStore(HistoryStore):
+    """
+    היסטוריה בקובץ JSON יחיד (הפורמט המקורי), עם יומן כתיבה מוקדמת לצידו ('<path>.journal').
+    flush() מוסיף ליומן רק את הרשומות שהשתנו (שורת JSON לכל רשומה) - הוספה זולה במקום כתיבה מלאה.
+    כשהיומן מגיע ל-config.HISTORY_JOURNAL_MAX_ENTRIES רשומות הוא נדחס: הקובץ הראשי נכתב מחדש
+    באופן אטומי (ראה atomic_io) והיומן נמחק. בטעינה היומן מוחל מעל הקובץ הראשי.
+    היומן הוא חלק מההיסטוריה השמורה: הקובץ הראשי לבדו אינו מכיל את הימים האחרונים, ולכן מעתיקים
+    או שומרים את שני הקבצים יחד - או דוחסים קודם (python history_store.py --compact).
+    """
+
+    JOURNAL_SUFFIX = '.journal'
+
+    def __init__(self, path=None):
+        self.path = path or config.HISTORY_FILE
+        self.journal_path = self.path + self.JOURNAL_SUFFIX
+        self._index = DateIndex(
+            (record['date'], DayRecord.from_dict(record)) for record in _load_json_list(self.path)
+        )
+        journal, journal_intact = _load_journal(self.journal_path)
+        for record in journal:
+            self._index.upsert(record['date'], DayRecord.from_dict(record))
+        # A damaged journal must not be appended to; the next flush() compacts it away instead
+        self._journal_entries = len(journal) if journal_intact else config.HISTORY_JOURNAL_MAX_ENTRIES
+        self._pending = {}
+
+    def records(self):
+        return self._index.values()
+
+    def get(self, date_str):
+        return self._index.get(date_str)
+
+    def upsert(self, record):
+        record = DayRecord.from_dict(record)
+        self._pending[record.date] = record
+        return self._index.upsert(record.date, record)
+
+    def range(self, start_date_str=None, end_date_str=None):
+        return self._index.range(start_date_str, end_date_str)
+
+    def latest(self, n=1, end_date_str=None):
+        return self._index.latest(n, end_date_str)
+
+    def __contains__(self, date_str):
+        return date_str in self._index
+
+    def flush(self):
+        if not self._pending:
+            return
+        if self._journal_entries + len(self._pending) >= config.HISTORY_JOURNAL_MAX_ENTRIES:
+            self.compact()
+            return
+        append_lines(self.journal_path, (
+            json.dumps(record.to_dict(), ensure_ascii=False, default=str) for record in self._pending.values()
+        ))
+        self._journal_entries += len(self._pending)
+        self._pending = {}
+
+    def compact(self):
+        """כותב את כל ההיסטוריה לקובץ הראשי באופן אטומי ומוחק את היומן."""
+        with atomic_open(self.path) as f:
+            # A JSON array with one record per line: indent= would force the pure-Python encoder,
+            # which is an order of magnitude slower for records with thousands of stocks
+            f.write('[\n')
+            f.write(',\n'.join(
+                json.dumps(record.to_dict(), ensure_ascii=False, default=str) for record in self._index.values()
+            ))
+            f.write('\n]\n')
+        # A crash before this point only replays journal records that the new file already contains
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+        self._journal_entries = 0
+        self._pending = {}
+
+    def __len__(self):
+        return len(self._index)
+
+
+class ColumnarHistoryStore(HistoryStore):
+    """
+    היסטוריה עמודתית: קובץ '<field>.f8' לכל שדה בתיקייה, ו-meta.json לנתונים שאינם משתנים
+    (סימבולים, סכום השקעה, מחירי בסיס).
+    עמודת 'date' נכתבת אחרונה, ולכן מספר השורות התקף נקבע לפיה גם אחרי כתיבה שנקטעה.
+    עדכון יום קיים לא נכתב במקום: הגרסה החדשה נוספת כשורה חדשה, ורק אחרי שהושלמה תאריך השורה הישנה
+    מסומן NaN (שורה מתה). קריסה באמצע משאירה את הגרסה הישנה או את החדשה - לעולם לא תערובת של שתיהן;
+    אם שתיהן תקפות, השורה המאוחרת בקובץ גוברת.
+    כשמצטברות config.HISTORY_MAX_DEAD_ROWS שורות מתות, העמודות נכתבות מחדש עם השורות החיות בלבד (compact).
+    """
+
+    META_FILE = 'meta.json'
+    COMPACT_STAGING = '.compact.tmp'
+    COMPACT_READY = '.compact.ready'
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.HISTORY_DIR
+        os.makedirs(self.directory, exist_ok=True)
+        self._finish_compaction()
+        self._meta = self._load_meta()
+        dates = self._read_column('date', None)
+        # Retired rows have a NaN date; for a date that appears twice the later row wins
+        self._rows = DateIndex(
+            (_ordinal_to_date(ordinal), row) for row, ordinal in enumerate(dates) if not math.isnan(ordinal)
+        )
+        self._row_count = len(dates)
+
+    # --- meta ---
+
+    def _meta_path(self):
+        return os.path.join(self.directory, self.META_FILE)
+
+    def _load_meta(self):
+        path = self._meta_path()
+        if not os.path.exists(path):
+            return {'stocks': [], 'benchmarks': [], 'investment_amount': {},
+                    'base_prices': {}, 'benchmarks_base_prices': {}}
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def _save_meta(self):
+        with atomic_open(self._meta_path()) as f:
+            json.dump(self._meta, f, ensure_ascii=False, indent=2)
+
+    def _merge_invariants(self, record):
+        """מעדכן את meta.json בנתונים הקבועים של הרשומה. שגיאה אם הם סותרים נתונים קיימים."""
+        changed = False
+        known_stocks = self._meta['investment_amount']
+        for stock in record.get('stocks_performance', []):
+            symbol = stock['symbol']
+            if symbol not in known_stocks:
+                self._meta['stocks'].append(symbol)
+                self._meta['investment_amount'][symbol] = stock['investment_amount']
+                self._meta['base_prices'][symbol] = stock['base_price']
+                changed = True
+            elif self._meta['investment_amount'][symbol] != stock['investment_amount']:
+                raise ValueError(f"סכום ההשקעה של {symbol} השתנה ב-{record['date']}; "
+                                 f"יש לבצע הגירה מחדש של ההיסטוריה.")
+        benchmark_symbols = list(record.get('benchmarks_returns', {}))
+        for symbol in benchmark_symbols:
+            if symbol not in self._meta['benchmarks']:
+                self._meta['benchmarks'].append(symbol)
+                changed = True
+        for symbol, base_price in (record.get('benchmarks_base_prices') or {}).items():
+            if base_price is not None and self._meta['benchmarks_base_prices'].get(symbol) is None:
+                self._meta['benchmarks_base_prices'][symbol] = base_price
+                changed = True
+        if changed:
+            self._save_meta()
+
+    # --- columns ---
+
+    def _column_path(self, name):
+        return os.path.join(self.directory, f"{name}.f8")
+
+    def _read_column(self, name, row_count):
+        import numpy as np
+        path = self._column_path(name)
+        if not os.path.exists(path):
+            return np.full(row_count or 0, np.nan)
+        values = np.fromfile(path, dtype='<f8')
+        if row_count is None:
+            return values
+        if len(values) < row_count:
+            values = np.concatenate([values, np.full(row_count - len(values), np.nan)])
+        return values[:row_count]
+
+    def _read_rows(self, name, rows, start, stop):
+        """
+        קורא מעמודה רק את הבלוק [start, stop) ומחזיר את הערכים בשורות rows (NaN לשורה מעבר לסוף העמודה),
+        כך שחיפוש של יום אחד לא קורא את כל ההיסטוריה.
+        """
+        import numpy as np
+        values = np.full(len(rows), np.nan)
+        path = self._column_path(name)
+        if not os.path.exists(path):
+            return values
+        with open(path, 'rb') as f:
+            f.seek(start * CELL_SIZE)
+            block = np.frombuffer(f.read((stop - start) * CELL_SIZE), dtype='<f8')
+        offsets = rows - start
+        inside = offsets < len(block)
+        values[inside] = block[offsets[inside]]
+        return values
+
+    def _write_cell(self, name, row, value):
+        """כותב ערך יחיד לשורה row בעמודה name, ומרפד ב-NaN אם העמודה קצרה מדי."""
+        import numpy as np
+        path = self._column_path(name)
+        mode = 'r+b' if os.path.exists(path) else 'w+b'
+        with open(path, mode) as f:
+            f.seek(0, os.SEEK_END)
+            length = f.tell() // CELL_SIZE
+            if length < row:
+                f.write(np.full(row - length, np.nan, dtype='<f8').tobytes())
+            f.seek(row * CELL_SIZE)
+            f.write(np.array([value], dtype='<f8').tobytes())
+
+    def _record_cells(self, record):
+        """ממיר רשומה למילון {column_name: float} של הנתונים המשתנים בלבד."""
+        cells = {'timestamp': _timestamp_to_float(record['timestamp'])}
+        # Symbols absent from this record are stored as NaN so an overwritten row keeps no stale values
+        for symbol in self._meta['stocks']:
+            cells[f"price.{symbol}"] = NAN
+        for symbol in self._meta['benchmarks']:
+            cells[f"bench_return.{symbol}"] = NAN
+            cells[f"bench_price.{symbol}"] = NAN
+        for field in SCALAR_FIELDS:
+            cells[field] = nan_if_none(record.get(field))
+        for stock in record.get('stocks_performance', []):
+            symbol = stock['symbol']
+            cells[f"price.{symbol}"] = nan_if_none(stock.get('current_price'))
+            # מחיר בסיס ששונה מזה שב-meta.json (למשל אחרי התאמת דיבידנד) נשמר כעמודת חריגה
+            if stock['base_price'] != self._meta['base_prices'][symbol]:
+                cells[f"base.{symbol}"] = nan_if_none(stock['base_price'])
+            elif os.path.exists(self._column_path(f"base.{symbol}")):
+                cells[f"base.{symbol}"] = NAN
+        for symbol, value in record.get('benchmarks_returns', {}).items():
+            cells[f"bench_return.{symbol}"] = nan_if_none(value)
+        # Whether the record has benchmarks_current_prices at all, so that a benchmark without a price
+        # (None) is not read back as a missing key
+        cells['bench_prices'] = float(record.get('benchmarks_current_prices') is not None)
+        for symbol, value in (record.get('benchmarks_current_prices') or {}).items():
+            cells[f"bench_price.{symbol}"] = nan_if_none(value)
+        for symbol, value in (record.get('benchmarks_base_prices') or {}).items():
+            if value != self._meta['benchmarks_base_prices'].get(symbol):
+                cells[f"bench_base.{symbol}"] = nan_if_none(value)
+            elif os.path.exists(self._column_path(f"bench_base.{symbol}")):
+                cells[f"bench_base.{symbol}"] = NAN
+        return cells
+
+    # --- HistoryStore ---
+
+    def upsert(self, record):
+        self._merge_invariants(record)
+        previous_row = self._rows.get(record['date'])
+        row = self._row_count
+        for name, value in self._record_cells(record).items():
+            self._write_cell(name, row, value)
+        self._write_cell('date', row, _date_to_ordinal(record['date']))
+        if previous_row is not None:
+            self._write_cell('date', previous_row, NAN)
+        self._rows.upsert(record['date'], row)
+        self._row_count += 1
+        if self._row_count - len(self._rows) >= config.HISTORY_MAX_DEAD_ROWS:
+            self.compact()
+        return previous_row is not None
+
+    def compact(self):
+        """
+        כותב מחדש את כל העמודות עם השורות החיות בלבד, לפי סדר התאריכים.
+        העמודות החדשות נכתבות לתיקייה זמנית שמסומנת כמוכנה בשינוי שם אטומי, ורק אז מועברות למקומן:
+        קריסה לפני הסימון משאירה את העמודות הישנות, ואחריו ההעברה מושלמת בפתיחה הבאה (_finish_compaction).
+        """
+        import numpy as np
+        staging = os.path.join(self.directory, self.COMPACT_STAGING)
+        shutil.rmtree(staging, ignore_errors=True)
+        os.makedirs(staging)
+        rows = np.asarray(self._rows.values(), dtype=np.int64)
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith('.f8'):
+                continue
+            values = self._read_rows(name[:-len('.f8')], rows, 0, self._row_count)
+            with open(os.path.join(staging, name), 'wb') as f:
+                f.write(values.astype('<f8').tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+        fsync_directory(staging)
+        os.replace(staging, os.path.join(self.directory, self.COMPACT_READY))
+        fsync_directory(self.directory)
+        self._finish_compaction()
+        self._rows = DateIndex((date_str, row) for row, date_str in enumerate(self._rows.keys()))
+        self._row_count = len(rows)
+
+    def _finish_compaction(self):
+        """משלים דחיסה שסומנה כמוכנה (מעביר למקומן את העמודות שנותרו), ומוחק דחיסה שנקטעה לפני הסימון."""
+        ready = os.path.join(self.directory, self.COMPACT_READY)
+        if os.path.isdir(ready):
+            for name in os.listdir(ready):
+                os.replace(os.path.join(ready, name), os.path.join(self.directory, name))
+            fsync_directory(self.directory)
+            os.rmdir(ready)
+        shutil.rmtree(os.path.join(self.directory, self.COMPACT_STAGING), ignore_errors=True)
+
+    def get(self, date_str):
+        row = self._rows.get(date_str)
+        if row is None:
+            return None
+        return self._build_records([row])[0]
+
+    def _build_records(self, rows):
+        if not rows:
+            return []
+        columns = self._read_columns(rows)
+        stock_values = self._stock_values(columns)
+        return [self._build_record(columns, stock_values, i) for i in range(len(rows))]
+
+    def records(self):
+        return self._build_records(self._rows.values())
+
+    def range(self, start_date_str=None, end_date_str=None):
+        return self._build_records(self._rows.range(start_date_str, end_date_str))
+
+    def latest(self, n=1, end_date_str=None):
+        return self._build_records(self._rows.latest(n, end_date_str))
+
+    def __contains__(self, date_str):
+        return date_str in self._rows
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _read_columns(self, rows):
+        """:return: {column_name: מערך} - ערך לכל שורה ב-rows, לפי הסדר."""
+        import numpy as np
+        rows = np.asarray(rows, dtype=np.int64)
+        start, stop = int(rows.min()), int(rows.max()) + 1
+        names = ['date', 'timestamp', 'bench_prices', *SCALAR_FIELDS]
+        names += [f"price.{symbol}" for symbol in self._meta['stocks']]
+        names += [f"base.{symbol}" for symbol in self._meta['stocks']]
+        names += [f"bench_return.{symbol}" for symbol in self._meta['benchmarks']]
+        names += [f"bench_price.{symbol}" for symbol in self._meta['benchmarks']]
+        names += [f"bench_base.{symbol}" for symbol in self._meta['benchmarks']]
+        return {name: self._read_rows(name, rows, start, stop) for name in names}
+
+    def _stock_values(self, columns):
+        """
+        מחשב בבת אחת, לכל השורות שנקראו ולכל המניות (מטריצות שורות × מניות), את STOCK_FIELDS ואת מחירי הבסיס
+        החריגים (ראה performance_engine._row_values).
+        """
+        import numpy as np
+        meta = self._meta
+        stocks = meta['stocks']
+        shape = (len(columns['date']), len(stocks))
+        if not stocks:
+            return {'base_override': np.empty(shape), 'fields': (np.empty(shape),) * len(STOCK_FIELDS)}
+        prices = np.column_stack([columns[f"price.{symbol}"] for symbol in stocks])
+        base_override = np.column_stack([columns[f"base.{symbol}"] for symbol in stocks])
+        meta_base = np.array([nan_if_none(meta['base_prices'][symbol]) for symbol in stocks])
+        investment = np.array([float(meta['investment_amount'][symbol]) for symbol in stocks])
+        base = np.where(np.isnan(base_override), meta_base[None, :], base_override)
+        # מחיר 0 מסמן מניה ללא נתונים (ראה calculate_performance)
+        valid = ~np.isnan(base) & (base != 0) & ~np.isnan(prices) & (prices != 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            quantity = np.where(valid, investment / base, 0.0)
+            current_value = np.where(valid, quantity * prices, 0.0)
+            profit_loss = np.where(valid, current_value - investment, 0.0)
+            percentage_return = np.where(valid, (profit_loss / investment) * 100, 0.0)
+        return {
+            'base_override': base_override,
+            # One rows × stocks matrix per entry of STOCK_FIELDS, in that order
+            'fields': (prices, quantity, current_value, profit_loss, percentage_return),
+        }
+
+    def _build_record(self, columns, stock_values, row):
+        """
+        משחזר רשומה (DayRecord) מתוך העמודות ו-meta.json, בלי לבנות מילונים לכל מניה.
+        :param row: מיקום השורה בעמודות שנקראו (לא מספר השורה בקבצים).
+        """
+        import numpy as np
+        meta = self._meta
+        # מניות בלי מחיר בשורה זו לא היו ברשומה המקורית
+        fields = stock_values['fields']
+        present = np.flatnonzero(~np.isnan(fields[0][row])).tolist()
+        stocks = [meta['stocks'][j] for j in present]
+        investment_amounts = [meta['investment_amount'][symbol] for symbol in stocks]
+        base_overrides = stock_values['base_override'][row].tolist()
+        base_prices = [meta['base_prices'][symbol] if math.isnan(base_overrides[j]) else base_overrides[j]
+                       for j, symbol in zip(present, stocks)]
+        # Interleaved per stock, in the packing order of DayRecord.values
+        values = array('d', np.column_stack([field[row, present] for field in fields]).tobytes())
+
+        benchmarks = tuple(meta['benchmarks'])
+        values.extend(float(columns[f"bench_return.{symbol}"][row]) for symbol in benchmarks)
+        has_prices = columns['bench_prices'][row]
+        if math.isnan(has_prices):
+            # Rows written before the bench_prices column: only the benchmarks that have a price
+            price_symbols = [symbol for symbol in benchmarks
+                             if not math.isnan(columns[f"bench_price.{symbol}"][row])]
+        else:
+            price_symbols = list(benchmarks) if has_prices else []
+        values.extend(float(columns[f"bench_price.{symbol}"][row]) for symbol in price_symbols)
+        benchmarks_base_prices = []
+        for symbol in benchmarks:
+            base_price = to_float(columns[f"bench_base.{symbol}"][row])
+            benchmarks_base_prices.append((symbol, base_price if base_price is not None
+                                           else meta['benchmarks_base_prices'].get(symbol)))
+
+        invariants = intern_invariants(PortfolioInvariants(
+            stocks=tuple(stocks),
+            investment_amounts=tuple(investment_amounts),
+            base_prices=tuple(base_prices),
+            benchmarks=benchmarks,
+            benchmark_price_symbols=tuple(price_symbols) or None,
+            benchmarks_base_prices=tuple(benchmarks_base_prices),
+        ))
+        days_invested = to_float(columns['days_invested'][row])
+        return DayRecord(
+            date=_ordinal_to_date(columns['date'][row]),
+            timestamp=_float_to_timestamp(columns['timestamp'][row]),
+            portfolio_value=to_float(columns['portfolio_value'][row]),
+            total_profit=to_float(columns['total_profit'][row]),
+            total_return=to_float(columns['total_return'][row]),
+            days_invested=int(days_invested) if days_invested is not None else 0,
+            invariants=invariants,
+            values=values,
+        )
+
+
+def _load_journal(filepath):
+    """
+    קורא את רשומות היומן לפי הסדר. שורה קטועה (כתיבה שנקטעה באמצע) וכל מה שאחריה מדולגים.
+    :return: (records, intact) - intact הוא False אם נמצאה שורה פגומה.
+    """
+    if not os.path.exists(filepath):
+        return [], True
+    records = []
+    with open(filepath, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                print(f"⚠️ שורה {line_number} ביומן {filepath} פגומה (כתיבה שנקטעה?) - השורה ומה שאחריה מדולגים.")
+                return records, False
+    return records, True
+
+
+def _load_json_list(filepath):
+    """טוען רשימת רשומות מקובץ JSON (רשימה ריקה אם הקובץ חסר או פגום)."""
+    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
+        return []
+    try:
+        with open(filepath, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except json.JSONDecodeError as e:
+        print(f"שגיאת פענוח JSON מקובץ {filepath}: {e}")
+        return []
+    except IOError as e:
+        print(f"שגיאת קריאה מקובץ {filepath}: {e}")
+        return []
+
+
+def open_history_store(backend=None, path=None):
+    """
+    יוצר את מאגר ההיסטוריה לפי config.HISTORY_BACKEND ('json' או 'columnar').
+    :param path: אופציונלי. קובץ/תיקיית המאגר במקום config.HISTORY_FILE / config.HISTORY_DIR.
+    """
+    backend = backend or config.HISTORY_BACKEND
+    if backend == 'json':
+        return JsonHistoryStore(path or config.HISTORY_FILE)
+    if backend == 'columnar':
+        return ColumnarHistoryStore(path or config.HISTORY_DIR)
+    raise ValueError(f"סוג אחסון היסטוריה לא מוכר: {backend}")
+
+
+def compact_history_store(backend=None, path=None):
+    """דוחס את מאגר ההיסטוריה (ראה HistoryStore.compact) ומדפיס את מספר הרשומות."""
+    store = open_history_store(backend, path)
+    store.compact()
+    print(f"✅ מאגר ההיסטוריה נדחס ({len(store)} רשומות).")
+    return len(store)
+
+
+def migrate_json_to_columnar(json_path=None, directory=None):
+    """
+    הגירה חד-פעמית של history_data.json למאגר עמודתי.
+    :return: מספר הרשומות שהועברו.
+    """
+    json_path = json_path or config.HISTORY_FILE
+    store = ColumnarHistoryStore(directory or config.HISTORY_DIR)
+    records = JsonHistoryStore(json_path).records()
+    for record in records:
+        store.upsert(record)
+    print(f"✅ {len(records)} רשומות הועברו מ-{json_path} אל {store.directory}")
+    return len(records)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="הגירת history_data.json למאגר היסטוריה עמודתי, או דחיסת המאגר")
+    parser.add_argument('--source', default=config.HISTORY_FILE, help="קובץ ה-JSON המקורי")
+    parser.add_argument('--target', default=config.HISTORY_DIR, help="תיקיית המאגר העמודתי")
+    parser.add_argument('--compact', nargs='?', const='', default=None, metavar='PATH',
+                        help="דחיסת מאגר ההיסטוריה (לפי config.HISTORY_BACKEND; ברירת מחדל: HISTORY_FILE / HISTORY_DIR) "
+                             "במקום הגירה - יומן ה-JSON נכתב לתוך הקובץ הראשי, ושורות מתות נמחקות מהמאגר העמודתי")
+    args = parser.parse_args()
+    if args.compact is not None:
+        compact_history_store(path=args.compact or None)
+    else:
+        migrate_json_to_columnar(args.source, args.target)
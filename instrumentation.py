@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מדידת שלבי ריצה (spans): זמן קיר, זמן CPU ושיא זיכרון (tracemalloc) לכל שלב.
+
+    start_run('daily')
+    with span('fetch_prices', symbols=13):
+        ...
+    finish_run(print_summary=True)
+
+כל שלב שהסתיים נרשם כשורת JSON ביומן config.INSTRUMENTATION_LOG (שורה לכל שלב, עם מזהה הריצה),
+כך שאפשר לעקוב לאורך זמן איזה שלב מאט ככל שההיסטוריה גדלה.
+שלבים יכולים להיות מקוננים. מחוץ לריצה פעילה span() לא עושה דבר.
+מדידת זיכרון מאטה את הריצה, ולכן היא מופעלת רק לפי config.INSTRUMENTATION_TRACE_MEMORY או --trace-memory.
+"""
+
+import os
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+import config
+from atomic_io import append_lines
+
+_run = None
+
+
+def start_run(name, trace_memory=None):
+    """מתחיל ריצה מדודה חדשה. :param name: סוג הריצה (למשל 'daily', 'backfill')."""
+    global _run
+    if trace_memory is None:
+        trace_memory = config.INSTRUMENTATION_TRACE_MEMORY
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    now = datetime.now()
+    _run = {
+        'id': f"{now.strftime('%Y%m%dT%H%M%S')}-{os.getpid()}",
+        'name': name,
+        'started': now.isoformat(timespec='seconds'),
+        'origin': time.perf_counter(),
+        'trace_memory': trace_memory,
+        'started_tracing': started_tracing,
+        'stack': [],
+        'spans': [],
+    }
+
+
+@contextmanager
+def span(name, **fields):
+    """
+    מודד את הבלוק כשלב בריצה הפעילה.
+    :param fields: שדות נוספים לרישום ביומן (למשל מספר רשומות או סימבולים).
+    """
+    run = _run
+    if run is None:
+        yield
+        return
+    stack = run['stack']
+    parent = stack[-1] if stack else None
+    if run['trace_memory']:
+        # reset_peak() would lose the parent's peak so far, so fold it into the parent first
+        if parent is not None:
+            parent['peak'] = max(parent['peak'], tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+    entry = {'peak': 0}
+    stack.append(entry)
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    try:
+        yield
+    finally:
+        wall = time.perf_counter() - start_wall
+        cpu = time.process_time() - start_cpu
+        stack.pop()
+        peak = None
+        if run['trace_memory']:
+            peak = max(entry['peak'], tracemalloc.get_traced_memory()[1])
+            if parent is not None:
+                parent['peak'] = max(parent['peak'], peak)
+        run['spans'].append({
+            'run_id': run['id'],
+            'run': run['name'],
+            'span': name,
+            'depth': len(stack),
+            'start_offset_seconds': round(start_wall - run['origin'], 6),
+            'wall_seconds': round(wall, 6),
+            'cpu_seconds': round(cpu, 6),
+            'peak_memory_bytes': peak,
+            **fields,
+        })
+
+
+def format_summary(spans):
+    """טבלת סיכום של השלבים לפי סדר תחילתם, עם הזחה לשלבים מקוננים."""
+    lines = [f"{'שלב':<40} {'קיר (ms)':>10} {'CPU (ms)':>10} {'שיא (MiB)':>10}"]
+    for entry in sorted(spans, key=lambda entry: entry['start_offset_seconds']):
+        peak = entry['peak_memory_bytes']
+        peak_text = f"{peak / 2**20:.1f}" if peak is not None else "-"
+        name = "  " * entry['depth'] + entry['span']
+        lines.append(f"{name:<40} {entry['wall_seconds'] * 1000:>10.1f} {entry['cpu_seconds'] * 1000:>10.1f} {peak_text:>10}")
+    return "\n".join(lines)
+
+
+def finish_run(print_summary=False):
+    """
+    מסיים את הריצה הפעילה: מוסיף את השלבים ליומן ה-JSONL ומדפיס טבלת סיכום לפי בקשה.
+    :return: רשימת השלבים שנמדדו.
+    """
+    global _run
+    run, _run = _run, None
+    if run is None:
+        return []
+    if run['started_tracing']:
+        tracemalloc.stop()
+    spans = run['spans']
+    if spans and config.INSTRUMENTATION_LOG:
+        try:
+            append_lines(config.INSTRUMENTATION_LOG, (json.dumps(entry, ensure_ascii=False) for entry in spans))
+        except OSError as e:
+            print(f"אזהרה: לא ניתן לכתוב ליומן המדידות {config.INSTRUMENTATION_LOG}: {e}")
+    if print_summary and spans:
+        print(f"⏱️ זמני שלבים (ריצה {run['id']}):")
+        print(format_summary(spans))
+    return spans
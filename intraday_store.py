@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+אחסון ברים תוך-יומיים (1m / 5m) מחולק לפי יום מסחר.
+
+    data/intraday/5m/2026-10-16.npz
+
+כל מחיצה היא קובץ npz אחד: מערך זמני הברים (שניות מ-1970 בזמן השוק, config.MARKET_TIMEZONE, ללא אזור זמן),
+מערך הסימבולים ומטריצת float64 (ברים × סימבולים) לכל שדה OHLCV שהספק החזיר.
+עדכון תוך-יומי כותב מחדש רק את מחיצת היום (כתיבה אטומית, ראה atomic_io) - לא את ההיסטוריה היומית,
+ומחיצות ישנות מ-config.INTRADAY_RETENTION_DAYS נמחקות.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import config
+from atomic_io import atomic_open
+from price_cache import OHLCV_FIELDS
+
+# מרווחי ברים נתמכים ואורכם בדקות
+INTRADAY_INTERVALS = {'1m': 1, '5m': 5}
+
+
+def interval_delta(interval):
+    """אורך בר כ-timedelta. שגיאת ValueError למרווח לא נתמך."""
+    if interval not in INTRADAY_INTERVALS:
+        raise ValueError(f"מרווח ברים לא נתמך: {interval} (נתמכים: {', '.join(INTRADAY_INTERVALS)})")
+    return timedelta(minutes=INTRADAY_INTERVALS[interval])
+
+
+def market_now():
+    """השעה הנוכחית בזמן השוק (config.MARKET_TIMEZONE), ללא אזור זמן - כמו אינדקס הברים."""
+    from zoneinfo import ZoneInfo
+    return datetime.now(ZoneInfo(config.MARKET_TIMEZONE)).replace(tzinfo=None)
+
+
+class IntradayStore:
+    """
+    ברים תוך-יומיים של מרווח אחד, מחיצה לכל יום מסחר.
+    מחיצות שנטענו נשמרות בזיכרון, כך שעדכונים חוזרים באותו תהליך לא קוראים את הדיסק מחדש.
+    """
+
+    def __init__(self, directory=None, interval=None):
+        self.interval = interval or config.INTRADAY_INTERVAL
+        interval_delta(self.interval)
+        self.directory = os.path.join(directory or config.INTRADAY_DIR, self.interval)
+        os.makedirs(self.directory, exist_ok=True)
+        self._days = {}
+
+    def _path(self, day):
+        return os.path.join(self.directory, f"{day}.npz")
+
+    def days(self):
+        """ימי המסחר השמורים, ממוינים."""
+        return sorted(name[:-len('.npz')] for name in os.listdir(self.directory) if name.endswith('.npz'))
+
+    def load_day(self, day):
+        """
+        :param day: 'YYYY-MM-DD'.
+        :return: מסגרות ברים {field: DataFrame} (אינדקס זמני ברים, עמודה לכל סימבול); ריקות אם אין מחיצה.
+        """
+        import numpy as np
+        import pandas as pd
+
+        if day not in self._days:
+            frames = {}
+            path = self._path(day)
+            if os.path.exists(path):
+                with np.load(path, allow_pickle=False) as partition:
+                    index = pd.to_datetime(partition['times'], unit='s')
+                    symbols = partition['symbols'].tolist()
+                    for field in OHLCV_FIELDS:
+                        if field in partition:
+                            frames[field] = pd.DataFrame(partition[field], index=index, columns=symbols)
+            if 'close' not in frames:
+                frames = {'close': pd.DataFrame(dtype=float)}
+            self._days[day] = frames
+        return self._days[day]
+
+    def last_time(self, day):
+        """זמן הבר האחרון השמור ביום, או None."""
+        closes = self.load_day(day)['close']
+        return closes.index[-1].to_pydatetime() if len(closes.index) else None
+
+    def upsert(self, frames):
+        """
+        ממזג ברים חדשים למחיצות של הימים שלהם: בר באותו זמן מחליף את השמור (בר אחרון שעדיין נבנה),
+        וסימבולים חדשים מתווספים כעמודות.
+        :param frames: מסגרות ברים תוך-יומיות מהספק.
+        :return: מספר הברים (זמנים) החדשים שנוספו.
+        """
+        import numpy as np
+
+        closes = frames.get('close')
+        if closes is None or closes.empty:
+            return 0
+        added = 0
+        for day, day_closes in closes.groupby(closes.index.normalize()):
+            day_str = day.strftime('%Y-%m-%d')
+            stored = self.load_day(day_str)
+            added += len(day_closes.index.difference(stored['close'].index))
+            merged = {}
+            for field in OHLCV_FIELDS:
+                new = frames.get(field)
+                if new is None:
+                    if field in stored:
+                        merged[field] = stored[field]
+                    continue
+                new = new.reindex(day_closes.index)
+                old = stored.get(field)
+                merged[field] = new if old is None or old.empty else new.combine_first(old)
+            symbols = list(dict.fromkeys(symbol for frame in merged.values() for symbol in frame.columns))
+            index = merged['close'].index
+            for frame in merged.values():
+                index = index.union(frame.index)
+            merged = {field: frame.reindex(index=index, columns=symbols).astype(float) for field, frame in merged.items()}
+            with atomic_open(self._path(day_str), 'wb') as f:
+                np.savez(
+                    f,
+                    times=index.values.astype('datetime64[s]').astype('int64'),
+                    symbols=np.array(symbols, dtype=str),
+                    **{field: frame.to_numpy() for field, frame in merged.items()},
+                )
+            self._days[day_str] = merged
+        return added
+
+    def prune(self, keep_days=None):
+        """מוחק מחיצות של ימים שקודמים ל-keep_days ימי המסחר האחרונים. :return: מספר המחיצות שנמחקו."""
+        keep_days = config.INTRADAY_RETENTION_DAYS if keep_days is None else keep_days
+        expired = self.days()[:-keep_days] if keep_days else self.days()
+        for day in expired:
+            os.remove(self._path(day))
+            self._days.pop(day, None)
+        return len(expired)
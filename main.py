@@ -5,299 +5,544 @@
 """
 
 import os
-import json
+import sys
+import argparse
+import subprocess
 import webbrowser
 from datetime import datetime, timedelta # Corrected import for datetime and timedelta
 import config
 from report_generator import ReportGenerator
-import yfinance as yf
-import pandas as pd
+from instrumentation import start_run, span, finish_run
+from history_model import to_float
+from price_cache import PriceCache, bar_is_final
+from price_providers import get_price_provider, bars_at, plan_fetch_ranges, fetch_ranges, fetch_intraday
+from portfolio_registry import default_portfolio, load_portfolios, union_symbols
+from intraday_store import INTRADAY_INTERVALS, IntradayStore, interval_delta, market_now
+# yfinance, pandas and the vectorized engine are heavy; they are imported inside the
+# functions that need them so that cached / render-only runs start quickly.
 
 # --- הגדרת נתיבים וקבועים ---
 OUTPUT_DIR = "reports"
-HISTORY_FILE = "history_data.json"
 
 # וודא שתיקיית הדוחות קיימת
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-# --- פונקציות עזר כלליות ---
-def save_json(data, filepath):
-    """שומר נתונים לקובץ JSON."""
-    try:
-        dir_name = os.path.dirname(filepath)
-        if dir_name:
-            os.makedirs(dir_name, exist_ok=True)
-        with open(filepath, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-    except IOError as e:
-        print(f"שגיאת כתיבה לקובץ {filepath}: {e}")
-
-def load_json(filepath):
-    """טוען נתונים מקובץ JSON."""
-    if not os.path.exists(filepath) or os.path.getsize(filepath) == 0:
-        return []
-    try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            return json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"שגיאת פענוח JSON מקובץ {filepath}: {e}")
-        return []
-    except IOError as e:
-        print(f"שגיאת קריאה מקובץ {filepath}: {e}")
-        return []
-
-# --- פונקציה למשיכת נתונים אמיתיים מ-Yahoo Finance ---
-def fetch_prices_from_yahoo(symbols, date_str=None):
-    """
-    מושך מחירי סגירה עבור סימבולים בתאריך ספציפי (או נתוני סגירה אחרונים).
-    :param symbols: רשימת סימבולי מניות/מדדים.
-    :param date_str: אופציונלי. תאריך ספציפי בפורמט 'YYYY-MM-DD' למשוך עבורו מחיר סגירה.
-                     אם לא ניתן, ימשוך את מחיר הסגירה האחרון (היום).
-    :return: מילון של {symbol: close_price}.
-    """
-    prices = {}
+# --- פונקציות למשיכת מחירים מספק המחירים (ברירת מחדל: Yahoo Finance) ---
+def fetch_prices_for_run(symbols, dates=(), latest=True, cache=None, provider=None):
+    """
+    מושך בבת אחת את כל מחירי הסגירה שריצה צריכה: בתאריכים נתונים ו/או המחיר האחרון.
+    מחירים שנמצאים במטמון המקומי לא נמשכים; שאר התאריכים מאוחדים למספר מינימלי של טווחי הורדה
+    (ראה price_providers.plan_fetch_ranges), והתוצאה נחתכת מקומית לכל תאריך.
+    :param dates: תאריכים בפורמט 'YYYY-MM-DD'.
+    :param latest: האם למשוך גם את מחיר הסגירה האחרון.
+    :return: (prices, status) - מילונים {date_str: {symbol: ...}}, כשהמפתח None הוא המחיר האחרון.
+             status לכל סימבול: 'cached' | 'ok' | 'missing' | 'error' | 'timeout'.
+    """
+    import numpy as np
+    import pandas as pd
+
+    keys = list(dict.fromkeys(dates)) + ([None] if latest else [])
+    prices = {key: {} for key in keys}
+    status = {key: {} for key in keys}
     if not symbols:
-        return prices
-
-    if date_str:
-        start_date_dt = datetime.strptime(date_str, '%Y-%m-%d')
-        # yfinance download end date is exclusive, so add a day
-        end_date_dt = start_date_dt + timedelta(days=1)
-        
-        print(f"מושך מחירי סגירה עבור תאריך {date_str}...")
-        try:
-            # Removed show_errors=True as it's not supported by all yfinance versions
-            data = yf.download(symbols, start=start_date_dt.strftime('%Y-%m-%d'), 
-                               end=end_date_dt.strftime('%Y-%m-%d'), progress=False)
-            
-            if not data.empty and 'Close' in data.columns:
-                for symbol in symbols:
-                    if symbol in data['Close'].columns: # Multi-stock dataframe
-                        if not data['Close'][symbol].empty:
-                            prices[symbol] = data['Close'][symbol].iloc[0] # Get the first (and hopefully only) close price for that day
-                    elif isinstance(data['Close'], pd.Series) and data['Close'].name == symbol: # Single stock series
-                        if not data['Close'].empty:
-                            prices[symbol] = data['Close'].iloc[0]
-            else:
-                print(f"אזהרה: לא נמצאו נתוני סגירה עבור {', '.join(symbols)} בתאריך {date_str}. בדוק סימבולים ותאריך.")
+        return prices, status
 
-        except Exception as e:
-            print(f"שגיאה במשיכת נתונים היסטוריים מ-Yahoo Finance עבור {', '.join(symbols)} בתאריך {date_str}: {e}")
-            
-    else: # Fetch latest close price (for today's data)
-        print("מושך מחירי סגירה עדכניים (אחרונים) מ-Yahoo Finance...")
-        try:
-            # Removed show_errors=True
-            data = yf.download(symbols, period='1d', interval='1d', progress=False)
-            if not data.empty and 'Close' in data.columns:
-                for symbol in symbols:
-                    if symbol in data['Close'].columns: # Multi-stock dataframe
-                        if not data['Close'][symbol].empty:
-                            prices[symbol] = data['Close'][symbol].iloc[-1] # Last available close
-                    elif isinstance(data['Close'], pd.Series) and data['Close'].name == symbol: # Single stock series
-                        if not data['Close'].empty:
-                            prices[symbol] = data['Close'].iloc[-1]
+    provider = provider or get_price_provider()
+    own_cache = cache is None
+    if own_cache:
+        cache = PriceCache(provider=provider.name)
+    now = datetime.now()
+
+    try:
+        missing = {}
+        intervals = []
+        for key in keys:
+            cached = cache.get_closes(symbols, key) if key else cache.get_latest_closes(symbols)
+            prices[key].update(cached)
+            status[key].update({symbol: 'cached' for symbol in cached})
+            missing[key] = [symbol for symbol in symbols if symbol not in cached]
+            if not missing[key]:
+                continue
+            if key:
+                intervals.append((key, key))
             else:
-                print(f"אזהרה: לא נמצאו נתוני סגירה עדכניים עבור {', '.join(symbols)}. בדוק סימבולים.")
-        except Exception as e:
-            print(f"שגיאה במשיכת נתונים עדכניים מ-Yahoo Finance עבור {', '.join(symbols)}: {e}")
-    
+                lookback_start = now - timedelta(days=config.PRICE_LATEST_LOOKBACK_DAYS)
+                intervals.append((lookback_start.strftime('%Y-%m-%d'), now.strftime('%Y-%m-%d')))
+
+        cached_count = sum(len(prices[key]) for key in keys)
+        missing_count = sum(len(key_missing) for key_missing in missing.values())
+        if cached_count:
+            print(f"💾 {cached_count} מחירים נטענו מהמטמון המקומי, {missing_count} חסרים.")
+
+        missing_symbols = set().union(*missing.values())
+        fetch_symbols = [symbol for symbol in symbols if symbol in missing_symbols]
+        if fetch_symbols:
+            ranges = plan_fetch_ranges(intervals)
+            ranges_text = ', '.join(f"{start} עד {end}" for start, end in ranges)
+            print(f"מושך מחירי סגירה מ-{provider.name} עבור {len(fetch_symbols)} סימבולים ב-{len(ranges)} הורדות ({ranges_text})...")
+            frames, fetch_status = fetch_ranges(provider, fetch_symbols, ranges)
+
+            closes = frames['close']
+            with cache.batch():
+                for row, day in enumerate(closes.index):
+                    cache.put_bars(bars_at(frames, row), day.strftime('%Y-%m-%d'))
+
+            # For each key, the row holding each symbol's close (-1 if none), computed for all columns at once
+            values = closes.to_numpy(dtype=float)
+            has_close = ~np.isnan(values)
+            columns = {symbol: column for column, symbol in enumerate(closes.columns)}
+            latest_bars = {}
+            for key, key_missing in missing.items():
+                if key:
+                    matches = np.flatnonzero(closes.index == pd.Timestamp(key))
+                    candidates = has_close[matches[-1:]]
+                else:
+                    candidates = has_close & (closes.index <= now)[:, None]
+                if len(candidates):
+                    last_rows = len(candidates) - 1 - np.argmax(candidates[::-1], axis=0)
+                    source_rows = np.where(candidates.any(axis=0), last_rows, -1)
+                    if key:
+                        source_rows = np.where(source_rows >= 0, matches[-1], -1)
+                else:
+                    source_rows = np.full(len(columns), -1)
+                for symbol in key_missing:
+                    if fetch_status.get(symbol) != 'ok':
+                        status[key][symbol] = fetch_status.get(symbol, 'missing')
+                        continue
+                    column = columns.get(symbol)
+                    source_row = -1 if column is None else int(source_rows[column])
+                    if source_row < 0:
+                        status[key][symbol] = 'missing'
+                        continue
+                    prices[key][symbol] = float(values[source_row, column])
+                    status[key][symbol] = 'ok'
+                    if key is None:
+                        day = closes.index[source_row].strftime('%Y-%m-%d')
+                        latest_bars.setdefault(day, {})[symbol] = {'close': prices[key][symbol]}
+            # The full bars for these days were cached above; this only marks them as latest
+            for day, day_bars in latest_bars.items():
+                day_frames = {field: frame.loc[[pd.Timestamp(day)], list(day_bars)] for field, frame in frames.items()}
+                cache.put_bars(bars_at(day_frames, 0), day, latest=True)
+
+            for key, key_missing in missing.items():
+                failed = {symbol: status[key][symbol] for symbol in key_missing if status[key][symbol] != 'ok'}
+                if failed:
+                    when = f"בתאריך {key}" if key else "עדכניים"
+                    details = ', '.join(f"{symbol} ({state})" for symbol, state in failed.items())
+                    print(f"אזהרה: לא נמצאו נתוני סגירה {when} מ-{provider.name} עבור: {details}.")
+    finally:
+        if own_cache:
+            cache.close()
+
     # Ensure all symbols have a price, even if None
-    for symbol in symbols:
-        if symbol not in prices:
-            prices[symbol] = None # Set to None if price couldn't be fetched
+    for key in keys:
+        for symbol in symbols:
+            if symbol not in prices[key]:
+                prices[key][symbol] = None # Set to None if price couldn't be fetched
+                status[key].setdefault(symbol, 'missing')
+
+    return prices, status
+
 
+def fill_missing_prices(prices, status, fallback_prices):
+    """
+    משלים מחירים שלא נמשכו ממחירים שמורים (למשל מרשומת ההיסטוריה האחרונה) ומסמן אותם 'stale'.
+    :return: רשימת הסימבולים שנשארו ללא מחיר.
+    """
+    for symbol, price in prices.items():
+        if price is None and fallback_prices.get(symbol) is not None:
+            prices[symbol] = fallback_prices[symbol]
+            status[symbol] = 'stale'
+    return [symbol for symbol, price in prices.items() if price is None]
+
+
+def record_prices(record, stock_key, benchmarks_key):
+    """
+    מחלץ מרשומת היסטוריה מחירים לכל הסימבולים.
+    :param stock_key: 'base_price' או 'current_price' (מתוך stocks_performance).
+    :param benchmarks_key: 'benchmarks_base_prices' או 'benchmarks_current_prices'.
+    """
+    if not record:
+        return {}
+    prices = {stock['symbol']: stock.get(stock_key) or None for stock in record.get('stocks_performance', [])}
+    prices.update(record.get(benchmarks_key) or {})
     return prices
 
 
+def fetch_price_matrix_from_yahoo(symbols, start_date_str, end_date_str, cache=None, provider=None):
+    """
+    מושך מחירי סגירה לכל ימי המסחר בטווח בבקשה אחת לספק המחירים.
+    כל הברים שנמשכו נשמרים גם במטמון המחירים המקומי.
+    :param start_date_str: תאריך התחלה 'YYYY-MM-DD' (כולל).
+    :param end_date_str: תאריך סיום 'YYYY-MM-DD' (לא כולל, כמו ב-yfinance).
+    :return: DataFrame של מחירי סגירה - אינדקס תאריכים, עמודה לכל סימבול.
+    """
+    import pandas as pd
+
+    provider = provider or get_price_provider()
+    print(f"מושך מחירי סגירה עבור {len(symbols)} סימבולים בטווח {start_date_str} עד {end_date_str}...")
+    try:
+        frames = provider.get_bars(symbols, start_date_str, end_date_str)
+    except Exception as e:
+        print(f"שגיאה במשיכת טווח נתונים מ-{provider.name}: {e}")
+        return pd.DataFrame(columns=symbols, dtype=float)
+
+    closes = frames['close']
+    if closes.empty:
+        print(f"אזהרה: לא נמצאו נתוני סגירה בטווח {start_date_str} עד {end_date_str}.")
+        return pd.DataFrame(columns=symbols, dtype=float)
+
+    own_cache = cache is None
+    if own_cache:
+        cache = PriceCache(provider=provider.name)
+    try:
+        with cache.batch():
+            for row, day in enumerate(closes.index):
+                cache.put_bars(bars_at(frames, row), day.strftime('%Y-%m-%d'))
+    finally:
+        if own_cache:
+            cache.close()
+
+    return closes.reindex(columns=symbols).dropna(how='all')
+
+
 # --- פונקציות חישוב ביצועים ---
 def calculate_performance(base_prices, current_prices, investment_per_stock, ai_stocks, benchmarks_symbols):
     """
     מחשב את ביצועי התיק הכוללים, מניות בודדות ומדדי ייחוס.
+    החישוב עצמו מתבצע במנוע הווקטורי (performance_engine) על מטריצה של שורה אחת.
     """
-    total_investment = len(ai_stocks) * investment_per_stock
-    current_portfolio_value = 0
-    stocks_performance = []
+    import pandas as pd
+    from performance_engine import calculate_performance_frame, performance_snapshot
 
     for symbol in ai_stocks:
         base_price = base_prices.get(symbol)
-        current_price = current_prices.get(symbol)
-
-        if base_price is not None and current_price is not None and base_price != 0:
-            quantity = investment_per_stock / base_price
-            current_value = quantity * current_price
-            profit_loss = current_value - investment_per_stock
-            percentage_return = (profit_loss / investment_per_stock) * 100
-
-            current_portfolio_value += current_value
-            stocks_performance.append({
-                'symbol': symbol,
-                'base_price': base_price,
-                'current_price': current_price,
-                'quantity': quantity,
-                'investment_amount': investment_per_stock,
-                'current_value': current_value,
-                'profit_loss': profit_loss,
-                'percentage_return': percentage_return
-            })
-        else:
+        if base_price is None or current_prices.get(symbol) is None or base_price == 0:
             print(f"אזהרה: נתוני מחיר חסרים או לא חוקיים עבור {symbol}. מניה זו לא תיכלל בחישובים, או תוצג כ-0.")
-            stocks_performance.append({
-                'symbol': symbol,
-                'base_price': base_price or 0,
-                'current_price': current_price or 0,
-                'quantity': 0,
-                'investment_amount': investment_per_stock,
-                'current_value': 0,
-                'profit_loss': 0,
-                'percentage_return': 0
-            })
-
-    total_profit = current_portfolio_value - total_investment
-    total_return = (total_profit / total_investment) * 100 if total_investment != 0 else 0
-
-    benchmarks_returns = {}
-    outperformance = {}
-
-    for symbol in benchmarks_symbols:
-        base_price = base_prices.get(symbol)
-        current_price = current_prices.get(symbol)
-        if base_price is not None and current_price is not None and base_price != 0:
-            benchmark_return = ((current_price - base_price) / base_price) * 100
-            benchmarks_returns[symbol] = benchmark_return
-            outperformance[symbol] = {
-                'benchmark_return': benchmark_return,
-                'portfolio_return': total_return,
-                'outperformance': total_return - benchmark_return
-            }
+
+    price_matrix = pd.DataFrame([current_prices]).astype(float)
+    performance = calculate_performance_frame(
+        price_matrix, base_prices, investment_per_stock, ai_stocks, benchmarks_symbols
+    )
+    return performance_snapshot(performance, 0)
+
+def generate_reports(current_day_record, history_data, open_browser=True, force=False, render_mode=None, portfolio=None,
+                     pages=None, intraday=None):
+    """
+    מפיק את הדוחות לתיקיית הדוחות. דוחות שהקלטים שלהם לא השתנו אינם נכתבים מחדש.
+    :param current_day_record: הרשומה המלאה של היום הנוכחי (לדוח הראשי ולסיכום).
+    :param history_data: כל רשומות ההיסטוריה ממוינות לפי תאריך.
+    :param force: הפקה מחדש של כל הדוחות.
+    :param render_mode: 'serial', 'thread' או 'process' (ברירת מחדל: config.REPORT_RENDER_MODE).
+    :param portfolio: התיק (ברירת מחדל: התיק שב-config.py); תיקים מהרישום נכתבים ל-reports/<id>.
+    :param pages: / intraday: ראה ReportGenerator.render_reports.
+    """
+    portfolio = portfolio or default_portfolio()
+    output_dir = portfolio.reports_dir(OUTPUT_DIR)
+    # צור מופע של ReportGenerator
+    report_generator = ReportGenerator(portfolio_name=portfolio.name, base_date=portfolio.base_date)
+    print("✅ ReportGenerator אתחול בהצלחה.")
+
+    # הפק רק את הדוחות שהקלטים שלהם השתנו ושמור אותם לקבצים
+    with span('reports', portfolio=portfolio.id, records=len(history_data)):
+        written = report_generator.render_reports(
+            current_day_record, history_data, output_dir, force=force, mode=render_mode,
+            pages=pages, intraday=intraday
+        )
+
+    print(f"✨ הדוחות עודכנו בהצלחה ({len(written)} קבצים נכתבו מחדש)!")
+
+    # --- קוד שיפתח את הדוח באופן אוטומטי ---
+    if not open_browser:
+        return
+    try:
+        main_report_path = os.path.join(output_dir, "index.html")
+        if os.path.exists(main_report_path):
+            webbrowser.open(f"file:///{os.path.abspath(main_report_path)}")
+            print(f"🌐 הדוח הראשי נפתח אוטומטית: {os.path.abspath(main_report_path)}")
         else:
-            benchmarks_returns[symbol] = None
-            outperformance[symbol] = {
-                'benchmark_return': None,
-                'portfolio_return': total_return,
-                'outperformance': None
-            }
+            print(f"אזהרה: קובץ הדוח הראשי לא נמצא בנתיב: {main_report_path}")
+    except Exception as e:
+        print(f"שגיאה בניסיון לפתוח את הדוח בדפדפן: {e}")
+
+def backfill_history(history_store, portfolio=None, price_matrix=None):
+    """
+    משחזר את כל ימי המסחר החסרים מתאריך הבסיס ועד יום המסחר האחרון שהסתיים, בבקשת הורדה אחת.
+    רשומות קיימות אינן נדרסות, ומניות ללא מחיר בסיס אינן נספרות בחישוב (כמו בריצה היומית).
+    :param portfolio: התיק (ברירת מחדל: התיק שב-config.py).
+    :param price_matrix: אופציונלי. מטריצת מחירים שכבר נמשכה (למשל לאיחוד הסימבולים של כמה תיקים).
+    :return: מספר הרשומות שנוספו.
+    """
+    import pandas as pd
+    from performance_engine import calculate_performance_frame, build_history_records
+
+    portfolio = portfolio or default_portfolio()
+    if price_matrix is None:
+        end_date_str = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        with span('fetch_price_matrix', symbols=len(portfolio.symbols)):
+            price_matrix = fetch_price_matrix_from_yahoo(portfolio.symbols, portfolio.base_date, end_date_str)
+    base_date_ts = pd.Timestamp(portfolio.base_date)
+    price_matrix = price_matrix.loc[price_matrix.index >= base_date_ts].reindex(columns=portfolio.symbols).dropna(how='all')
+    if price_matrix.empty:
+        print("❌ שגיאה: לא התקבלו מחירים לשחזור ההיסטוריה.")
+        return 0
+
+    if base_date_ts not in price_matrix.index:
+        print(f"❌ שגיאה: תאריך הבסיס {portfolio.base_date} אינו יום מסחר בנתונים שהתקבלו.")
+        return 0
+    base_prices = price_matrix.loc[base_date_ts].to_dict()
+    stocks = [symbol for symbol in portfolio.stocks if to_float(base_prices.get(symbol)) is not None]
+    if not stocks:
+        print("❌ שגיאה: לאף מניה בתיק אין מחיר בסיס. לא ניתן לשחזר את ההיסטוריה.")
+        return 0
+    missing_base = [symbol for symbol in portfolio.stocks if symbol not in stocks]
+    if missing_base:
+        print(f"⚠️ ממשיך ללא {', '.join(missing_base)} - סימבולים ללא מחיר בסיס אינם נספרים בחישוב.")
+    # The bar of a session that has not closed yet is still moving: it is left to the daily run
+    now = market_now()
+    price_matrix = price_matrix.loc[[bar_is_final(day.strftime('%Y-%m-%d'), now) for day in price_matrix.index]]
+    # A missing cell on one day carries the previous close forward instead of valuing the stock at 0,
+    # like the daily run (stored prices) and the intraday run
+    price_matrix = price_matrix.ffill()
+
+    with span('calculate', portfolio=portfolio.id, days=len(price_matrix)):
+        performance = calculate_performance_frame(
+            price_matrix,
+            base_prices,
+            portfolio.investment_per_stock,
+            stocks,
+            portfolio.benchmarks
+        )
+        records = build_history_records(performance, portfolio.base_date)
+    added = 0
+    with span('persist', portfolio=portfolio.id):
+        for record in records:
+            if record['date'] not in history_store:
+                history_store.upsert(record)
+                added += 1
+        history_store.flush()
+    print(f"✅ שוחזרו {added} ימי מסחר חסרים מתוך {len(price_matrix)} ימים בטווח.")
+    return added
+
+def backfill_portfolios(portfolios, history_stores):
+    """
+    משחזר את ההיסטוריה של כמה תיקים: מטריצת מחירים אחת לאיחוד הסימבולים, מתאריך הבסיס המוקדם ביותר,
+    שנחתכת לכל תיק לפי הסימבולים ותאריך הבסיס שלו.
+    :param history_stores: מאגר ההיסטוריה של כל תיק, לפי אותו סדר.
+    :return: מספר הרשומות שנוספו בסך הכל.
+    """
+    symbols = union_symbols(portfolios)
+    start_date_str = min(portfolio.base_date for portfolio in portfolios)
+    end_date_str = (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+    with span('fetch_price_matrix', symbols=len(symbols)):
+        price_matrix = fetch_price_matrix_from_yahoo(symbols, start_date_str, end_date_str)
+    added = 0
+    for portfolio, history_store in zip(portfolios, history_stores):
+        if len(portfolios) > 1:
+            print(f"📁 תיק {portfolio.name} ({portfolio.id}):")
+        added += backfill_history(history_store, portfolio, price_matrix)
+    return added
+
+# חבילות שנטענות רק כשצריך (משיכת נתונים / גרפים), ונמדדות בנפרד ב---profile-startup
+LAZY_MODULES = ['yfinance', 'pandas', 'numpy', 'performance_engine', 'plotly.offline']
+
+def _import_times(statement):
+    """
+    מריץ את statement במפרש חדש עם -X importtime.
+    :return: מילון {top-level package: זמן ייבוא עצמי מצטבר במילישניות}.
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', statement],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__))
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        # "import time: <self us> | <cumulative us> | <indented module name>"
+        self_us, _, name = line[len('import time:'):].split('|')
+        package = name.strip().split('.')[0]
+        times[package] = times.get(package, 0.0) + int(self_us) / 1000
+    return times
+
+def profile_startup(top_n=15):
+    """מדפיס פירוט זמני ייבוא: מה נטען בהפעלת main.py, ומה עולה כל תלות כבדה שנטענת בעצלות."""
+    startup = _import_times("import main")
+    full = _import_times("import main; " + "; ".join(f"import {name}" for name in LAZY_MODULES))
+    startup_total = sum(startup.values())
+    full_total = sum(full.values())
+
+    print(f"⏱️ זמן ייבוא בהפעלה: {startup_total:.1f}ms")
+    print(f"⏱️ זמן ייבוא כולל התלויות הכבדות: {full_total:.1f}ms")
+    print(f"{'חבילה':<24}{'ms':>10}{'%':>8}  בהפעלה")
+    for package, ms in sorted(full.items(), key=lambda item: item[1], reverse=True)[:top_n]:
+        loaded_at_startup = "✔" if package in startup else "עצל"
+        print(f"{package:<24}{ms:>10.1f}{ms / full_total * 100:>8.1f}  {loaded_at_startup}")
+
+def render_from_history(history_store, args, portfolio=None, open_browser=None):
+    """
+    מפיק את הדוחות מההיסטוריה השמורה בלבד, בלי גישה לרשת.
+    הרשומה האחרונה בהיסטוריה משמשת כרשומת "היום" לדוח הראשי ולסיכום.
+    :param open_browser: ברירת מחדל: לפי --no-browser.
+    :return: False אם אין היסטוריה להפקה.
+    """
+    history_data = history_store.records()
+    if not history_data:
+        print("❌ שגיאה: אין רשומות בהיסטוריה - לא ניתן להפיק דוחות.")
+        return False
+    print(f"📂 מפיק דוחות מההיסטוריה השמורה ({len(history_data)} רשומות, אחרונה: {history_data[-1]['date']}).")
+    generate_reports(
+        history_data[-1], history_data,
+        open_browser=not args.no_browser if open_browser is None else open_browser,
+        force=args.force_reports, render_mode=args.render_mode, portfolio=portfolio
+    )
+    return True
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=f"מעקב ביצועי תיק {config.PORTFOLIO_NAME}")
+    parser.add_argument('--backfill', action='store_true',
+                        help="שחזור כל ימי המסחר החסרים מתאריך הבסיס ועד היום בהורדה אחת")
+    parser.add_argument('--render-only', action='store_true',
+                        help="הפקת הדוחות מההיסטוריה השמורה בלבד, ללא משיכת מחירים (עובד גם ללא רשת)")
+    parser.add_argument('--no-browser', action='store_true',
+                        help="לא לפתוח את הדוח הראשי בדפדפן בסיום")
+    parser.add_argument('--force-reports', action='store_true',
+                        help="הפקה מחדש של כל הדוחות גם אם הקלטים שלהם לא השתנו")
+    parser.add_argument('--render-mode', choices=['serial', 'thread', 'process'], default=None,
+                        help="אופן הפקת הדוחות: טורי, תהליכונים או תהליכים (ברירת מחדל: config.REPORT_RENDER_MODE)")
+    parser.add_argument('--profile-startup', action='store_true',
+                        help="הצגת פירוט זמני ייבוא המודולים בהפעלה וללא הפעלה של המעקב")
+    parser.add_argument('--timings', action='store_true',
+                        help="הצגת טבלת זמני שלבים בסיום (השלבים נרשמים תמיד ליומן המדידות)")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="מדידת שיא זיכרון לכל שלב עם tracemalloc (מאט את הריצה)")
+    parser.add_argument('--intraday', nargs='?', const=config.INTRADAY_INTERVAL, default=None,
+                        choices=list(INTRADAY_INTERVALS), metavar='INTERVAL',
+                        help="מצב תוך-יומי: משיכת ברים של 1m/5m (ברירת מחדל: config.INTRADAY_INTERVAL), "
+                             "תמחור התיק לכל בר ועדכון index.html, summary.html ו-intraday.html בלבד - ללא כתיבה להיסטוריה היומית")
+    parser.add_argument('--daemon', action='store_true',
+                        help="הרצה מתמשכת: רענון לפי שעות המסחר (ראה daemon.py) עם מטמון, היסטוריה ותבניות טעונים בזיכרון")
+    parser.add_argument('--serve', nargs='?', type=int, const=config.SERVER_PORT, default=None, metavar='PORT',
+                        help="הגשת תיקיית הדוחות בשרת HTTP מקומי (ברירת מחדל: config.SERVER_PORT) אחרי הריצה, "
+                             "או ברקע לצד --daemon (ראה report_server.py)")
+    parser.add_argument('--portfolios', nargs='*', metavar='ID', default=None,
+                        help="הרצה על התיקים שמוגדרים בתיקייה config.PORTFOLIOS_DIR (ללא מזהים: כל התיקים). "
+                             "המחירים נמשכים פעם אחת לכל סימבול, והדוחות נכתבים ל-reports/<id>")
+    return parser.parse_args(argv)
+
+def build_base_record(portfolio, base_prices):
+    """רשומת תאריך הבסיס של התיק: כל מניה שווה לסכום ההשקעה וכל התשואות 0."""
+    base_date_dt = datetime.strptime(portfolio.base_date, '%Y-%m-%d')
+    investment = portfolio.investment_per_stock
+    initial_stocks_performance = []
+    for symbol in portfolio.stocks:
+        initial_stocks_performance.append({
+            'symbol': symbol,
+            'base_price': base_prices.get(symbol, 0),
+            'current_price': base_prices.get(symbol, 0), # At base date, current_price = base_price
+            'quantity': investment / base_prices.get(symbol, 1) if base_prices.get(symbol, 1) != 0 else 0,
+            'investment_amount': investment,
+            'current_value': investment,
+            'profit_loss': 0.0,
+            'percentage_return': 0.0
+        })
 
     return {
-        'portfolio_value': current_portfolio_value,
-        'total_profit': total_profit,
-        'total_return': total_return,
-        'stocks_performance': stocks_performance,
-        'benchmarks_returns': benchmarks_returns,
-        'outperformance': outperformance
+        "date": portfolio.base_date,
+        "timestamp": datetime.combine(base_date_dt, datetime.min.time()).isoformat(),
+        "portfolio_value": len(portfolio.stocks) * investment,
+        "total_profit": 0.0,
+        "total_return": 0.0,
+        "days_invested": 0,
+        "benchmarks_returns": {symbol: 0.0 for symbol in portfolio.benchmarks},
+        "outperformance": {
+            symbol: {"benchmark_return": 0.0, "portfolio_return": 0.0, "outperformance": 0.0}
+            for symbol in portfolio.benchmarks
+        },
+        "stocks_performance": initial_stocks_performance,
+        # Store base prices for benchmarks in base record
+        "benchmarks_base_prices": {symbol: base_prices.get(symbol) for symbol in portfolio.benchmarks}
     }
 
-def main():
-    today_date = datetime.now()
-    today_date_str = today_date.strftime('%Y-%m-%d')
-    base_date_dt = datetime.strptime(config.BASE_DATE, '%Y-%m-%d')
-    
-    # 1. טען נתונים היסטוריים
-    history_data = load_json(HISTORY_FILE)
-
-    # 2. וודא שרשומת הבסיס קיימת ומכילה את מחירי הבסיס
-    base_date_record_exists = False
-    
-    # Always attempt to fetch base prices from Yahoo Finance for BASE_DATE
-    print(f"מנסה למשוך מחירי בסיס עבור {config.BASE_DATE} מ-Yahoo Finance.")
-    fetched_base_prices = fetch_prices_from_yahoo(config.ALL_SYMBOLS, config.BASE_DATE)
-    
-    if all(price is not None for price in fetched_base_prices.values()):
-        effective_base_prices = fetched_base_prices
-        
+def prepare_portfolio_prices(portfolio, history_store, run_prices, run_status):
+    """
+    בוחר מתוך המחירים שנמשכו לריצה את מחירי הבסיס והמחירים העדכניים של התיק, ומשלים חסרים מההיסטוריה שלו.
+    יוצר את רשומת תאריך הבסיס אם אינה קיימת.
+    מחיר עדכני שחסר מושלם מהרשומה האחרונה רק למיעוט הסימבולים (config.PRICE_MAX_STALE_FRACTION),
+    כדי שריצה ללא רשת לא תשמור רשומה חדשה שבנויה ממחירים ישנים.
+    :param run_prices: / run_status: הפלט של fetch_prices_for_run (לאיחוד הסימבולים של כל התיקים).
+    :return: (base_prices, current_prices, stocks), או None אם אי אפשר לחשב את התיק.
+             stocks הן מניות התיק שיש להן גם מחיר בסיס וגם מחיר עדכני - רק הן נספרות בחישוב,
+             כדי שמניה ללא מחיר לא תיספר כהשקעה בשווי 0 (ירידה מדומה בתשואת התיק).
+    """
+    symbols = portfolio.symbols
+    # Copies: the fills below are per portfolio and must not leak into the shared run prices
+    effective_base_prices = {symbol: run_prices[portfolio.base_date][symbol] for symbol in symbols}
+    base_status = {symbol: run_status[portfolio.base_date][symbol] for symbol in symbols}
+    # סימבול שלא נמשך יקבל את מחיר הבסיס השמור ברשומת הבסיס (אם קיימת)
+    missing_base = fill_missing_prices(
+        effective_base_prices, base_status,
+        record_prices(history_store.get(portfolio.base_date), 'base_price', 'benchmarks_base_prices')
+    )
+
+    if not missing_base:
         # If record didn't exist, create/update it now with fetched prices
-        # First, check if a base record already exists to avoid duplication
-        existing_base_record_index = -1
-        for i, record in enumerate(history_data):
-            if record['date'] == config.BASE_DATE:
-                existing_base_record_index = i
-                break
-
-        if existing_base_record_index == -1: # Base record does not exist, create it
-            initial_portfolio_value = len(config.AI_STOCKS) * config.INVESTMENT_PER_STOCK
-            
-            initial_stocks_performance = []
-            for symbol in config.AI_STOCKS:
-                initial_stocks_performance.append({
-                    'symbol': symbol,
-                    'base_price': effective_base_prices.get(symbol, 0),
-                    'current_price': effective_base_prices.get(symbol, 0), # At base date, current_price = base_price
-                    'quantity': config.INVESTMENT_PER_STOCK / effective_base_prices.get(symbol, 1) if effective_base_prices.get(symbol, 1) != 0 else 0,
-                    'investment_amount': config.INVESTMENT_PER_STOCK,
-                    'current_value': config.INVESTMENT_PER_STOCK,
-                    'profit_loss': 0.0,
-                    'percentage_return': 0.0
-                })
-            
-            # Store base prices for benchmarks in base record
-            initial_benchmarks_base_prices = {
-                symbol: effective_base_prices.get(symbol) for symbol in config.BENCHMARK_SYMBOLS
-            }
-
-            base_date_record = {
-                "date": config.BASE_DATE,
-                "timestamp": datetime.combine(base_date_dt, datetime.min.time()).isoformat(),
-                "portfolio_value": initial_portfolio_value,
-                "total_profit": 0.0,
-                "total_return": 0.0,
-                "days_invested": 0,
-                "benchmarks_returns": {
-                    "SPY": 0.0, "QQQ": 0.0, "TQQQ": 0.0
-                },
-                "outperformance": {
-                    "SPY": {"benchmark_return": 0.0, "portfolio_return": 0.0, "outperformance": 0.0},
-                    "QQQ": {"benchmark_return": 0.0, "portfolio_return": 0.0, "outperformance": 0.0},
-                    "TQQQ": {"benchmark_return": 0.0, "portfolio_return": 0.0, "outperformance": 0.0}
-                },
-                "stocks_performance": initial_stocks_performance,
-                "benchmarks_base_prices": initial_benchmarks_base_prices 
-            }
-            history_data.insert(0, base_date_record)
+        if portfolio.base_date not in history_store: # Base record does not exist, create it
+            history_store.upsert(build_base_record(portfolio, effective_base_prices))
             print("✅ רשומת תאריך בסיס נוצרה והוכנסה להיסטוריה עם מחירי בסיס אמיתיים.")
         else:
             print("✅ מחירי בסיס נמשכו מחדש בהצלחה עבור רשומת תאריך בסיס קיימת.")
-            
+
     else:
-        print("❌ אזהרה חמורה: לא ניתן למשוך מחירי בסיס עבור כל הסימבולים מ-Yahoo Finance. החישובים לא יהיו מדויקים!")
-        print("אנא וודא חיבור לאינטרנט ושהסימבולים ('ANET', 'AVGO', 'ASML', 'CEG', 'CRWD', 'NVDA', 'PLTR', 'TSLA', 'TSM', 'VRT', 'SPY', 'QQQ', 'TQQQ') תקינים עבור Yahoo Finance.")
-        
-    if not effective_base_prices or not all(price is not None for price in effective_base_prices.values()):
+        print("❌ אזהרה חמורה: לא ניתן למשוך מחירי בסיס עבור כל הסימבולים מספק המחירים. החישובים לא יהיו מדויקים!")
+        print(f"אנא וודא חיבור לאינטרנט ושהסימבולים ({', '.join(missing_base)}) תקינים עבור {get_price_provider().name}.")
+
+    if len(missing_base) == len(effective_base_prices):
         print("❌ שגיאה: מחירי בסיס חיוניים חסרים. לא ניתן להמשיך בחישובים מדויקים.")
-        return 
+        return None
+    if missing_base:
+        print(f"⚠️ ממשיך ללא {', '.join(missing_base)} - סימבולים ללא מחיר בסיס אינם נספרים בחישוב.")
 
     # 3. הבא מחירי סגירה עדכניים עבור היום
-    current_prices = fetch_prices_from_yahoo(config.ALL_SYMBOLS)
-
-    # בדוק אם מחירי היום הנוכחי נמשכו בהצלחה
-    if not all(price is not None for price in current_prices.values()):
-        print("❌ שגיאה: לא ניתן למשוך מחירי סגירה עדכניים עבור כל הסימבולים. החישובים לא יהיו מדויקים!")
-        print("אנא וודא חיבור לאינטרנט ושהסימבולים תקינים עבור Yahoo Finance.")
-        return 
-
-    # 4. חשב ביצועים עבור התאריך הנוכחי
-    calculated_performance = calculate_performance(
-        effective_base_prices, 
-        current_prices,
-        config.INVESTMENT_PER_STOCK,
-        config.AI_STOCKS,
-        config.BENCHMARK_SYMBOLS
+    current_prices = {symbol: run_prices[None][symbol] for symbol in symbols}
+    current_status = {symbol: run_status[None][symbol] for symbol in symbols}
+
+    # סימבול שלא נמשך יקבל את המחיר האחרון השמור בהיסטוריה, כדי שטיקר בעייתי אחד לא יפיל את הריצה
+    latest_records = history_store.latest(1)
+    missing_current = fill_missing_prices(
+        current_prices, current_status,
+        record_prices(latest_records[0] if latest_records else None, 'current_price', 'benchmarks_current_prices')
     )
-
+    stale = [symbol for symbol, state in current_status.items() if state == 'stale']
+    if stale:
+        print(f"⚠️ נעשה שימוש במחיר השמור האחרון עבור: {', '.join(stale)}.")
+
+    # בדוק אם מחירי היום הנוכחי נמשכו בהצלחה - מחיר שמור אינו מחיר עדכני
+    if len(missing_current) + len(stale) == len(current_prices):
+        print("❌ שגיאה: לא ניתן למשוך מחירי סגירה עדכניים עבור אף סימבול. לא ניתן להמשיך בחישובים.")
+        print(f"אנא וודא חיבור לאינטרנט ושהסימבולים תקינים עבור {get_price_provider().name}.")
+        return None
+    if len(stale) >= len(current_prices) * config.PRICE_MAX_STALE_FRACTION:
+        print(f"❌ שגיאה: ל-{len(stale)} מתוך {len(current_prices)} סימבולים אין מחיר עדכני - "
+              f"רשומה שרובה מחירים שמורים אינה נשמרת. נסה שוב מאוחר יותר.")
+        return None
+    if missing_current:
+        print(f"⚠️ אין מחיר עדכני או שמור עבור {', '.join(missing_current)} - סימבולים אלה אינם נספרים בחישוב.")
+
+    unpriced = set(missing_base) | set(missing_current)
+    stocks = [symbol for symbol in portfolio.stocks if symbol not in unpriced]
+    if not stocks:
+        print("❌ שגיאה: לאף מניה בתיק אין גם מחיר בסיס וגם מחיר עדכני. לא ניתן להמשיך בחישובים.")
+        return None
+    return effective_base_prices, current_prices, stocks
+
+def build_current_day_record(portfolio, calculated_performance, base_prices, current_prices, today_date):
+    """צור את מבנה הנתונים המלא לרשומה של היום הנוכחי, כולל כל המידע הנדרש לדוחות."""
     # חשב ימים שהושקעו מהתאריך base_date
-    days_invested = (today_date - base_date_dt).days
-    if days_invested < 0: days_invested = 0
-
-    # Add benchmark prices to current_day_record
-    benchmarks_current_prices = {
-        symbol: current_prices.get(symbol) for symbol in config.BENCHMARK_SYMBOLS
-    }
-    benchmarks_base_prices_for_report = {
-        symbol: effective_base_prices.get(symbol) for symbol in config.BENCHMARK_SYMBOLS
-    }
-
-    # צור את מבנה הנתונים המלא לרשומה של היום הנוכחי, כולל כל המידע הנדרש לדוחות
-    current_day_record = {
-        "date": today_date_str,
+    base_date_dt = datetime.strptime(portfolio.base_date, '%Y-%m-%d')
+    days_invested = max((today_date - base_date_dt).days, 0)
+    return {
+        "date": today_date.strftime('%Y-%m-%d'),
         "timestamp": datetime.now().isoformat(),
         "portfolio_value": calculated_performance['portfolio_value'],
         "total_profit": calculated_performance['total_profit'],
@@ -306,60 +551,270 @@ def main():
         "benchmarks_returns": calculated_performance['benchmarks_returns'],
         "outperformance": calculated_performance['outperformance'],
         "stocks_performance": calculated_performance['stocks_performance'],
-        "benchmarks_current_prices": benchmarks_current_prices,
-        "benchmarks_base_prices": benchmarks_base_prices_for_report
+        # Add benchmark prices to current_day_record
+        "benchmarks_current_prices": {symbol: current_prices.get(symbol) for symbol in portfolio.benchmarks},
+        "benchmarks_base_prices": {symbol: base_prices.get(symbol) for symbol in portfolio.benchmarks}
     }
 
-    # 5. בדוק אם כבר קיימת רשומה עבור התאריך הנוכחי ועדכן או הוסף
-    record_exists_for_today = False
-    for i, record in enumerate(history_data):
-        if record['date'] == today_date_str:
-            history_data[i] = current_day_record # עדכן רשומה קיימת
-            record_exists_for_today = True
-            print(f"🔄 עדכון רשומה קיימת עבור {today_date_str} בהיסטוריה.")
-            break
-    
-    if not record_exists_for_today:
-        history_data.append(current_day_record) # הוסף רשומה חדשה
-        print(f"➕ מוסיף רשומה חדשה עבור {today_date_str} להיסטוריה.")
-
-    # 6. מיין את הנתונים לפי תאריך לפני השמירה
-    history_data.sort(key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'))
-
-    save_json(history_data, HISTORY_FILE)
-    print(f"✅ היסטוריית נתונים נשמרה ב: {HISTORY_FILE}")
-
-    # 7. צור מופע של ReportGenerator
-    report_generator = ReportGenerator()
-    print("✅ ReportGenerator אתחול בהצלחה.")
+def run_daily(args, portfolios=None, history_stores=None, cache=None, today_date=None):
+    """
+    ריצה יומית: משיכת מחירים, חישוב ביצועים לתאריך הנוכחי, שמירה בהיסטוריה והפקת דוחות.
+    עם כמה תיקים, המחירים של איחוד הסימבולים נמשכים פעם אחת לכל הריצה, כל התיקים מחושבים יחד,
+    ולכל תיק נשמרת היסטוריה ונכתבת תיקיית דוחות משלו.
+    :param portfolios: ברירת מחדל: התיק שב-config.py בלבד.
+    :param history_stores: / cache: אופציונלי. מאגרי היסטוריה (לפי סדר התיקים) ומטמון מחירים פתוחים
+                           לשימוש חוזר בין ריצות באותו תהליך (ראה daemon.py).
+    :param today_date: תאריך הרשומה (ברירת מחדל: עכשיו לפי השעון המקומי); daemon.py מעביר את התאריך בזמן השוק.
+    """
+    portfolios = portfolios or [default_portfolio()]
+    multiple = len(portfolios) > 1
+    today_date = today_date or datetime.now()
+    today_date_str = today_date.strftime('%Y-%m-%d')
 
-    # 8. הפק את הדוחות ושמור אותם לקבצים
-    # השתמש ב-current_day_record המלא עבור יצירת הדוח הראשי והסיכום
-    reports_to_generate = {
-        "index.html": report_generator.generate_main_report(current_day_record),
-        "history.html": report_generator.generate_history_report(history_data),
-        "summary.html": report_generator.generate_summary_image_report(current_day_record),
-        "graphs.html": report_generator.generate_graphs_report(history_data)
-    }
+    # 1. טען נתונים היסטוריים
+    if history_stores is None:
+        with span('load_history', portfolios=len(portfolios)):
+            history_stores = [portfolio.open_history_store() for portfolio in portfolios]
+
+    # 2. מחירי הבסיס והמחירים העדכניים של כל התיקים נמשכים יחד, במספר מינימלי של הורדות
+    symbols = union_symbols(portfolios)
+    base_dates = sorted({portfolio.base_date for portfolio in portfolios})
+    # Always attempt to fetch base prices from the price provider for the base dates
+    print(f"מנסה למשוך מחירי בסיס עבור {', '.join(base_dates)} ומחירים עדכניים מספק המחירים.")
+    with span('fetch_prices', symbols=len(symbols)):
+        run_prices, run_status = fetch_prices_for_run(symbols, base_dates, cache=cache)
+
+    ready = []
+    for portfolio, history_store in zip(portfolios, history_stores):
+        if multiple:
+            print(f"📁 תיק {portfolio.name} ({portfolio.id}):")
+        portfolio_prices = prepare_portfolio_prices(portfolio, history_store, run_prices, run_status)
+        if portfolio_prices is not None:
+            ready.append((portfolio, history_store, *portfolio_prices))
+    if not ready:
+        return
+
+    # 4. חשב ביצועים עבור התאריך הנוכחי לכל התיקים
+    day_records = []
+    with span('calculate', portfolios=len(ready)):
+        for portfolio, history_store, base_prices, current_prices, stocks in ready:
+            calculated_performance = calculate_performance(
+                base_prices,
+                current_prices,
+                portfolio.investment_per_stock,
+                stocks,
+                portfolio.benchmarks
+            )
+            day_records.append(build_current_day_record(
+                portfolio, calculated_performance, base_prices, current_prices, today_date
+            ))
+
+    for (portfolio, history_store, *_), current_day_record in zip(ready, day_records):
+        if multiple:
+            print(f"📁 תיק {portfolio.name} ({portfolio.id}):")
+        with span('persist', portfolio=portfolio.id):
+            # 5. בדוק אם כבר קיימת רשומה עבור התאריך הנוכחי ועדכן או הוסף
+            if history_store.upsert(current_day_record):
+                print(f"🔄 עדכון רשומה קיימת עבור {today_date_str} בהיסטוריה.")
+            else:
+                print(f"➕ מוסיף רשומה חדשה עבור {today_date_str} להיסטוריה.")
 
-    for filename, html_content in reports_to_generate.items():
-        file_path = os.path.join(OUTPUT_DIR, filename)
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(html_content)
-        print(f"📄 דוח נוצר: {file_path}")
+            # 6. שמור את ההיסטוריה (המאגר שומר את הרשומות ממוינות לפי תאריך)
+            history_store.flush()
+            history_data = history_store.records()
+        print(f"✅ היסטוריית נתונים נשמרה ({config.HISTORY_BACKEND}).")
 
-    print("✨ כל הדוחות נוצרו בהצלחה!")
+        # 7-8. הפק את הדוחות ושמור אותם לקבצים (הדפדפן נפתח רק בריצה של תיק יחיד)
+        generate_reports(
+            current_day_record, history_data,
+            open_browser=not args.no_browser and not multiple, force=args.force_reports,
+            render_mode=args.render_mode, portfolio=portfolio
+        )
 
-    # --- קוד שיפתח את הדוח באופן אוטומטי ---
+def update_intraday_store(store, symbols, now=None):
+    """
+    מושך לתוך המאגר התוך-יומי את הברים החסרים של כל הסימבולים - מהבר האחרון השמור (שייתכן שעוד נבנה)
+    ועד עכשיו, או מ-config.PRICE_LATEST_LOOKBACK_DAYS ימים אחורה במאגר ריק - ומוחק מחיצות ישנות.
+    :return: יום המסחר האחרון שיש לו ברים ('YYYY-MM-DD'), או None.
+    """
+    now = now or market_now()
+    start = (now - timedelta(days=config.PRICE_LATEST_LOOKBACK_DAYS)).replace(hour=0, minute=0, second=0, microsecond=0)
+    days = store.days()
+    last_time = store.last_time(days[-1]) if days else None
+    # With new symbols (or an empty store) the whole lookback window is fetched
+    if last_time is not None and set(symbols) <= set(store.load_day(days[-1])['close'].columns):
+        start = max(start, last_time)
+    frames, status = fetch_intraday(get_price_provider(), symbols, start, now + interval_delta(store.interval), store.interval)
+    failed = [symbol for symbol, state in status.items() if state not in ('ok', 'missing')]
+    if failed:
+        print(f"⚠️ משיכת ברים תוך-יומיים נכשלה עבור: {', '.join(failed)}.")
+    added = store.upsert(frames)
+    store.prune()
+    days = store.days()
+    print(f"⏱️ נוספו {added} ברים חדשים ({store.interval}); יום המסחר האחרון במאגר: {days[-1] if days else '-'}.")
+    return days[-1] if days else None
+
+def intraday_base_prices(portfolios, history_stores, cache=None):
+    """
+    מחירי הבסיס של כל תיק מרשומת הבסיס בהיסטוריה שלו; מחירים חסרים נמשכים יחד לכל התיקים.
+    :return: רשימה (בסדר התיקים) של מילוני {symbol: base_price}.
+    """
+    base_prices = []
+    missing = {}
+    for portfolio, history_store in zip(portfolios, history_stores):
+        prices = record_prices(history_store.get(portfolio.base_date), 'base_price', 'benchmarks_base_prices')
+        prices = {symbol: prices.get(symbol) for symbol in portfolio.symbols}
+        for symbol, price in prices.items():
+            if price is None:
+                missing.setdefault(portfolio.base_date, set()).add(symbol)
+        base_prices.append(prices)
+    if missing:
+        symbols = sorted(set().union(*missing.values()))
+        run_prices, _ = fetch_prices_for_run(symbols, sorted(missing), latest=False, cache=cache)
+        for portfolio, prices in zip(portfolios, base_prices):
+            for symbol, price in prices.items():
+                if price is None:
+                    prices[symbol] = run_prices[portfolio.base_date].get(symbol)
+    return base_prices
+
+def reprice_intraday(portfolio, history_store, base_prices, closes, day, interval):
+    """
+    מתמחר את התיק לכל בר של יום המסחר במנוע הווקטורי.
+    סימבול ללא בר בזמן נתון מקבל את הבר הקודם שלו ביום, ולפני הבר הראשון - את סגירת יום המסחר הקודם בהיסטוריה.
+    :param closes: מחירי הסגירה של הברים ביום (זמנים × סימבולים).
+    :param interval: מרווח הברים ('1m' / '5m').
+    :return: (רשומת "היום" לבר האחרון, סדרות הגרף התוך-יומי), או None אם אין מחירים.
+    """
+    from performance_engine import calculate_performance_frame, build_day_record
+
+    previous_day = (datetime.strptime(day, '%Y-%m-%d') - timedelta(days=1)).strftime('%Y-%m-%d')
+    previous = history_store.latest(1, previous_day)
+    previous_close = record_prices(previous[-1] if previous else None, 'current_price', 'benchmarks_current_prices')
+    fallback = {symbol: previous_close.get(symbol) or base_prices.get(symbol) for symbol in portfolio.symbols}
+    fallback = {symbol: price for symbol, price in fallback.items() if price is not None}
+    prices = closes.reindex(columns=portfolio.symbols).ffill().fillna(fallback)
+    if prices.empty or prices.isna().all().all():
+        return None
+
+    performance = calculate_performance_frame(
+        prices, base_prices, portfolio.investment_per_stock, portfolio.stocks, portfolio.benchmarks
+    )
+    last_bar = prices.index[-1]
+    days_invested = max((last_bar.normalize() - datetime.strptime(portfolio.base_date, '%Y-%m-%d')).days, 0)
+    record = build_day_record(performance, len(prices.index) - 1, day, last_bar.isoformat(), days_invested)
+    times = [time.strftime('%H:%M') for time in prices.index]
+    record['intraday'] = {'interval': interval, 'last_bar': times[-1]}
+    benchmarks = performance['benchmarks_returns']
+    series = {
+        'date': day,
+        'interval': interval,
+        'times': times,
+        'portfolio': performance['total_return'].round(4).tolist(),
+        # NaN becomes null, which Plotly draws as a gap
+        'benchmarks': {
+            symbol: [to_float(value) for value in benchmarks[symbol].round(4).tolist()]
+            for symbol in benchmarks.columns
+        },
+    }
+    return record, series
+
+def run_intraday(args, portfolios=None, history_stores=None, cache=None, store=None):
+    """
+    ריצה תוך-יומית: ממשיכה את המאגר התוך-יומי (ברים של 1m/5m לכל הסימבולים, ראה intraday_store.py),
+    מתמחרת כל תיק לכל בר של יום המסחר האחרון ומעדכנת את index.html, summary.html ו-intraday.html.
+    ההיסטוריה היומית נקראת (רשומת הבסיס וסגירת היום הקודם) אך אינה נכתבת.
+    :param portfolios: ברירת מחדל: התיק שב-config.py בלבד.
+    :param history_stores: / cache: / store: אופציונלי. מאגרים פתוחים לשימוש חוזר, כמו ב-run_daily.
+    """
+    portfolios = portfolios or [default_portfolio()]
+    multiple = len(portfolios) > 1
+    store = store or IntradayStore(interval=args.intraday)
+
+    if history_stores is None:
+        with span('load_history', portfolios=len(portfolios)):
+            history_stores = [portfolio.open_history_store() for portfolio in portfolios]
+    symbols = union_symbols(portfolios)
+    with span('fetch_intraday', symbols=len(symbols), interval=store.interval):
+        day = update_intraday_store(store, symbols)
+        base_prices = intraday_base_prices(portfolios, history_stores, cache=cache)
+    if day is None:
+        print("❌ שגיאה: אין ברים תוך-יומיים במאגר - לא ניתן לעדכן את הדוחות.")
+        return
+
+    closes = store.load_day(day)['close']
+    results = []
+    with span('reprice', portfolios=len(portfolios), bars=len(closes.index)):
+        for portfolio, history_store, portfolio_base in zip(portfolios, history_stores, base_prices):
+            results.append(reprice_intraday(portfolio, history_store, portfolio_base, closes, day, store.interval))
+
+    for portfolio, result in zip(portfolios, results):
+        if multiple:
+            print(f"📁 תיק {portfolio.name} ({portfolio.id}):")
+        if result is None:
+            print(f"❌ שגיאה: אין מחירים תוך-יומיים עבור {day}.")
+            continue
+        record, series = result
+        generate_reports(
+            record, [],
+            open_browser=not args.no_browser and not multiple, force=args.force_reports,
+            render_mode=args.render_mode, portfolio=portfolio,
+            pages=("index.html", "summary.html", "intraday.html"), intraday=series
+        )
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile_startup:
+        profile_startup()
+        return
+    if args.portfolios is None:
+        portfolios = [default_portfolio()]
+    else:
+        try:
+            portfolios = load_portfolios(ids=args.portfolios)
+        except ValueError as e:
+            print(f"❌ שגיאה: {e}")
+            return
+        if not portfolios:
+            print(f"❌ שגיאה: לא נמצאו הגדרות תיקים בתיקייה {config.PORTFOLIOS_DIR}.")
+            return
+    if args.daemon:
+        from daemon import run_daemon
+        if args.serve is not None:
+            from report_server import start_background_server
+            start_background_server(OUTPUT_DIR, port=args.serve)
+        run_daemon(args, portfolios)
+        return
+    run_name = (
+        'backfill' if args.backfill else 'render-only' if args.render_only
+        else 'intraday' if args.intraday else 'daily'
+    )
+    start_run(run_name, trace_memory=args.trace_memory or None)
+    history_stores = []
     try:
-        main_report_path = os.path.join(OUTPUT_DIR, "index.html")
-        if os.path.exists(main_report_path):
-            webbrowser.open(f"file:///{os.path.abspath(main_report_path)}")
-            print(f"🌐 הדוח הראשי נפתח אוטומטית: {os.path.abspath(main_report_path)}")
+        with span('load_history', portfolios=len(portfolios)):
+            history_stores = [portfolio.open_history_store() for portfolio in portfolios]
+        if args.backfill or args.render_only:
+            if args.backfill:
+                backfill_portfolios(portfolios, history_stores)
+            for portfolio, history_store in zip(portfolios, history_stores):
+                if len(portfolios) > 1:
+                    print(f"📁 תיק {portfolio.name} ({portfolio.id}):")
+                render_from_history(
+                    history_store, args, portfolio=portfolio,
+                    open_browser=not args.no_browser and len(portfolios) == 1
+                )
+        elif args.intraday:
+            run_intraday(args, portfolios, history_stores=history_stores)
         else:
-            print(f"אזהרה: קובץ הדוח הראשי לא נמצא בנתיב: {main_report_path}")
-    except Exception as e:
-        print(f"שגיאה בניסיון לפתוח את הדוח בדפדפן: {e}")
+            run_daily(args, portfolios, history_stores=history_stores)
+    finally:
+        # Writes pending changes; the JSON journal is compacted only when it is full (see JsonHistoryStore)
+        for history_store in history_stores:
+            history_store.close()
+        finish_run(print_summary=args.timings)
+    if args.serve is not None:
+        from report_server import serve_forever
+        serve_forever(OUTPUT_DIR, port=args.serve)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מנוע חישוב ביצועים וקטורי (NumPy/pandas).
+
+מקבל מטריצת מחירים (תאריכים × סימבולים) ווקטור מחירי בסיס, ומחשב בבת אחת
+את ביצועי המניות, התיק ומדדי הייחוס עבור כל התאריכים.
+זהו המקור היחיד לחישוב ביצועים - גם calculate_performance ב-main.py עוברת דרכו.
+"""
+
+import numpy as np
+import pandas as pd
+
+from history_model import to_float
+
+
+def calculate_performance_frame(price_matrix, base_prices, investment_per_stock, ai_stocks, benchmarks_symbols):
+    """
+    מחשב ביצועים לכל שורות מטריצת המחירים.
+    מניה עם מחיר בסיס או מחיר נוכחי חסר (או מחיר בסיס 0) נספרת בערך 0, כמו ב-calculate_performance המקורית.
+    :param price_matrix: DataFrame שהאינדקס שלו תאריכים והעמודות סימבולים.
+    :param base_prices: מילון או Series של {symbol: base_price}.
+    :return: מילון של DataFrame/Series:
+             quantity, current_value, profit_loss, percentage_return (תאריכים × מניות),
+             portfolio_value, total_profit, total_return (לכל תאריך),
+             benchmarks_returns, outperformance (תאריכים × מדדים),
+             prices, base_prices (הקלט לאחר יישור).
+    """
+    ai_stocks = list(ai_stocks)
+    benchmarks_symbols = list(benchmarks_symbols)
+    symbols = ai_stocks + [symbol for symbol in benchmarks_symbols if symbol not in ai_stocks]
+
+    prices = price_matrix.reindex(columns=symbols).astype(float)
+    base = pd.Series(base_prices, dtype=float).reindex(symbols)
+
+    # --- מניות התיק ---
+    stock_prices = prices[ai_stocks].to_numpy()
+    stock_base = base[ai_stocks].to_numpy()
+    valid_base = ~np.isnan(stock_base) & (stock_base != 0)
+    valid = valid_base[None, :] & ~np.isnan(stock_prices)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        quantity_per_stock = np.where(valid_base, investment_per_stock / stock_base, 0.0)
+    quantity = np.where(valid, quantity_per_stock[None, :], 0.0)
+    current_value = np.where(valid, quantity * np.nan_to_num(stock_prices), 0.0)
+    profit_loss = np.where(valid, current_value - investment_per_stock, 0.0)
+    percentage_return = (profit_loss / investment_per_stock) * 100
+
+    total_investment = len(ai_stocks) * investment_per_stock
+    portfolio_value = current_value.sum(axis=1)
+    total_profit = portfolio_value - total_investment
+    total_return = (total_profit / total_investment) * 100 if total_investment != 0 else np.zeros_like(total_profit)
+
+    # --- מדדי ייחוס ---
+    bench_prices = prices[benchmarks_symbols].to_numpy()
+    bench_base = base[benchmarks_symbols].to_numpy()
+    bench_base = np.where(bench_base == 0, np.nan, bench_base)
+    benchmarks_returns = ((bench_prices - bench_base[None, :]) / bench_base[None, :]) * 100
+    outperformance = total_return[:, None] - benchmarks_returns
+
+    index = prices.index
+
+    def stock_frame(values):
+        return pd.DataFrame(values, index=index, columns=ai_stocks)
+
+    def bench_frame(values):
+        return pd.DataFrame(values, index=index, columns=benchmarks_symbols)
+
+    return {
+        'quantity': stock_frame(quantity),
+        'current_value': stock_frame(current_value),
+        'profit_loss': stock_frame(profit_loss),
+        'percentage_return': stock_frame(percentage_return),
+        'valid': stock_frame(valid),
+        'portfolio_value': pd.Series(portfolio_value, index=index),
+        'total_profit': pd.Series(total_profit, index=index),
+        'total_return': pd.Series(total_return, index=index),
+        'benchmarks_returns': bench_frame(benchmarks_returns),
+        'outperformance': bench_frame(outperformance),
+        'prices': prices,
+        'base_prices': base,
+        'investment_per_stock': investment_per_stock,
+    }
+
+
+def _row_values(frame, row, columns=None):
+    """
+    שורה אחת של DataFrame כרשימת float של פייתון (to_numpy ללא העתקה, tolist בפעולה אחת).
+    שליפה של שורות שלמות במקום תא-תא היא מה ששומר על עלות ליניארית במספר המניות ביקום של אלפי סימבולים;
+    אותו עיקרון משמש את price_providers.bars_at ואת ColumnarHistoryStore._stock_values.
+    """
+    values = frame.to_numpy()[row]
+    if columns is not None:
+        values = values[frame.columns.get_indexer(columns)]
+    return values.tolist()
+
+
+def performance_snapshot(performance, row):
+    """
+    ממיר שורה אחת מתוצאת calculate_performance_frame למילון במבנה של calculate_performance.
+    :param row: מיקום השורה (int) במטריצה.
+    """
+    investment_per_stock = performance['investment_per_stock']
+    stocks = list(performance['quantity'].columns)
+    base = performance['base_prices'][stocks].tolist()
+    current = _row_values(performance['prices'], row, stocks)
+    valid = performance['valid'].to_numpy()[row].tolist()
+    quantity = _row_values(performance['quantity'], row)
+    current_value = _row_values(performance['current_value'], row)
+    profit_loss = _row_values(performance['profit_loss'], row)
+    percentage_return = _row_values(performance['percentage_return'], row)
+
+    stocks_performance = []
+    for j, symbol in enumerate(stocks):
+        if valid[j]:
+            stocks_performance.append({
+                'symbol': symbol,
+                'base_price': base[j],
+                'current_price': current[j],
+                'quantity': quantity[j],
+                'investment_amount': investment_per_stock,
+                'current_value': current_value[j],
+                'profit_loss': profit_loss[j],
+                'percentage_return': percentage_return[j]
+            })
+        else:
+            # Missing prices are shown as 0
+            stocks_performance.append({
+                'symbol': symbol,
+                'base_price': to_float(base[j]) or 0,
+                'current_price': to_float(current[j]) or 0,
+                'quantity': 0,
+                'investment_amount': investment_per_stock,
+                'current_value': 0,
+                'profit_loss': 0,
+                'percentage_return': 0
+            })
+
+    total_return = float(performance['total_return'].iat[row])
+    benchmarks_returns = {}
+    outperformance = {}
+    benchmark_symbols = list(performance['benchmarks_returns'].columns)
+    for symbol, value in zip(benchmark_symbols, _row_values(performance['benchmarks_returns'], row)):
+        benchmark_return = to_float(value)
+        benchmarks_returns[symbol] = benchmark_return
+        outperformance[symbol] = {
+            'benchmark_return': benchmark_return,
+            'portfolio_return': total_return,
+            'outperformance': None if benchmark_return is None else total_return - benchmark_return
+        }
+
+    return {
+        'portfolio_value': float(performance['portfolio_value'].iat[row]),
+        'total_profit': float(performance['total_profit'].iat[row]),
+        'total_return': total_return,
+        'stocks_performance': stocks_performance,
+        'benchmarks_returns': benchmarks_returns,
+        'outperformance': outperformance
+    }
+
+
+def build_day_record(performance, row, date_str, timestamp, days_invested):
+    """
+    בונה רשומת היסטוריה מלאה (במבנה של history_data.json) עבור שורה אחת.
+    :param timestamp: מחרוזת ISO של זמן הרשומה.
+    """
+    snapshot = performance_snapshot(performance, row)
+    benchmarks_symbols = list(performance['benchmarks_returns'].columns)
+    current = _row_values(performance['prices'], row, benchmarks_symbols)
+    base = performance['base_prices'][benchmarks_symbols].tolist()
+    return {
+        "date": date_str,
+        "timestamp": timestamp,
+        "portfolio_value": snapshot['portfolio_value'],
+        "total_profit": snapshot['total_profit'],
+        "total_return": snapshot['total_return'],
+        "days_invested": days_invested,
+        "benchmarks_returns": snapshot['benchmarks_returns'],
+        "outperformance": snapshot['outperformance'],
+        "stocks_performance": snapshot['stocks_performance'],
+        "benchmarks_current_prices": {
+            symbol: to_float(value) for symbol, value in zip(benchmarks_symbols, current)
+        },
+        "benchmarks_base_prices": {
+            symbol: to_float(value) for symbol, value in zip(benchmarks_symbols, base)
+        }
+    }
+
+
+def build_history_records(performance, base_date):
+    """
+    בונה רשומות היסטוריה לכל התאריכים במטריצה.
+    :param base_date: תאריך הבסיס בפורמט 'YYYY-MM-DD', לחישוב days_invested.
+    :return: רשימת רשומות ממוינת לפי תאריך.
+    """
+    base_date_ts = pd.Timestamp(base_date)
+    records = []
+    for row, day in enumerate(pd.DatetimeIndex(performance['prices'].index)):
+        days_invested = max((day.normalize() - base_date_ts).days, 0)
+        records.append(build_day_record(
+            performance, row, day.strftime('%Y-%m-%d'), day.isoformat(), days_invested
+        ))
+    records.sort(key=lambda x: x['date'])
+    return records
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+רישום תיקים: הגדרת כמה תיקים בקבצי JSON בתיקייה config.PORTFOLIOS_DIR, קובץ לכל תיק.
+
+    portfolios/top_ai_10.json
+    {
+        "name": "TOP AI 10",
+        "base_date": "2025-06-12",
+        "investment_per_stock": 100,
+        "stocks": ["ANET", "AVGO", ...],
+        "benchmarks": ["SPY", "QQQ", "TQQQ"]
+    }
+
+מזהה התיק הוא שם הקובץ (ללא סיומת). שדות שלא הוגדרו נלקחים מ-config.py.
+לכל תיק היסטוריה משלו תחת config.PORTFOLIOS_DATA_DIR/<id> ותיקיית דוחות <reports>/<id>.
+התיק המקורי שמוגדר ב-config.py זמין כ-default_portfolio() וממשיך להשתמש בנתיבים המקוריים.
+"""
+
+import os
+import json
+from dataclasses import dataclass
+from datetime import datetime
+
+import config
+from history_store import open_history_store
+
+
+@dataclass(frozen=True)
+class Portfolio:
+    """הגדרת תיק אחד."""
+
+    id: str
+    name: str
+    stocks: tuple
+    benchmarks: tuple
+    investment_per_stock: float
+    base_date: str
+    # None = הנתיבים המקוריים של config.py (התיק היחיד שהיה קיים לפני הרישום)
+    data_dir: str | None = None
+
+    @property
+    def symbols(self):
+        """המניות ומדדי הייחוס, ללא כפילויות, לפי הסדר."""
+        return list(dict.fromkeys(self.stocks + self.benchmarks))
+
+    def open_history_store(self):
+        """פותח את מאגר ההיסטוריה של התיק (לפי config.HISTORY_BACKEND)."""
+        if self.data_dir is None:
+            return open_history_store()
+        if config.HISTORY_BACKEND == 'columnar':
+            return open_history_store(path=os.path.join(self.data_dir, "history"))
+        return open_history_store(path=os.path.join(self.data_dir, "history_data.json"))
+
+    def reports_dir(self, output_dir):
+        """תיקיית הדוחות של התיק בתוך תיקיית הדוחות הראשית."""
+        return output_dir if self.data_dir is None else os.path.join(output_dir, self.id)
+
+
+def default_portfolio():
+    """התיק שמוגדר ב-config.py."""
+    return Portfolio(
+        id="default",
+        name=config.PORTFOLIO_NAME,
+        stocks=tuple(config.AI_STOCKS),
+        benchmarks=tuple(config.BENCHMARK_SYMBOLS),
+        investment_per_stock=config.INVESTMENT_PER_STOCK,
+        base_date=config.BASE_DATE,
+    )
+
+
+def load_portfolio(path):
+    """טוען הגדרת תיק מקובץ JSON. שגיאת ValueError אם ההגדרה לא תקינה."""
+    portfolio_id = os.path.splitext(os.path.basename(path))[0]
+    with open(path, 'r', encoding='utf-8') as f:
+        try:
+            definition = json.load(f)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"קובץ התיק {path} אינו JSON תקין: {e}") from e
+    stocks = definition.get('stocks')
+    if not stocks or not isinstance(stocks, list):
+        raise ValueError(f"בקובץ התיק {path} חסרה רשימת מניות ('stocks').")
+    base_date = definition.get('base_date', config.BASE_DATE)
+    try:
+        datetime.strptime(base_date, '%Y-%m-%d')
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"תאריך בסיס לא תקין בקובץ התיק {path}: {base_date}") from e
+    return Portfolio(
+        id=portfolio_id,
+        name=definition.get('name', portfolio_id),
+        stocks=tuple(stocks),
+        benchmarks=tuple(definition.get('benchmarks', config.BENCHMARK_SYMBOLS)),
+        investment_per_stock=definition.get('investment_per_stock', config.INVESTMENT_PER_STOCK),
+        base_date=base_date,
+        data_dir=os.path.join(config.PORTFOLIOS_DATA_DIR, portfolio_id),
+    )
+
+
+def load_portfolios(directory=None, ids=None):
+    """
+    טוען את כל התיקים מתיקיית ההגדרות, ממוינים לפי מזהה.
+    :param ids: אופציונלי. רק התיקים האלה (שגיאה אם אחד מהם לא קיים).
+    """
+    directory = directory or config.PORTFOLIOS_DIR
+    paths = {}
+    if os.path.isdir(directory):
+        for name in sorted(os.listdir(directory)):
+            if name.endswith('.json'):
+                paths[os.path.splitext(name)[0]] = os.path.join(directory, name)
+    if ids:
+        unknown = [portfolio_id for portfolio_id in ids if portfolio_id not in paths]
+        if unknown:
+            raise ValueError(f"תיקים לא מוכרים בתיקייה {directory}: {', '.join(unknown)}")
+        paths = {portfolio_id: paths[portfolio_id] for portfolio_id in ids}
+    return [load_portfolio(path) for path in paths.values()]
+
+
+def union_symbols(portfolios):
+    """כל הסימבולים של כל התיקים, כל סימבול פעם אחת, לפי סדר הופעתו."""
+    return list(dict.fromkeys(symbol for portfolio in portfolios for symbol in portfolio.symbols))
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מטמון מקומי (SQLite) למחירי OHLCV לפי (סימבול, תאריך).
+"""
+
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import config
+from history_model import to_float
+
+OHLCV_FIELDS = ('open', 'high', 'low', 'close', 'volume')
+
+
+def cache_path(provider=None):
+    """
+    קובץ המטמון של ספק מחירים: למחירי yfinance config.PRICE_CACHE_FILE, ולכל ספק אחר קובץ משלו לצידו
+    (למשל data/price_cache.stub.sqlite), כך שמחירים סינתטיים או מקבצי fixture לא מוגשים לריצה מול השוק.
+    :param provider: שם הספק (ברירת מחדל: ספק המחירים הנוכחי של התהליך).
+    """
+    if provider is None:
+        from price_providers import current_provider_name
+        provider = current_provider_name()
+    if provider == 'yfinance':
+        return config.PRICE_CACHE_FILE
+    root, ext = os.path.splitext(config.PRICE_CACHE_FILE)
+    return f"{root}.{provider}{ext}"
+
+
+class PriceCache:
+    """
+    מטמון מחירים מתמיד על הדיסק, קובץ לכל ספק מחירים (ראה cache_path).
+    מחירים של ימי מסחר שהסתיימו לא משתנים, ולכן נשמרים לצמיתות (final).
+    בר של יום המסחר הנוכחי שנמשך לפני הסגירה עוד משתנה: הוא נשמר כזמני ונחשב טרי
+    רק למשך config.PRICE_CACHE_TTL_SECONDS - גם כשמבקשים אותו לפי תאריך, וגם אחרי שהיום עבר.
+    """
+
+    def __init__(self, path=None, provider=None):
+        self.path = path or cache_path(provider)
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        self._conn = sqlite3.connect(self.path)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS prices (
+                symbol TEXT NOT NULL,
+                date TEXT NOT NULL,
+                open REAL,
+                high REAL,
+                low REAL,
+                close REAL,
+                volume REAL,
+                fetched_at REAL NOT NULL,
+                final INTEGER NOT NULL DEFAULT 1,
+                PRIMARY KEY (symbol, date)
+            )
+            """
+        )
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(prices)")]
+        if 'final' not in columns:
+            # Caches created before the column existed: their rows are treated as final, as they were
+            self._conn.execute("ALTER TABLE prices ADD COLUMN final INTEGER NOT NULL DEFAULT 1")
+        # איזה בר הוחזר לאחרונה כ"מחיר אחרון" עבור כל סימבול, ומתי
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS latest_bars (
+                symbol TEXT PRIMARY KEY,
+                date TEXT NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+        self._batch_depth = 0
+
+    @contextmanager
+    def batch(self):
+        """מאחד את כל קריאות put_bars בבלוק ל-commit יחיד בסופו (למשל טווח של מאות ימים × אלפי סימבולים)."""
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self._conn.commit()
+
+    def close(self):
+        self._conn.close()
+
+    def get_closes(self, symbols, date_str, max_age_seconds=None):
+        """
+        מחזיר {symbol: close} רק עבור הסימבולים שנמצאו במטמון לתאריך הנתון.
+        בר זמני (שנמשך לפני סגירת יומו) מוחזר רק אם נמשך לפני פחות מ-max_age_seconds.
+        """
+        if not symbols:
+            return {}
+        if max_age_seconds is None:
+            max_age_seconds = config.PRICE_CACHE_TTL_SECONDS
+        placeholders = ",".join("?" for _ in symbols)
+        rows = self._conn.execute(
+            f"SELECT symbol, close FROM prices WHERE date = ? AND close IS NOT NULL "
+            f"AND (final = 1 OR fetched_at >= ?) AND symbol IN ({placeholders})",
+            [date_str, time.time() - max_age_seconds, *symbols],
+        ).fetchall()
+        return {symbol: close for symbol, close in rows}
+
+    def get_latest_closes(self, symbols, max_age_seconds=None):
+        """
+        מחזיר {symbol: close} של הבר האחרון לכל סימבול, בתנאי שנמשך לפני פחות מ-max_age_seconds.
+        """
+        if not symbols:
+            return {}
+        if max_age_seconds is None:
+            max_age_seconds = config.PRICE_CACHE_TTL_SECONDS
+        min_fetched_at = time.time() - max_age_seconds
+        placeholders = ",".join("?" for _ in symbols)
+        rows = self._conn.execute(
+            f"""
+            SELECT p.symbol, p.close FROM latest_bars l
+            JOIN prices p ON p.symbol = l.symbol AND p.date = l.date
+            WHERE l.symbol IN ({placeholders}) AND l.fetched_at >= ? AND p.close IS NOT NULL
+            """,
+            [*symbols, min_fetched_at],
+        ).fetchall()
+        return {symbol: close for symbol, close in rows}
+
+    def put_bars(self, bars, date_str, latest=False):
+        """
+        שומר ברים למטמון.
+        :param bars: מילון {symbol: {'open':..., 'high':..., 'low':..., 'close':..., 'volume':...}}.
+        :param date_str: תאריך הבר בפורמט 'YYYY-MM-DD'.
+        :param latest: האם אלו ברים שנמשכו כ"מחיר אחרון" (כפופים ל-TTL).
+        """
+        now = time.time()
+        final = int(bar_is_final(date_str))
+        rows = [
+            (symbol, date_str, *(to_float(bar.get(field)) for field in OHLCV_FIELDS), now, final)
+            for symbol, bar in bars.items()
+            if bar and bar.get('close') is not None
+        ]
+        if not rows:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO prices (symbol, date, open, high, low, close, volume, fetched_at, final) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            rows,
+        )
+        if latest:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO latest_bars (symbol, date, fetched_at) VALUES (?, ?, ?)",
+                [(row[0], date_str, now) for row in rows],
+            )
+        if not self._batch_depth:
+            self._conn.commit()
+
+
+def bar_is_final(date_str, now=None):
+    """
+    האם בר יומי של date_str הוא סופי: יום המסחר שלו הסתיים בזמן השוק (config.MARKET_TIMEZONE / MARKET_CLOSE).
+    :param now: השעה בזמן השוק (ברירת מחדל: עכשיו).
+    """
+    from intraday_store import market_now
+
+    now = now or market_now()
+    today = now.strftime('%Y-%m-%d')
+    return date_str < today or (date_str == today and now.strftime('%H:%M') >= config.MARKET_CLOSE)
@@ -0,0 +1,513 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+ספקי מחירים - ממשק אחיד למשיכת ברים של OHLCV עבור סימבולים × תאריכים.
+
+כל ספק מחזיר "מסגרות ברים": מילון {field: DataFrame} עבור השדות ב-OHLCV_FIELDS
+(לפחות 'close'), שבו האינדקס הוא תאריכים מנורמלים (ללא שעה ואזור זמן) והעמודות הן סימבולים.
+ברים תוך-יומיים (get_intraday_bars) מאונדקסים לפי זמן תחילת הבר בזמן השוק (config.MARKET_TIMEZONE), ללא אזור זמן.
+
+מימושים:
+- YFinanceProvider: Yahoo Finance דרך yf.download.
+- FixtureProvider: תיקיית קבצי CSV/Parquet, קובץ לכל סימבול (<SYMBOL>.csv / <SYMBOL>.parquet).
+- StubProvider: מחירים בזיכרון (למדידות ובדיקות דטרמיניסטיות ללא רשת).
+"""
+
+import os
+import re
+import ast
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timedelta
+from typing import Protocol
+
+import config
+from history_model import to_float
+from price_cache import OHLCV_FIELDS
+
+
+class PriceProvider(Protocol):
+    """
+    ממשק לספק מחירים.
+    סימבולים שנכשלו בשגיאה זמנית בתוך בקשה שהצליחה מדווחים ב-RetryableFetchError, כדי שרק הם יימשכו שוב.
+    """
+
+    name: str
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        """
+        מחזיר מסגרות ברים לכל ימי המסחר בטווח.
+        :param start_date_str: 'YYYY-MM-DD' (כולל).
+        :param end_date_str: 'YYYY-MM-DD' (לא כולל).
+        """
+
+    def get_intraday_bars(self, symbols, start, end, interval):
+        """
+        מחזיר מסגרות ברים תוך-יומיות בטווח.
+        :param start: / end: datetime בזמן השוק (start כולל, end לא כולל).
+        :param interval: '1m' או '5m'.
+        """
+
+
+class RetryableFetchError(Exception):
+    """
+    משיכה שהצליחה בחלקה: הסימבולים ב-symbols נכשלו בשגיאה זמנית (רשת, הגבלת קצב) וכדאי לנסות אותם שוב.
+    :param result: מה שכן התקבל - מסגרות ברים (מספק) או {symbol: bar} (ממקטע של fetch_concurrently).
+    """
+
+    def __init__(self, symbols, result, message=None):
+        self.symbols = list(symbols)
+        self.result = result
+        super().__init__(message or f"משיכה נכשלה עבור: {', '.join(self.symbols)}")
+
+
+def empty_frames(symbols):
+    """מסגרות ברים ריקות עבור הסימבולים."""
+    import pandas as pd
+
+    return {field: pd.DataFrame(columns=list(symbols), dtype=float) for field in OHLCV_FIELDS}
+
+
+def bars_at(frames, row):
+    """
+    מחלץ את הברים של שורה אחת ממסגרות הברים.
+    :param row: מיקום השורה (0 לראשונה, -1 לאחרונה).
+    :return: מילון {symbol: {'open':..., 'high':..., 'low':..., 'close':..., 'volume':...}}
+             רק עבור סימבולים שיש להם מחיר סגירה בשורה זו.
+    """
+    closes = frames['close']
+    bars = {}
+    if closes.empty:
+        return bars
+    symbols = list(closes.columns)
+    rows = {}
+    for field in OHLCV_FIELDS:
+        frame = frames.get(field)
+        if frame is not None:
+            rows[field] = dict(zip(frame.columns, frame.to_numpy(dtype=float)[row].tolist()))
+    close_row = rows['close']
+    for symbol in symbols:
+        close = to_float(close_row[symbol])
+        if close is None:
+            continue
+        bar = {'close': close}
+        for field in OHLCV_FIELDS:
+            if field != 'close' and field in rows and symbol in rows[field]:
+                bar[field] = to_float(rows[field][symbol])
+        bars[symbol] = bar
+    return bars
+
+
+def _normalize_index(frame):
+    import pandas as pd
+
+    frame.index = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+    return frame
+
+
+def _normalize_intraday_index(frame):
+    """אינדקס זמני ברים בזמן השוק, ללא אזור זמן (זמנים עם אזור זמן מומרים ל-config.MARKET_TIMEZONE)."""
+    import pandas as pd
+
+    index = pd.DatetimeIndex(frame.index)
+    if index.tz is not None:
+        index = index.tz_convert(config.MARKET_TIMEZONE).tz_localize(None)
+    frame.index = index
+    return frame
+
+
+def session_times(day, interval):
+    """זמני תחילת הברים של יום מסחר, משעת הפתיחה ועד הסגירה (config.MARKET_OPEN / MARKET_CLOSE)."""
+    import pandas as pd
+
+    day = pd.Timestamp(day).normalize()
+    start = day + pd.Timedelta(config.MARKET_OPEN + ':00')
+    end = day + pd.Timedelta(config.MARKET_CLOSE + ':00')
+    return pd.date_range(start, end, freq=pd.Timedelta(interval.replace('m', 'min')), inclusive='left')
+
+
+class _DownloadErrors(logging.Handler):
+    """
+    אוסף את השגיאות לכל טיקר ש-yf.download מדווח ביומן 'yfinance' ("['NVDA', 'TSLA']: <error>") -
+    הוא אינו זורק חריגה על טיקר שנכשל, אלא מחזיר עבורו עמודה ריקה.
+    רק רשומות מהתהליכון שקרא ל-download נאספות, כך שהורדות מקבילות לא מתערבבות.
+    """
+
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.thread = threading.get_ident()
+        self.errors = {}
+
+    def emit(self, record):
+        if record.thread != self.thread:
+            return
+        match = re.match(r"\s*(\[.*?\]):\s*(.*)", record.getMessage(), re.DOTALL)
+        if not match:
+            return
+        try:
+            symbols = ast.literal_eval(match.group(1))
+        except (ValueError, SyntaxError):
+            return
+        for symbol in symbols:
+            self.errors[str(symbol).upper()] = match.group(2).strip()
+
+
+class YFinanceProvider:
+    """
+    ספק מחירים מ-Yahoo Finance.
+    טיקר שחזר ריק אחרי שגיאת הורדה מדווח ב-RetryableFetchError, אלא אם Yahoo ענה שאין לו נתונים
+    (למשל 'possibly delisted; no price data found' ליום ללא מסחר) - תשובה כזו לא משתנה בניסיון נוסף.
+    """
+
+    name = 'yfinance'
+    # Yahoo's answers for a ticker or range without data
+    FINAL_ERRORS = ('delisted', 'no price data', 'no timezone', 'invalid')
+
+    def _download(self, symbols, normalize=_normalize_index, **kwargs):
+        import yfinance as yf
+        import pandas as pd
+
+        logger = logging.getLogger('yfinance')
+        errors = _DownloadErrors()
+        logger.addHandler(errors)
+        try:
+            # Removed show_errors=True as it's not supported by all yfinance versions
+            data = yf.download(list(symbols), progress=False, **kwargs)
+        finally:
+            logger.removeHandler(errors)
+        frames = empty_frames(symbols)
+        if not data.empty and 'Close' in data.columns:
+            frames = {}
+            for field in OHLCV_FIELDS:
+                column_name = field.capitalize()
+                if column_name not in data.columns:
+                    continue
+                column = data[column_name]
+                if isinstance(column, pd.Series): # Single stock series
+                    column = column.to_frame(name=symbols[0])
+                frames[field] = normalize(column.reindex(columns=list(symbols)).astype(float))
+
+        closes = frames['close']
+        failed = {}
+        for symbol in symbols:
+            error = errors.errors.get(symbol.upper())
+            if error and not any(marker in error.lower() for marker in self.FINAL_ERRORS) and closes[symbol].isna().all():
+                failed[symbol] = error
+        if failed:
+            details = '; '.join(f"{symbol}: {error}" for symbol, error in failed.items())
+            raise RetryableFetchError(failed, frames, details)
+        return frames
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        return self._download(symbols, start=start_date_str, end=end_date_str)
+
+    def get_intraday_bars(self, symbols, start, end, interval):
+        # Naive start/end are interpreted in each ticker's exchange time zone
+        return self._download(symbols, normalize=_normalize_intraday_index, start=start, end=end, interval=interval)
+
+
+class FixtureProvider:
+    """
+    ספק מחירים מתיקיית קבצים: <SYMBOL>.parquet או <SYMBOL>.csv עם עמודת Date
+    ועמודות Open/High/Low/Close/Volume (לפחות Close).
+    ברים תוך-יומיים: <SYMBOL>.<interval>.parquet / .csv (למשל NVDA.5m.csv) עם עמודת Datetime.
+    """
+
+    name = 'fixture'
+
+    def __init__(self, directory=None):
+        self.directory = directory or config.PRICE_FIXTURE_DIR
+        self._frames = {}
+
+    def _load_symbol(self, symbol, interval=None):
+        import pandas as pd
+
+        name = f"{symbol}.{interval}" if interval else symbol
+        if name not in self._frames:
+            parquet_path = os.path.join(self.directory, f"{name}.parquet")
+            csv_path = os.path.join(self.directory, f"{name}.csv")
+            index_column = 'Datetime' if interval else 'Date'
+            if os.path.exists(parquet_path):
+                frame = pd.read_parquet(parquet_path)
+            elif os.path.exists(csv_path):
+                frame = pd.read_csv(csv_path)
+            else:
+                print(f"אזהרה: אין קובץ מחירים עבור {name} בתיקייה {self.directory}.")
+                frame = pd.DataFrame(columns=[index_column, 'Close'])
+            if index_column in frame.columns:
+                frame = frame.set_index(index_column)
+            frame.columns = [str(column).lower() for column in frame.columns]
+            normalize = _normalize_intraday_index if interval else _normalize_index
+            self._frames[name] = normalize(frame).sort_index()
+        return self._frames[name]
+
+    def _frames_for(self, symbols, select, interval=None):
+        import pandas as pd
+
+        frames = {}
+        for field in OHLCV_FIELDS:
+            columns = {}
+            for symbol in symbols:
+                data = select(self._load_symbol(symbol, interval))
+                if field in data.columns:
+                    columns[symbol] = data[field].astype(float)
+            if field == 'close' or columns:
+                frames[field] = pd.DataFrame(columns, columns=list(symbols)).sort_index()
+        return frames
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        start, end = datetime.strptime(start_date_str, '%Y-%m-%d'), datetime.strptime(end_date_str, '%Y-%m-%d')
+        return self._frames_for(symbols, lambda frame: frame[(frame.index >= start) & (frame.index < end)])
+
+    def get_intraday_bars(self, symbols, start, end, interval):
+        return self._frames_for(symbols, lambda frame: frame[(frame.index >= start) & (frame.index < end)], interval)
+
+
+class StubProvider:
+    """
+    ספק מחירים בזיכרון.
+    :param closes: DataFrame של מחירי סגירה (אינדקס תאריכים, עמודה לכל סימבול).
+    """
+
+    name = 'stub'
+
+    def __init__(self, closes):
+        self.closes = _normalize_index(closes.astype(float).copy()).sort_index()
+
+    @classmethod
+    def synthetic(cls, symbols, start_date_str, end_date_str=None, seed=0):
+        """יוצר ספק עם מחירי סגירה סינתטיים (הילוך מקרי גיאומטרי) בכל ימי העסקים בטווח."""
+        import numpy as np
+        import pandas as pd
+
+        end_date_str = end_date_str or (datetime.now() + timedelta(days=1)).strftime('%Y-%m-%d')
+        dates = pd.bdate_range(start_date_str, end_date_str, inclusive='left')
+        rng = np.random.default_rng(seed)
+        returns = rng.normal(0.0005, 0.02, size=(len(dates), len(symbols)))
+        start_prices = rng.uniform(20, 800, size=len(symbols))
+        closes = start_prices * np.exp(np.cumsum(returns, axis=0))
+        return cls(pd.DataFrame(closes, index=dates, columns=list(symbols)))
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        start, end = datetime.strptime(start_date_str, '%Y-%m-%d'), datetime.strptime(end_date_str, '%Y-%m-%d')
+        closes = self.closes[(self.closes.index >= start) & (self.closes.index < end)]
+        return {'close': closes.reindex(columns=list(symbols))}
+
+    def get_intraday_bars(self, symbols, start, end, interval):
+        """ברים סינתטיים: בכל יום מסחר המחיר נע בקו ישר מהסגירה הקודמת לסגירת היום, לאורך שעות המסחר."""
+        import numpy as np
+        import pandas as pd
+
+        closes = self.closes.reindex(columns=list(symbols))
+        start, end = pd.Timestamp(start), pd.Timestamp(end)
+        parts = []
+        for row in range(1, len(closes.index)):
+            day = closes.index[row]
+            if day < start.normalize() or day > end:
+                continue
+            times = session_times(day, interval)
+            times = times[(times >= start) & (times < end)]
+            if times.empty:
+                continue
+            session = session_times(day, interval)
+            fraction = (session.get_indexer(times) + 1) / len(session)
+            previous, close = closes.iloc[row - 1].to_numpy(), closes.iloc[row].to_numpy()
+            parts.append(pd.DataFrame(previous + np.outer(fraction, close - previous), index=times, columns=closes.columns))
+        if not parts:
+            return {'close': pd.DataFrame(columns=list(symbols), dtype=float)}
+        return {'close': pd.concat(parts)}
+
+
+def fetch_concurrently(fetch_chunk, symbols, chunk_size=None, max_workers=None,
+                       retries=None, backoff_seconds=None, deadline_seconds=None, retry_chunk_size=None):
+    """
+    מושך ברים במקטעים מקבילים. סימבולים שמשיכתם נכשלה בשגיאה (ורק הם) נמשכים שוב בהשהיה אקספוננציאלית,
+    עד מספר הניסיונות או עד המועד האחרון - כך שסימבול בעייתי אחד לא מעכב או מפיל את השאר.
+    שגיאה היא חריגה שנזרקה מהמקטע (כל סימבולי המקטע), או הסימבולים שב-RetryableFetchError (השאר התקבלו).
+    סימבול שהמקטע שלו הוחזר בהצלחה אך ללא נתונים ('missing') הוא תשובה סופית ואינו נמשך שוב.
+    :param chunk_size: גודל מקטע בניסיון הראשון (ברירת מחדל: config.PRICE_FETCH_CHUNK_SIZE; None = מקטע אחד).
+    :param retry_chunk_size: גודל מקטע בניסיונות החוזרים, כדי לבודד סימבול בעייתי (config.PRICE_FETCH_RETRY_CHUNK_SIZE).
+    :param fetch_chunk: פונקציה שמקבלת רשימת סימבולים ומחזירה {symbol: bar}.
+    :return: (bars, status) - status הוא {symbol: 'ok' | 'missing' | 'error' | 'timeout'}.
+    """
+    chunk_size = chunk_size or config.PRICE_FETCH_CHUNK_SIZE
+    retry_chunk_size = retry_chunk_size or config.PRICE_FETCH_RETRY_CHUNK_SIZE
+    max_workers = max_workers or config.PRICE_FETCH_MAX_WORKERS
+    retries = config.PRICE_FETCH_RETRIES if retries is None else retries
+    backoff_seconds = config.PRICE_FETCH_BACKOFF_SECONDS if backoff_seconds is None else backoff_seconds
+    deadline_seconds = deadline_seconds or config.PRICE_FETCH_DEADLINE_SECONDS
+
+    deadline = time.monotonic() + deadline_seconds
+    bars, status = {}, {}
+    pending = list(dict.fromkeys(symbols))
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        for attempt in range(retries + 1):
+            if not pending:
+                break
+            if attempt:
+                delay = backoff_seconds * 2 ** (attempt - 1)
+                if time.monotonic() + delay >= deadline:
+                    break
+                print(f"🔁 ניסיון {attempt + 1} עבור {', '.join(pending)} בעוד {delay:.1f} שניות...")
+                time.sleep(delay)
+
+            size = (retry_chunk_size if attempt else chunk_size) or len(pending)
+            chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+            futures = {executor.submit(fetch_chunk, chunk): chunk for chunk in chunks}
+            done, not_done = wait(futures, timeout=max(deadline - time.monotonic(), 0))
+
+            failed = set()
+            for future in done:
+                chunk = futures[future]
+                try:
+                    chunk_bars = future.result()
+                    chunk_failed = set()
+                except RetryableFetchError as e:
+                    print(f"⚠️ שגיאה במשיכת {', '.join(e.symbols)}: {e}")
+                    chunk_bars = e.result
+                    chunk_failed = set(e.symbols)
+                except Exception as e:
+                    print(f"⚠️ שגיאה במשיכת {', '.join(chunk)}: {e}")
+                    chunk_bars = {}
+                    chunk_failed = set(chunk)
+                for symbol in chunk:
+                    if symbol in chunk_failed:
+                        status[symbol] = 'error'
+                        failed.add(symbol)
+                    elif symbol in chunk_bars:
+                        bars[symbol] = chunk_bars[symbol]
+                        status[symbol] = 'ok'
+                    else:
+                        status[symbol] = 'missing'
+            for future in not_done:
+                for symbol in futures[future]:
+                    status[symbol] = 'timeout'
+            if not_done:
+                print(f"⏱️ חלף המועד האחרון למשיכת מחירים ({deadline_seconds} שניות).")
+                break
+            pending = [symbol for symbol in pending if symbol in failed]
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+    return bars, status
+
+
+def plan_fetch_ranges(intervals, max_gap_days=None):
+    """
+    מאחד את מרווחי התאריכים שריצה צריכה למספר מינימלי של טווחי הורדה: מרווחים חופפים,
+    צמודים או שהפער ביניהם עד max_gap_days ימים מאוחדים לטווח אחד.
+    :param intervals: רשימת (start_date_str, end_date_str) כוללים; תאריך בודד הוא (d, d).
+    :return: רשימת (start_date_str, end_date_str) ממוינת, שבה end לא כולל (כמו ב-get_bars).
+    """
+    max_gap_days = config.PRICE_PLAN_MAX_GAP_DAYS if max_gap_days is None else max_gap_days
+    parsed = sorted(
+        (datetime.strptime(start, '%Y-%m-%d'), datetime.strptime(end, '%Y-%m-%d'))
+        for start, end in intervals
+    )
+    ranges = []
+    for start, end in parsed:
+        if ranges and (start - ranges[-1][1]).days <= max_gap_days + 1:
+            ranges[-1][1] = max(ranges[-1][1], end)
+        else:
+            ranges.append([start, end])
+    return [
+        (start.strftime('%Y-%m-%d'), (end + timedelta(days=1)).strftime('%Y-%m-%d'))
+        for start, end in ranges
+    ]
+
+
+def fetch_ranges(provider, symbols, ranges, **options):
+    """
+    מושך את כל טווחי ההורדה עבור כל הסימבולים (במקטעים מקביליים דרך fetch_concurrently)
+    ומאחד את התוצאות למסגרות ברים אחת.
+    :param ranges: פלט של plan_fetch_ranges.
+    :return: (frames, status) - status כמו ב-fetch_concurrently; סימבול 'ok' אם יש לו מחיר כלשהו בטווחים.
+    """
+    part_fetchers = [lambda chunk, start=start, end=end: provider.get_bars(chunk, start, end) for start, end in ranges]
+    return _fetch_parts(part_fetchers, symbols, **options)
+
+
+def fetch_intraday(provider, symbols, start, end, interval, **options):
+    """
+    מושך ברים תוך-יומיים בטווח עבור כל הסימבולים, במקטעים מקביליים דרך fetch_concurrently.
+    :return: (frames, status) כמו ב-fetch_ranges.
+    """
+    return _fetch_parts([lambda chunk: provider.get_intraday_bars(chunk, start, end, interval)], symbols, **options)
+
+
+def _fetch_parts(part_fetchers, symbols, **options):
+    """
+    מושך במקטעים דרך fetch_concurrently ומאחד למסגרות ברים אחת.
+    :param part_fetchers: פונקציות שמקבלות רשימת סימבולים ומחזירות מסגרות ברים (למשל אחת לכל טווח).
+    """
+    import pandas as pd
+
+    def fetch_chunk(chunk):
+        parts, failed, errors = [], set(), []
+        for fetch_part in part_fetchers:
+            try:
+                parts.append(fetch_part(chunk))
+            except RetryableFetchError as e:
+                parts.append(e.result)
+                failed.update(e.symbols)
+                errors.append(str(e))
+        chunk_frames = {}
+        for field in OHLCV_FIELDS:
+            field_parts = [part[field] for part in parts if field in part and not part[field].empty]
+            if field_parts:
+                chunk_frames[field] = pd.concat(field_parts).sort_index()
+        closes = chunk_frames.get('close')
+        bars = {} if closes is None else {
+            symbol: {field: frame[symbol] for field, frame in chunk_frames.items() if symbol in frame.columns}
+            for symbol in chunk
+            if symbol not in failed and symbol in closes.columns and closes[symbol].notna().any()
+        }
+        if failed:
+            # A symbol that failed in one of the parts is fetched again in full
+            raise RetryableFetchError([symbol for symbol in chunk if symbol in failed], bars, '; '.join(errors))
+        return bars
+
+    per_symbol, status = fetch_concurrently(fetch_chunk, symbols, **options)
+    frames = {}
+    for field in OHLCV_FIELDS:
+        columns = {symbol: series[field] for symbol, series in per_symbol.items() if field in series}
+        if field == 'close' or columns:
+            frame = pd.DataFrame(columns).reindex(columns=list(symbols)).astype(float)
+            frames[field] = frame.sort_index()
+    return frames, status
+
+
+_providers = {}
+_default_provider = None
+
+def get_price_provider(name=None):
+    """
+    מחזיר את ספק המחירים לפי שם (ברירת מחדל: config.PRICE_PROVIDER). מופע אחד לכל ספק בתהליך.
+    :param name: 'yfinance', 'fixture' או 'stub' (ספק סינתטי לכל config.ALL_SYMBOLS).
+    """
+    if name is None and _default_provider is not None:
+        return _default_provider
+    name = name or config.PRICE_PROVIDER
+    if name not in _providers:
+        if name == 'yfinance':
+            _providers[name] = YFinanceProvider()
+        elif name == 'fixture':
+            _providers[name] = FixtureProvider(config.PRICE_FIXTURE_DIR)
+        elif name == 'stub':
+            _providers[name] = StubProvider.synthetic(sorted(config.ALL_SYMBOLS), config.BASE_DATE)
+        else:
+            raise ValueError(f"ספק מחירים לא מוכר: {name}")
+    return _providers[name]
+
+
+def set_price_provider(provider):
+    """קובע מופע ספק (למשל StubProvider) כברירת המחדל של התהליך; None מחזיר לספק שב-config."""
+    global _default_provider
+    _default_provider = provider
+
+
+def current_provider_name():
+    """שם ספק ברירת המחדל של התהליך, בלי ליצור אותו (למשל לבחירת קובץ מטמון המחירים)."""
+    return _default_provider.name if _default_provider is not None else config.PRICE_PROVIDER
@@ -5,10 +5,14 @@
 """
 
 import os
+import json
+import heapq
+import hashlib
+import statistics
 from datetime import datetime
 import config
-import plotly.graph_objects as go
-import pandas as pd
+from atomic_io import atomic_open
+from instrumentation import span
 
 # --- פונקציות עזר לעיצוב וטיפול בנתונים ---
 
@@ -56,836 +60,472 @@ def format_percentage(value):
     else: # value == 0
         return f"{value:.2f}%"
 
+def date_format(date_str, format_str):
+    """מעצב תאריך בפורמט 'YYYY-MM-DD'."""
+    return safe_strftime(datetime.strptime(date_str, '%Y-%m-%d'), format_str)
+
+HEBREW_MONTHS = {
+    1: 'ינואר', 2: 'פברואר', 3: 'מרץ', 4: 'אפריל',
+    5: 'מאי', 6: 'יוני', 7: 'יולי', 8: 'אוגוסט',
+    9: 'ספטמבר', 10: 'אוקטובר', 11: 'נובמבר', 12: 'דצמבר'
+}
+
+def month_format(month_str):
+    """מעצב חודש בפורמט 'YYYY-MM' כ'יוני 2025'."""
+    year, month = month_str.split('-')
+    return f"{HEBREW_MONTHS[int(month)]} {year}"
+
+def write_report(file_path, content):
+    """
+    כותב דוח לקובץ. content יכול להיות מחרוזת או מחולל של מקטעים,
+    ואז המקטעים נכתבים לקובץ ברגע שהם נוצרים.
+    """
+    # דוחות ניתנים להפקה מחדש, ולכן רק אטומיים (בלי fsync)
+    with atomic_open(file_path, durable=False) as f:
+        if isinstance(content, str):
+            f.write(content)
+        else:
+            for chunk in content:
+                f.write(chunk)
+
+def plotly_js_src():
+    """
+    מחזיר את כתובת ספריית plotly.js לדף הגרפים:
+    במצב 'local' קובץ תחת assets/ בתיקיית הדוחות (עובד גם ללא רשת), ובמצב 'cdn' כתובת CDN בגרסה המותקנת.
+    """
+    if config.PLOTLY_JS_MODE == 'local':
+        return f"assets/plotly-{plotly_js_version()}.min.js"
+    return f"https://cdn.plot.ly/plotly-{plotly_js_version()}.min.js"
+
+def plotly_js_version():
+    """גרסת plotly.js שמגיעה עם חבילת plotly המותקנת."""
+    from plotly.offline import get_plotlyjs_version
+    return get_plotlyjs_version()
+
+def ensure_plotly_asset(output_dir):
+    """
+    כותב את plotly.min.js לתיקיית assets/ של הדוחות פעם אחת (לכל גרסת plotly).
+    :return: נתיב הקובץ.
+    """
+    asset_path = os.path.join(output_dir, plotly_js_src())
+    if not os.path.exists(asset_path):
+        from plotly.offline import get_plotlyjs
+        os.makedirs(os.path.dirname(asset_path), exist_ok=True)
+        with open(asset_path, 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+        print(f"📦 plotly.js נכתב לתיקיית הדוחות: {asset_path}")
+    return asset_path
+
+RENDER_MODES = ('serial', 'thread', 'process')
+
+def _render_job(generator_options, method_name, args, file_path):
+    """
+    מפיק דף יחיד וכותב אותו לקובץ.
+    פונקציה ברמת המודול כדי שתוכל לרוץ גם בתוך ProcessPoolExecutor.
+    :param generator_options: הארגומנטים ל-ReportGenerator (שם התיק ותאריך הבסיס).
+    """
+    write_report(file_path, getattr(ReportGenerator(**generator_options), method_name)(*args))
+    return file_path
+
+# קובץ המניפסט שומר את גיבוב הקלטים של כל דוח שנכתב
+MANIFEST_FILE = "manifest.json"
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+
+_template_environment = None
+
+def get_template_environment():
+    """
+    מחזיר סביבת Jinja2 יחידה לכל התהליך. התבניות מהודרות פעם אחת,
+    וה-bytecode שלהן נשמר במטמון על הדיסק (config.TEMPLATE_CACHE_DIR) לריצות הבאות.
+    """
+    global _template_environment
+    if _template_environment is None:
+        from jinja2 import Environment, FileSystemLoader, FileSystemBytecodeCache, select_autoescape
+
+        # Absolute, so the cached environment keeps working if the process changes directory
+        cache_dir = os.path.abspath(config.TEMPLATE_CACHE_DIR)
+        os.makedirs(cache_dir, exist_ok=True)
+        environment = Environment(
+            loader=FileSystemLoader(TEMPLATES_DIR),
+            autoescape=select_autoescape(['html']),
+            bytecode_cache=FileSystemBytecodeCache(cache_dir),
+            trim_blocks=True,
+            lstrip_blocks=True,
+        )
+        environment.filters.update({
+            'currency': format_currency,
+            'percentage': format_percentage,
+            'color_class': performance_color_class,
+            'datetime_format': safe_strftime,
+            'date_format': date_format,
+            'month_format': month_format,
+        })
+        _template_environment = environment
+    return _template_environment
+
+def _hash_payload(payload):
+    """מחזיר גיבוב SHA-256 של מבנה נתונים הניתן לסריאליזציה ל-JSON."""
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+    return hashlib.sha256(encoded).hexdigest()
+
+def _minute_timestamp(record):
+    """חותמת הזמן ברזולוציה המוצגת בדוחות (דקות)."""
+    return record.get('timestamp', '')[:16]
+
+def group_history_by_month(history_data):
+    """מקבץ רשומות היסטוריה לפי חודש: {'YYYY-MM': [records ממוינות לפי תאריך]}, לפי סדר החודשים."""
+    months = {}
+    for entry in sorted(history_data, key=lambda x: x['date']):
+        months.setdefault(entry['date'][:7], []).append(entry)
+    return months
+
+def month_summaries(months):
+    """מחזיר שורת סיכום לכל חודש - הערכים נכונים לסוף החודש (הרשומה האחרונה בו)."""
+    summaries = []
+    for month, records in months.items():
+        last = records[-1]
+        summaries.append({
+            'month': month,
+            'days': len(records),
+            'last_date': last['date'],
+            'portfolio_value': last.get('portfolio_value', 0),
+            'total_profit': last.get('total_profit', 0),
+            'total_return': last.get('total_return', 0),
+            'benchmarks_returns': last.get('benchmarks_returns', {}),
+        })
+    return summaries
+
+def benchmark_symbols(records):
+    """מדדי הייחוס שמופיעים ברשומות (או בסיכומים), לפי סדר הופעתם - במקום רשימה קבועה."""
+    symbols = {}
+    for entry in records:
+        symbols.update(dict.fromkeys(entry.get('benchmarks_returns') or {}))
+    return list(symbols)
+
+def stocks_view(stocks_performance, full_table_max=None, top_n=None):
+    """
+    מה שהדוח הראשי מציג על המניות. תיק קטן מוצג בטבלה מלאה; ביקום גדול (אלפי מניות) מוצגים
+    נתונים מצטברים ו-top_n המניות החזקות והחלשות, כך שגודל הדף וזמן ההפקה חסומים.
+    :param full_table_max: ברירת מחדל: config.REPORT_FULL_TABLE_MAX_STOCKS.
+    :param top_n: ברירת מחדל: config.REPORT_TOP_N_STOCKS.
+    """
+    full_table_max = config.REPORT_FULL_TABLE_MAX_STOCKS if full_table_max is None else full_table_max
+    top_n = config.REPORT_TOP_N_STOCKS if top_n is None else top_n
+    if len(stocks_performance) <= full_table_max:
+        return {'full': True, 'stocks': stocks_performance, 'count': len(stocks_performance)}
+    # מניה ללא נתוני מחיר מוצגת עם כמות 0 (ראה calculate_performance)
+    priced = [stock for stock in stocks_performance if stock['quantity']]
+    returns = [stock['percentage_return'] for stock in priced]
+    by_return = lambda stock: stock['percentage_return']
+    return {
+        'full': False,
+        'count': len(stocks_performance),
+        'gainers': sum(1 for value in returns if value > 0),
+        'losers': sum(1 for value in returns if value < 0),
+        'no_data': len(stocks_performance) - len(priced),
+        'median_return': statistics.median(returns) if returns else None,
+        'top': heapq.nlargest(top_n, priced, key=by_return),
+        'bottom': heapq.nsmallest(top_n, priced, key=by_return),
+    }
+
+def chart_layout(title, xaxis_title, yaxis_title):
+    """פריסת plotly משותפת לגרפי הדוחות."""
+    font = dict(family="Segoe UI, Tahoma, Geneva, Verdana, sans-serif", size=12, color="#333")
+    return dict(
+        hovermode="x unified", height=600, font=font, legend={'title': {'text': 'מקרא'}},
+        title={'text': title, 'x': 0.5},
+        xaxis={'title': {'text': xaxis_title}},
+        yaxis={'title': {'text': yaxis_title}},
+    )
+
+def script_json(data):
+    """JSON לבלוק <script> בדף."""
+    # "</" must not appear inside a <script> block
+    return json.dumps(data, ensure_ascii=False).replace("</", "<\\/")
+
+def _history_rows(records):
+    """הנתונים שטבלת ההיסטוריה מציגה עבור כל רשומה."""
+    return [
+        [entry['date'], entry.get('portfolio_value'), entry.get('total_profit'),
+         entry.get('total_return'), entry.get('days_invested'), entry.get('benchmarks_returns')]
+        for entry in records
+    ]
+
 class ReportGenerator:
-    def __init__(self):
-        pass
+    HISTORY_SHARDS_DIR = "history"
+
+    def __init__(self, portfolio_name=None, base_date=None):
+        """
+        :param portfolio_name: שם התיק בדוחות (ברירת מחדל: config.PORTFOLIO_NAME).
+        :param base_date: תאריך הבסיס בדוחות (ברירת מחדל: config.BASE_DATE).
+        """
+        self.portfolio_name = portfolio_name or config.PORTFOLIO_NAME
+        self.base_date = base_date or config.BASE_DATE
+        self._style_hash = None
+
+    def style_bundle_hash(self):
+        """גיבוב של קוד הדוחות (קובץ זה ותיקיית התבניות) ושל הגדרות התיק המוצגות בדוחות."""
+        if self._style_hash is None:
+            digest = hashlib.sha256()
+            template_files = sorted(
+                os.path.join(dirpath, name)
+                for dirpath, _, names in os.walk(TEMPLATES_DIR) for name in names
+            )
+            for path in [__file__, *template_files]:
+                digest.update(os.path.relpath(path, TEMPLATES_DIR).encode('utf-8'))
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+            self._style_hash = _hash_payload({
+                'source': digest.hexdigest(),
+                'portfolio_name': self.portfolio_name,
+                'base_date': self.base_date,
+                # In 'cdn' mode the plotly version is looked up only when a chart page is rendered (importing
+                # plotly.offline costs ~35 ms per run); a page left on the previous CDN version still works
+                'plotly_js_src': plotly_js_src() if config.PLOTLY_JS_MODE == 'local' else config.PLOTLY_JS_MODE,
+            })
+        return self._style_hash
+
+    def report_jobs(self, current_day_record, history_data, intraday=None):
+        """
+        מחזיר את רשימת הדפים להפקה: (נתיב יחסי, שם מתודה, ארגומנטים, קלטים לגיבוב).
+        הקלטים לגיבוב הם רק הנתונים שהדף מציג בפועל.
+        היסטוריה מפוצלת לדף לכל חודש (history/YYYY-MM.html) ולדף אינדקס (history.html).
+        :param intraday: אופציונלי. סדרות המצב התוך-יומי (ראה generate_intraday_report) - מוסיף את intraday.html.
+        """
+        current_inputs = dict(current_day_record, timestamp=_minute_timestamp(current_day_record))
+        months = group_history_by_month(history_data)
+        summaries = month_summaries(months)
+        jobs = [
+            ("graphs.html", "generate_graphs_report", (history_data,),
+             [[entry['date'], entry['total_return'], entry['benchmarks_returns']] for entry in history_data]),
+            ("index.html", "generate_main_report", (current_day_record,), current_inputs),
+            ("history.html", "stream_history_index", (summaries,), summaries),
+            ("summary.html", "generate_summary_image_report", (current_day_record,), current_inputs),
+        ]
+        if intraday is not None:
+            jobs.append(("intraday.html", "generate_intraday_report", (intraday,), intraday))
+        month_keys = list(months)
+        for i, (month, records) in enumerate(months.items()):
+            previous_month = month_keys[i - 1] if i > 0 else None
+            next_month = month_keys[i + 1] if i + 1 < len(month_keys) else None
+            jobs.append((
+                f"{self.HISTORY_SHARDS_DIR}/{month}.html",
+                "stream_history_report",
+                (records, month, previous_month, next_month),
+                [month, previous_month, next_month, _history_rows(records)],
+            ))
+        return jobs
+
+    def input_hash(self, filename, inputs):
+        """גיבוב התוכן של כל הקלטים של הדוח, כולל חבילת העיצוב."""
+        return _hash_payload({
+            'report': filename,
+            'style': self.style_bundle_hash(),
+            'inputs': inputs,
+        })
+
+    def render_reports(self, current_day_record, history_data, output_dir, force=False, mode=None, max_workers=None,
+                       pages=None, intraday=None):
+        """
+        מפיק וכותב רק את הדוחות שהקלטים שלהם השתנו מאז הריצה הקודמת (לפי המניפסט בתיקיית הדוחות).
+        :param force: הפקה מחדש של כל הדוחות בלי קשר למניפסט.
+        :param pages: אופציונלי. רק הדפים האלה (נתיבים יחסיים); שאר הדפים ורשומותיהם במניפסט נשארים כמו שהם.
+        :param intraday: אופציונלי. סדרות המצב התוך-יומי להפקת intraday.html.
+        :param mode: אופן ההפקה - 'serial', 'thread' או 'process' (ברירת מחדל: config.REPORT_RENDER_MODE).
+                     במצבים המקביליים כל דף נכתב לקובץ ברגע שהפקתו מסתיימת.
+        :param max_workers: מספר העובדים המקביליים (ברירת מחדל: config.REPORT_RENDER_WORKERS).
+        :return: רשימת הקבצים שנכתבו.
+        """
+        mode = mode or config.REPORT_RENDER_MODE
+        if mode not in RENDER_MODES:
+            raise ValueError(f"מצב הפקה לא מוכר: {mode}")
+        os.makedirs(output_dir, exist_ok=True)
+        if config.PLOTLY_JS_MODE == 'local':
+            ensure_plotly_asset(output_dir)
+        manifest_path = os.path.join(output_dir, MANIFEST_FILE)
+        manifest = {}
+        if (not force or pages is not None) and os.path.exists(manifest_path):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (IOError, json.JSONDecodeError):
+                manifest = {}
+
+        pending = []
+        skipped = 0
+        with span('report_inputs'):
+            jobs = self.report_jobs(current_day_record, history_data, intraday=intraday)
+        if pages is not None:
+            jobs = [job for job in jobs if job[0] in pages]
+        for filename, method_name, args, inputs in jobs:
+            file_path = os.path.join(output_dir, filename)
+            digest = self.input_hash(filename, inputs)
+            if not force and manifest.get(filename) == digest and os.path.exists(file_path):
+                skipped += 1
+                continue
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            pending.append((filename, method_name, args, file_path, digest))
+
+        written = []
+
+        def finished(filename, file_path, digest):
+            manifest[filename] = digest
+            written.append(file_path)
+            print(f"📄 דוח נוצר: {file_path}")
+
+        if mode == 'serial' or len(pending) <= 1:
+            for filename, method_name, args, file_path, digest in pending:
+                with span(f"render:{filename}"):
+                    write_report(file_path, getattr(self, method_name)(*args))
+                finished(filename, file_path, digest)
+        else:
+            from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+            executor_class = ThreadPoolExecutor if mode == 'thread' else ProcessPoolExecutor
+            workers = max_workers or config.REPORT_RENDER_WORKERS
+            # Per-page spans are only recorded in serial mode; here the whole batch is one span
+            generator_options = {'portfolio_name': self.portfolio_name, 'base_date': self.base_date}
+            with span(f"render:{mode}", pages=len(pending)), executor_class(max_workers=workers) as executor:
+                # The heaviest page (graphs) is listed early in report_jobs so it starts first
+                futures = {
+                    executor.submit(_render_job, generator_options, method_name, args, file_path): (filename, file_path, digest)
+                    for filename, method_name, args, file_path, digest in pending
+                }
+                for future in as_completed(futures):
+                    filename, file_path, digest = futures[future]
+                    future.result()
+                    finished(filename, file_path, digest)
+
+        if skipped:
+            print(f"⏭️ {skipped} דפים לא השתנו ולא נכתבו מחדש.")
+        with atomic_open(manifest_path, durable=False) as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+        return written
+
+    def _stream(self, template_name, **context):
+        """מרנדר תבנית עם ההקשר המשותף לכל הדוחות כמחולל של מקטעי טקסט."""
+        template = get_template_environment().get_template(template_name)
+        context.setdefault('root', "")
+        return template.generate(
+            portfolio_name=self.portfolio_name,
+            base_date=self.base_date,
+            **context
+        )
+
+    def _render(self, template_name, **context):
+        """מרנדר תבנית עם ההקשר המשותף לכל הדוחות למחרוזת אחת."""
+        return "".join(self._stream(template_name, **context))
 
     def generate_main_report(self, data):
         """
         מייצר את דוח ה-HTML הראשי של ביצועי התיק.
+        רשומה מהמצב התוך-יומי (עם המפתח 'intraday') מציגה גם את זמן הבר האחרון וקישור ל-intraday.html.
         """
-        date = data['date']
-        timestamp = datetime.fromisoformat(data['timestamp'])
-        portfolio_value = data['portfolio_value']
-        total_profit = data['total_profit']
-        total_return = data['total_return']
-        days_invested = data['days_invested']
-        outperformance = data['outperformance']
-        stocks_performance = data['stocks_performance']
-        
-        # Extract benchmark prices from the 'data' dictionary
-        benchmarks_current_prices = data.get('benchmarks_current_prices', {})
-        benchmarks_base_prices = data.get('benchmarks_base_prices', {})
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="he" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>דוח ביצועי תיק - {config.PORTFOLIO_NAME}</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: #f4f7f6;
-                    color: #333;
-                    line-height: 1.6;
-                }}
-                .container {{
-                    max-width: 900px;
-                    margin: 30px auto;
-                    background-color: #ffffff;
-                    padding: 30px 40px;
-                    border-radius: 12px;
-                    box-shadow: 0 6px 20px rgba(0, 0, 0, 0.08);
-                    border-top: 5px solid #007bff;
-                }}
-                h1, h2, h3 {{
-                    color: #007bff;
-                    text-align: center;
-                    margin-bottom: 25px;
-                    font-weight: 600;
-                }}
-                .header-info {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                    font-size: 1.1em;
-                    color: #555;
-                }}
-                .main-metrics {{
-                    display: flex;
-                    justify-content: space-around;
-                    flex-wrap: wrap;
-                    gap: 20px;
-                    margin-bottom: 40px;
-                    text-align: center;
-                }}
-                .metric-box {{
-                    background-color: #e0f2f7;
-                    padding: 20px;
-                    border-radius: 8px;
-                    flex: 1;
-                    min-width: 200px;
-                    box-shadow: 0 4px 10px rgba(0, 0, 0, 0.05);
-                }}
-                .metric-box h3 {{
-                    color: #0056b3;
-                    margin-top: 0;
-                    font-size: 1.2em;
-                }}
-                .metric-box .value {{
-                    font-size: 2.2em;
-                    font-weight: bold;
-                    color: #007bff;
-                    display: block;
-                    margin-top: 5px;
-                }}
-                .positive {{ color: #28a745; }}
-                .negative {{ color: #dc3545; }}
-                .neutral {{ color: #6c757d; }}
-
-                .stocks-table, .benchmarks-table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 30px;
-                    margin-bottom: 40px;
-                    text-align: right;
-                }}
-                .stocks-table th, .benchmarks-table th {{
-                    background-color: #007bff;
-                    color: white;
-                    padding: 12px 15px;
-                    border: 1px solid #ddd;
-                    text-align: center;
-                }}
-                .stocks-table td, .benchmarks-table td {{
-                    padding: 10px 15px;
-                    border: 1px solid #eee;
-                    text-align: center;
-                }}
-                .stocks-table tbody tr:nth-child(even), .benchmarks-table tbody tr:nth-child(even) {{
-                    background-color: #f8f8f8;
-                }}
-                .links {{
-                    text-align: center;
-                    margin-top: 40px;
-                    margin-bottom: 20px;
-                }}
-                .links a {{
-                    display: inline-block;
-                    margin: 0 15px;
-                    padding: 10px 20px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    transition: background-color 0.3s ease;
-                }}
-                .links a:hover {{
-                    background-color: #0056b3;
-                }}
-                .disclaimer {{
-                    font-size: 0.9em;
-                    color: #777;
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 15px;
-                    border-top: 1px solid #eee;
-                }}
-                .footer {{
-                    text-align: center;
-                    font-size: 0.85em;
-                    color: #888;
-                    margin-top: 20px;
-                    padding-bottom: 10px;
-                }}
-                .comparison-grid {{
-                    display: grid;
-                    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-                    gap: 20px;
-                    justify-content: center;
-                }}
-                .comparison-item {{
-                    background-color: #e0f7fa;
-                    padding: 20px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 12px rgba(0,0,0,0.07);
-                    text-align: center;
-                }}
-                .comparison-item h3 {{
-                    color: #007bff;
-                    margin-top: 0;
-                    font-size: 1.3em;
-                }}
-                .comparison-item p {{
-                    margin: 8px 0;
-                }}
-                .comparison-item .value {{
-                    font-size: 1.8em;
-                    font-weight: bold;
-                }}
-                /* New styles for base/current price display */
-                .price-info {{
-                    font-size: 0.75em; /* Smaller font for prices */
-                    color: #666;
-                    margin-top: 5px;
-                    line-height: 1.2;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>דוח ביצועי תיק {config.PORTFOLIO_NAME}</h1>
-                <div class="header-info">
-                    <p>תאריך הדוח: {safe_strftime(timestamp, '%d/%m/%Y %H:%M')}</p>
-                    <p>תאריך בסיס ההשקעה: {config.BASE_DATE}</p>
-                    <p>ימים שהושקעו: {days_invested}</p>
-                </div>
-
-                <div class="main-metrics">
-                    <div class="metric-box">
-                        <h3>שווי תיק נוכחי</h3>
-                        <span class="value">{format_currency(portfolio_value)}</span>
-                    </div>
-                    <div class="metric-box">
-                        <h3>רווח / הפסד כולל</h3>
-                        <span class="value {performance_color_class(total_profit)}">{format_currency(total_profit)}</span>
-                    </div>
-                    <div class="metric-box">
-                        <h3>תשואה כוללת</h3>
-                        <span class="value {performance_color_class(total_return)}">{format_percentage(total_return)}</span>
-                    </div>
-                </div>
-
-                <h2>ביצועי מניות בודדות</h2>
-                <table class="stocks-table">
-                    <thead>
-                        <tr>
-                            <th>סימבול</th>
-                            <th>כמות יחידות</th>
-                            <th>מחיר בסיס</th>
-                            <th>מחיר נוכחי</th>
-                            <th>שווי נוכחי</th>
-                            <th>רווח/הפסד</th>
-                            <th>תשואה %</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {"".join([
-                            f"""
-                            <tr>
-                                <td>{stock['symbol']}</td>
-                                <td>{stock['quantity']:.2f}</td>
-                                <td>{format_currency(stock['base_price'])}</td>
-                                <td>{format_currency(stock['current_price'])}</td>
-                                <td>{format_currency(stock['current_value'])}</td>
-                                <td class="{performance_color_class(stock['profit_loss'])}">{format_currency(stock['profit_loss'])}</td>
-                                <td class="{performance_color_class(stock['percentage_return'])}">{format_percentage(stock['percentage_return'])}</td>
-                            </tr>
-                            """ for stock in stocks_performance
-                        ])}
-                    </tbody>
-                </table>
-
-                <h2 style="margin-top: 40px; color: #007bff;">תשואה עודפת מול מדדי ייחוס</h2>
-                <div class="comparison-grid">
+        return self._render(
+            "index.html",
+            data=data,
+            stocks=stocks_view(data['stocks_performance']),
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            benchmarks_current_prices=data.get('benchmarks_current_prices') or {},
+            benchmarks_base_prices=data.get('benchmarks_base_prices') or {}
+        )
+
+    def stream_history_report(self, history_data, month=None, previous_month=None, next_month=None):
         """
-        for symbol, data_outperformance in outperformance.items():
-            benchmark_return = data_outperformance['benchmark_return']
-            portfolio_return = data_outperformance['portfolio_return']
-            outperf = data_outperformance['outperformance']
-
-            # Get base and current prices for the benchmark
-            base_price_benchmark = benchmarks_base_prices.get(symbol)
-            current_price_benchmark = benchmarks_current_prices.get(symbol)
-            
-            price_info_html = ""
-            if base_price_benchmark is not None and current_price_benchmark is not None:
-                price_info_html = f"""
-                <p class="price-info">בסיס: {format_currency(base_price_benchmark)} | נוכחי: {format_currency(current_price_benchmark)}</p>
-                """
-
-            html_content += f"""
-                    <div class="comparison-item">
-                        <h3>{symbol}</h3>
-                        <p style="font-size: 1em;">תשואת מדד: <span class="{performance_color_class(benchmark_return)}">{format_percentage(benchmark_return)}</span></p>
-                        {price_info_html} <p style="font-size: 1.0em;">תשואת תיק: <span class="{performance_color_class(portfolio_return)}">{format_percentage(portfolio_return)}</span></p>
-                        <p style="font-size: 1.4em; font-weight: bold;">תשואה עודפת: <span class="value {performance_color_class(outperf)}">{format_percentage(outperf)}</span></p>
-                    </div>
-            """
-        html_content += """
-                </div>
-            </div>
-            <div class="links">
-                <a href="index.html">🏠 דף הבית</a>
-                <a href="history.html">📈 היסטוריית תיק</a>
-                <a href="summary.html">📸 סיכום לשיתוף</a>
-                <a href="graphs.html">📊 גרפים</a>
-            </div>
-        
-                <div class="disclaimer">
-                    <p>הערה: נתוני הביצועים והמדדים המוצגים בדוח זה הם לצרכים אינפורמטיביים ואינם מהווים ייעוץ פיננסי.</p>
-                </div>
-                <div class="footer">
-                    דו"ח זה נוצר אוטומטית על ידי מערכת מעקב התיקים של TOP AI 10. &copy; 2025.
-                </div>
-            </body>
-        </html>
+        מייצר את דוח ההיסטוריה כמחולל של מקטעי HTML - שורה אחר שורה, בלי לבנות את כל הדף בזיכרון.
+        :param month: אם ניתן ('YYYY-MM'), הדף הוא מקטע חודשי בתיקיית history/ עם קישורים לחודשים הסמוכים.
         """
-        return html_content
+        # iterate in reverse order to show most recent first
+        entries = reversed(sorted(history_data, key=lambda x: x['date']))
+        return self._stream(
+            "history.html",
+            entries=entries,
+            benchmark_symbols=benchmark_symbols(history_data),
+            month=month,
+            previous_month=previous_month,
+            next_month=next_month,
+            root="../" if month else ""
+        )
+
+    def stream_history_index(self, summaries):
+        """
+        מייצר את דף האינדקס של ההיסטוריה - שורת סיכום וקישור לכל חודש.
+        :param summaries: הפלט של month_summaries.
+        """
+        return self._stream(
+            "history_index.html",
+            summaries=list(reversed(summaries)),
+            shards_dir=self.HISTORY_SHARDS_DIR,
+            benchmark_symbols=benchmark_symbols(summaries)
+        )
 
     def generate_history_report(self, history_data):
         """
         מייצר את דוח ה-HTML המציג את היסטוריית ביצועי התיק.
         """
-        history_rows = ""
-        # iterate in reverse order to show most recent first
-        for entry in sorted(history_data, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'), reverse=True):
-            date_formatted = datetime.strptime(entry['date'], '%Y-%m-%d').strftime('%d %B %Y')
-            
-            # Ensure safe access to nested keys, provide default values
-            portfolio_value = entry.get('portfolio_value', 0)
-            total_profit = entry.get('total_profit', 0)
-            total_return = entry.get('total_return', 0)
-            days_invested = entry.get('days_invested', 0)
-            
-            benchmarks = entry.get('benchmarks_returns', {})
-            spy_return = benchmarks.get('SPY', None)
-            qqq_return = benchmarks.get('QQQ', None)
-            tqqq_return = benchmarks.get('TQQQ', None)
-
-            history_rows += f"""
-                    <tr>
-                        <td>{date_formatted}</td>
-                        <td>{format_currency(portfolio_value)}</td>
-                        <td class="{performance_color_class(total_profit)}">{format_currency(total_profit)}</td>
-                        <td class="{performance_color_class(total_return)}">{format_percentage(total_return)}</td>
-                        <td>{days_invested}</td>
-                        <td class="{performance_color_class(spy_return)}">{format_percentage(spy_return)}</td>
-                        <td class="{performance_color_class(qqq_return)}">{format_percentage(qqq_return)}</td>
-                        <td class="{performance_color_class(tqqq_return)}">{format_percentage(tqqq_return)}</td>
-                    </tr>
-            """
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="he" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>היסטוריית ביצועי תיק - {config.PORTFOLIO_NAME}</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: #f4f7f6;
-                    color: #333;
-                    line-height: 1.6;
-                }}
-                .container {{
-                    max-width: 900px;
-                    margin: 30px auto;
-                    background-color: #ffffff;
-                    padding: 30px 40px;
-                    border-radius: 12px;
-                    box-shadow: 0 6px 20px rgba(0, 0, 0, 0.08);
-                    border-top: 5px solid #007bff;
-                }}
-                h1, h2, h3 {{
-                    color: #007bff;
-                    text-align: center;
-                    margin-bottom: 25px;
-                    font-weight: 600;
-                }}
-                .header-info {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                    font-size: 1.1em;
-                    color: #555;
-                }}
-                .history-table {{
-                    width: 100%;
-                    border-collapse: collapse;
-                    margin-top: 30px;
-                    margin-bottom: 40px;
-                    text-align: right;
-                }}
-                .history-table th {{
-                    background-color: #007bff;
-                    color: white;
-                    padding: 12px 15px;
-                    border: 1px solid #ddd;
-                    text-align: center;
-                }}
-                .history-table td {{
-                    padding: 10px 15px;
-                    border: 1px solid #eee;
-                    text-align: center;
-                }}
-                .history-table tbody tr:nth-child(even) {{
-                    background-color: #f8f8f8;
-                }}
-                .positive {{ color: #28a745; }}
-                .negative {{ color: #dc3545; }}
-                .neutral {{ color: #6c757d; }}
-                .links {{
-                    text-align: center;
-                    margin-top: 40px;
-                    margin-bottom: 20px;
-                }}
-                .links a {{
-                    display: inline-block;
-                    margin: 0 15px;
-                    padding: 10px 20px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    transition: background-color 0.3s ease;
-                }}
-                .links a:hover {{
-                    background-color: #0056b3;
-                }}
-                .disclaimer {{
-                    font-size: 0.9em;
-                    color: #777;
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 15px;
-                    border-top: 1px solid #eee;
-                }}
-                .footer {{
-                    text-align: center;
-                    font-size: 0.85em;
-                    color: #888;
-                    margin-top: 20px;
-                    padding-bottom: 10px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>היסטוריית ביצועי תיק {config.PORTFOLIO_NAME}</h1>
-                <div class="header-info">
-                    <p>מציג את ביצועי התיק לאורך זמן.</p>
-                </div>
-
-                <table class="history-table">
-                    <thead>
-                        <tr>
-                            <th>תאריך</th>
-                            <th>שווי תיק</th>
-                            <th>רווח/הפסד</th>
-                            <th>תשואה %</th>
-                            <th>ימים הושקעו</th>
-                            <th>SPY תשואה %</th>
-                            <th>QQQ תשואה %</th>
-                            <th>TQQQ תשואה %</th>
-                        </tr>
-                    </thead>
-                    <tbody>
-                        {history_rows}
-                    </tbody>
-                </table>
-
-                <div class="links">
-                    <a href="index.html">🏠 דף הבית</a>
-                    <a href="history.html">📈 היסטוריית תיק</a>
-                    <a href="summary.html">📸 סיכום לשיתוף</a>
-                    <a href="graphs.html">📊 גרפים</a>
-                </div>
-            
-                <div class="disclaimer">
-                    <p>הערה: נתוני הביצועים והמדדים המוצגים בדוח זה הם לצרכים אינפורמטיביים ואינם מהווים ייעוץ פיננסי.</p>
-                </div>
-                <div class="footer">
-                    דו"ח זה נוצר אוטומטית על ידי מערכת מעקב התיקים של TOP AI 10. &copy; 2025.
-                </div>
-            </body>
-        </html>
-        """
-        return html_content
+        return "".join(self.stream_history_report(history_data))
 
     def generate_summary_image_report(self, data):
         """
         מייצר דוח HTML פשוט המיועד לצילום מסך/שיתוף, עם סיכום ביצועים בלבד.
         """
-        date = data['date']
-        timestamp = datetime.fromisoformat(data['timestamp'])
-        total_return = data['total_return']
-        outperformance = data['outperformance']
-        
-        # Get base and current prices for the benchmark for summary
-        benchmarks_current_prices = data.get('benchmarks_current_prices', {})
-        benchmarks_base_prices = data.get('benchmarks_base_prices', {})
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="he" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>סיכום לשיתוף - {config.PORTFOLIO_NAME}</title>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: #f4f7f6;
-                    color: #333;
-                    line-height: 1.6;
-                }}
-                .container {{
-                    max-width: 900px;
-                    margin: 30px auto;
-                    background-color: #ffffff;
-                    padding: 30px 40px;
-                    border-radius: 12px;
-                    box-shadow: 0 6px 20px rgba(0, 0, 0, 0.08);
-                    border-top: 5px solid #007bff;
-                }}
-                h1, h2, h3 {{
-                    color: #007bff;
-                    text-align: center;
-                    margin-bottom: 25px;
-                    font-weight: 600;
-                }}
-                .header-info {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                    font-size: 1.1em;
-                    color: #555;
-                }}
-                .main-metrics {{
-                    display: flex;
-                    justify-content: space-around;
-                    flex-wrap: wrap;
-                    gap: 20px;
-                    margin-bottom: 40px;
-                    text-align: center;
-                }}
-                .metric-box {{
-                    background-color: #e0f2f7;
-                    padding: 20px;
-                    border-radius: 8px;
-                    flex: 1;
-                    min-width: 200px;
-                    box-shadow: 0 4px 10px rgba(0, 0, 0, 0.05);
-                }}
-                .metric-box h3 {{
-                    color: #0056b3;
-                    margin-top: 0;
-                    font-size: 1.2em;
-                }}
-                .metric-box .value {{
-                    font-size: 2.2em;
-                    font-weight: bold;
-                    color: #007bff;
-                    display: block;
-                    margin-top: 5px;
-                }}
-                .positive {{ color: #28a745; }}
-                .negative {{ color: #dc3545; }}
-                .neutral {{ color: #6c757d; }}
-                .comparison-grid {{
-                    display: grid;
-                    grid-template-columns: repeat(auto-fit, minmax(280px, 1fr));
-                    gap: 20px;
-                    justify-content: center;
-                }}
-                .comparison-item {{
-                    background-color: #e0f7fa;
-                    padding: 20px;
-                    border-radius: 10px;
-                    box-shadow: 0 4px 12px rgba(0,0,0,0.07);
-                    text-align: center;
-                }}
-                .comparison-item h3 {{
-                    color: #007bff;
-                    margin-top: 0;
-                    font-size: 1.3em;
-                }}
-                .comparison-item p {{
-                    margin: 8px 0;
-                }}
-                .comparison-item .value {{
-                    font-size: 1.8em;
-                    font-weight: bold;
-                }}
-                .links {{
-                    text-align: center;
-                    margin-top: 40px;
-                    margin-bottom: 20px;
-                }}
-                .links a {{
-                    display: inline-block;
-                    margin: 0 15px;
-                    padding: 10px 20px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    transition: background-color 0.3s ease;
-                }}
-                .links a:hover {{
-                    background-color: #0056b3;
-                }}
-                .disclaimer {{
-                    font-size: 0.9em;
-                    color: #777;
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 15px;
-                    border-top: 1px solid #eee;
-                }}
-                .footer {{
-                    text-align: center;
-                    font-size: 0.85em;
-                    color: #888;
-                    margin-top: 20px;
-                    padding-bottom: 10px;
-                }}
-                /* New styles for base/current price display */
-                .price-info {{
-                    font-size: 0.75em; /* Smaller font for prices */
-                    color: #666;
-                    margin-top: 5px;
-                    line-height: 1.2;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>סיכום ביצועים - {config.PORTFOLIO_NAME}</h1>
-                <div class="header-info">
-                    <p>תאריך הדוח: {safe_strftime(timestamp, '%d/%m/%Y %H:%M')}</p>
-                </div>
-
-                <div class="main-metrics">
-                    <div class="metric-box" style="flex: none; width: 80%;">
-                        <h3>תשואה כוללת של התיק</h3>
-                        <span class="value {performance_color_class(total_return)}">{format_percentage(total_return)}</span>
-                    </div>
-                </div>
-
-                <h2 style="margin-top: 40px; color: #007bff;">השוואה למדדי ייחוס</h2>
-                <div class="comparison-grid">
-        """
-        for symbol, data_outperformance in outperformance.items():
-            benchmark_return = data_outperformance['benchmark_return']
-            portfolio_return = data_outperformance['portfolio_return']
-            outperf = data_outperformance['outperformance']
-
-            # Get base and current prices for the benchmark for summary
-            base_price_benchmark = benchmarks_base_prices.get(symbol)
-            current_price_benchmark = benchmarks_current_prices.get(symbol)
-            
-            price_info_html = ""
-            if base_price_benchmark is not None and current_price_benchmark is not None:
-                price_info_html = f"""
-                <p class="price-info">בסיס: {format_currency(base_price_benchmark)} | נוכחי: {format_currency(current_price_benchmark)}</p>
-                """
-
-            html_content += f"""
-                    <div class="comparison-item" style="padding: 15px;">
-                        <h3>{symbol}</h3>
-                        <p style="font-size: 1em;">תשואת מדד: <span class="{performance_color_class(benchmark_return)}">{format_percentage(benchmark_return)}</span></p>
-                        {price_info_html} <p style="font-size: 1.0em;">תשואת תיק: <span class="{performance_color_class(portfolio_return)}">{format_percentage(portfolio_return)}</span></p>
-                        <p style="font-size: 1.4em; font-weight: bold;">תשואה עודפת: <span class="value {performance_color_class(outperf)}">{format_percentage(outperf)}</span></p>
-                    </div>
-            """
-        html_content += """
-                </div>
-            </div>
-            <div class="links">
-                <a href="index.html">🏠 דף הבית</a>
-                <a href="history.html">📈 היסטוריית תיק</a>
-                <a href="summary.html">📸 סיכום לשיתוף</a>
-                <a href="graphs.html">📊 גרפים</a>
-            </div>
-        
-                <div class="disclaimer">
-                    <p>הערה: נתוני הביצועים והמדדים המוצגים בדוח זה הם לצרכים אינפורמטיביים ואינם מהווים ייעוץ פיננסי.</p>
-                </div>
-                <div class="footer">
-                    דו"ח זה נוצר אוטומטית על ידי מערכת מעקב התיקים של TOP AI 10. &copy; 2025.
-                </div>
-            </body>
-        </html>
-        """
-        return html_content
+        return self._render(
+            "summary.html",
+            data=data,
+            timestamp=datetime.fromisoformat(data['timestamp']),
+            benchmarks_current_prices=data.get('benchmarks_current_prices') or {},
+            benchmarks_base_prices=data.get('benchmarks_base_prices') or {}
+        )
 
     def generate_graphs_report(self, history_data):
         """
         מייצר דוח HTML המכיל גרפים אינטראקטיביים של ביצועי התיק והמדדים לאורך זמן.
+        נתוני הסדרות נשלחים פעם אחת כבלוק JSON משותף, ושני הגרפים נבנים ממנו בדפדפן
+        עם ספריית plotly.js יחידה (מקומית או מ-CDN, לפי config.PLOTLY_JS_MODE).
         """
         # Ensure data is sorted by date for correct plotting
-        sorted_history = sorted(history_data, key=lambda x: datetime.strptime(x['date'], '%Y-%m-%d'))
-
-        dates = [entry['date'] for entry in sorted_history]
-        portfolio_returns = [entry['total_return'] for entry in sorted_history]
-        spy_returns = [entry['benchmarks_returns'].get('SPY', None) for entry in sorted_history]
-        qqq_returns = [entry['benchmarks_returns'].get('QQQ', None) for entry in sorted_history]
-        tqqq_returns = [entry['benchmarks_returns'].get('TQQQ', None) for entry in sorted_history]
-
-        # Convert None to NaN for Plotly to handle missing data gracefully
-        df = pd.DataFrame({
-            'Date': dates,
-            'Portfolio': portfolio_returns,
-            'SPY': spy_returns,
-            'QQQ': qqq_returns,
-            'TQQQ': tqqq_returns
-        }).set_index('Date')
-        
-        # Plotting Portfolio Performance
-        fig_portfolio = go.Figure()
-        fig_portfolio.add_trace(go.Scatter(x=df.index, y=df['Portfolio'], mode='lines+markers', name='תשואת תיק'))
-        fig_portfolio.update_layout(
-            title={'text': 'התפתחות ביצועי תיק לאורך זמן', 'x':0.5},
-            xaxis_title='תאריך',
-            yaxis_title='תשואה (%)',
-            hovermode="x unified",
-            height=600,
-            font=dict(family="Segoe UI, Tahoma, Geneva, Verdana, sans-serif", size=12, color="#333"),
-            legend_title_text='מקרא'
-        )
-        
-        # Plotting Portfolio vs Benchmarks
-        fig_comparison = go.Figure()
-        fig_comparison.add_trace(go.Scatter(x=df.index, y=df['Portfolio'], mode='lines+markers', name='תיק TOP AI 10'))
-        fig_comparison.add_trace(go.Scatter(x=df.index, y=df['SPY'], mode='lines+markers', name='SPY'))
-        fig_comparison.add_trace(go.Scatter(x=df.index, y=df['QQQ'], mode='lines+markers', name='QQQ'))
-        fig_comparison.add_trace(go.Scatter(x=df.index, y=df['TQQQ'], mode='lines+markers', name='TQQQ'))
-        fig_comparison.update_layout(
-            title={'text': 'השוואת ביצועי תיק ומדדים לאורך זמן', 'x':0.5},
-            xaxis_title='תאריך',
-            yaxis_title='ערך / תשואה (%)',
-            hovermode="x unified",
-            height=600,
-            font=dict(family="Segoe UI, Tahoma, Geneva, Verdana, sans-serif", size=12, color="#333"),
-            legend_title_text='מקרא'
+        sorted_history = sorted(history_data, key=lambda x: x['date'])
+        symbols = benchmark_symbols(sorted_history)
+
+        graph_data = {
+            'dates': [entry['date'] for entry in sorted_history],
+            'portfolio': [entry['total_return'] for entry in sorted_history],
+            # None becomes null, which Plotly draws as a gap
+            'benchmarks': {
+                symbol: [entry['benchmarks_returns'].get(symbol) for entry in sorted_history]
+                for symbol in symbols
+            },
+            'labels': {'portfolio': 'תשואת תיק', 'comparison': f'תיק {self.portfolio_name}'},
+            'layouts': {
+                'portfolio': chart_layout('התפתחות ביצועי תיק לאורך זמן', 'תאריך', 'תשואה (%)'),
+                'comparison': chart_layout('השוואת ביצועי תיק ומדדים לאורך זמן', 'תאריך', 'ערך / תשואה (%)'),
+            },
+        }
+
+        return self._render(
+            "graphs.html",
+            plotly_js_src=plotly_js_src(),
+            graph_data_json=script_json(graph_data)
         )
 
-        plot_portfolio_div = fig_portfolio.to_html(full_html=False, include_plotlyjs='cdn')
-        plot_comparison_div = fig_comparison.to_html(full_html=False, include_plotlyjs='cdn')
-
-
-        html_content = f"""
-        <!DOCTYPE html>
-        <html lang="he" dir="rtl">
-        <head>
-            <meta charset="UTF-8">
-            <meta name="viewport" content="width=device-width, initial-scale=1.0">
-            <title>גרפים - {config.PORTFOLIO_NAME}</title>
-            <script src="https://cdn.plot.ly/plotly-latest.min.js"></script>
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    margin: 0;
-                    padding: 0;
-                    background-color: #f4f7f6;
-                    color: #333;
-                    line-height: 1.6;
-                }}
-                .container {{
-                    max-width: 900px;
-                    margin: 30px auto;
-                    background-color: #ffffff;
-                    padding: 30px 40px;
-                    border-radius: 12px;
-                    box-shadow: 0 6px 20px rgba(0, 0, 0, 0.08);
-                    border-top: 5px solid #007bff;
-                }}
-                h1, h2, h3 {{
-                    color: #007bff;
-                    text-align: center;
-                    margin-bottom: 25px;
-                    font-weight: 600;
-                }}
-                .header-info {{
-                    text-align: center;
-                    margin-bottom: 30px;
-                    font-size: 1.1em;
-                    color: #555;
-                }}
-                .links {{
-                    text-align: center;
-                    margin-top: 40px;
-                    margin-bottom: 20px;
-                }}
-                .links a {{
-                    display: inline-block;
-                    margin: 0 15px;
-                    padding: 10px 20px;
-                    background-color: #007bff;
-                    color: white;
-                    text-decoration: none;
-                    border-radius: 5px;
-                    transition: background-color 0.3s ease;
-                }}
-                .links a:hover {{
-                    background-color: #0056b3;
-                }}
-                .disclaimer {{
-                    font-size: 0.9em;
-                    color: #777;
-                    text-align: center;
-                    margin-top: 30px;
-                    padding-top: 15px;
-                    border-top: 1px solid #eee;
-                }}
-                .footer {{
-                    text-align: center;
-                    font-size: 0.85em;
-                    color: #888;
-                    margin-top: 20px;
-                    padding-bottom: 10px;
-                }}
-                .chart-container {{
-                    margin-bottom: 40px;
-                    border: 1px solid #ddd;
-                    border-radius: 8px;
-                    padding: 15px;
-                    background-color: #fff;
-                    box-shadow: 0 2px 8px rgba(0,0,0,0.05);
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <h1>גרפים - {config.PORTFOLIO_NAME}</h1>
-                <div class="header-info">
-                    <p>הצגה חזותית של ביצועי התיק והשוואות למדדים לאורך זמן.</p>
-                </div>
-
-                <div class="chart-container">
-                    <h2>התפתחות ביצועי התיק</h2>
-                    {plot_portfolio_div}
-                </div>
-
-                <div class="chart-container">
-                    <h2>השוואת ביצועים למדדי ייחוס</h2>
-                    {plot_comparison_div}
-                </div>
-
-            </div>
-            <div class="links">
-                <a href="index.html">🏠 דף הבית</a>
-                <a href="history.html">📈 היסטוריית תיק</a>
-                <a href="summary.html">📸 סיכום לשיתוף</a>
-                <a href="graphs.html">📊 גרפים</a>
-            </div>
-        
-                <div class="disclaimer">
-                    <p>הערה: נתוני הביצועים והמדדים המוצגים בדוח זה הם לצרכים אינפורמטיביים ואינם מהווים ייעוץ פיננסי.</p>
-                </div>
-                <div class="footer">
-                    דו"ח זה נוצר אוטומטית על ידי מערכת מעקב התיקים של TOP AI 10. &copy; 2025.
-                </div>
-            </body>
-        </html>
+    def generate_intraday_report(self, intraday):
+        """
+        מייצר דוח HTML עם גרף תשואת התיק והמדדים לאורך יום המסחר, בר אחר בר.
+        :param intraday: {'date', 'interval', 'times', 'portfolio', 'benchmarks': {symbol: [...]}}
+                         - תשואות באחוזים מתאריך הבסיס, ערך לכל זמן ב-times.
         """
-        return html_content
\ No newline at end of file
+        graph_data = {
+            'times': intraday['times'],
+            'portfolio': intraday['portfolio'],
+            'benchmarks': intraday['benchmarks'],
+            'labels': {'portfolio': f'תיק {self.portfolio_name}'},
+            'layout': chart_layout(f"ביצועים תוך-יומיים ({intraday['interval']})", 'שעה', 'תשואה (%)'),
+        }
+
+        return self._render(
+            "intraday.html",
+            intraday=intraday,
+            plotly_js_src=plotly_js_src(),
+            graph_data_json=script_json(graph_data)
+        )
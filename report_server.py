@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+שרת HTTP מקומי לדוחות (python main.py --serve), במקום פתיחת קבצים דרך file://.
+
+    http://127.0.0.1:8000/              -> reports/index.html
+    http://127.0.0.1:8000/top_ai_10/    -> reports/top_ai_10/index.html
+
+הדפים נקראים מהדיסק פעם אחת לכל גרסה ונשמרים בזיכרון כשהם כבר דחוסים (gzip, ו-brotli אם החבילה מותקנת).
+מפתח הגרסה הוא גיבוב הקלטים של הדף מהמניפסט שבתיקיית הדוחות (ראה ReportGenerator.render_reports),
+כך שדף משתנה רק אחרי שהפקה כתבה אותו מחדש. קבצים שאינם במניפסט (למשל assets/) מזוהים לפי גודל וזמן שינוי.
+הגיבוב משמש גם כ-ETag: דפדפן ששולח If-None-Match מקבל 304 בלי גוף, ולכן צופים רבים לא עולים דבר.
+"""
+
+import os
+import gzip
+import json
+import hashlib
+import mimetypes
+import threading
+from http import HTTPStatus
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import unquote, urlsplit
+
+import config
+from report_generator import MANIFEST_FILE
+
+
+def _brotli():
+    """מודול brotli אם הוא מותקן (תלות אופציונלית), אחרת None."""
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+class PageCache:
+    """
+    גוף הדפים בזיכרון, לפי נתיב יחסי לתיקיית הדוחות: (גרסה, ETag, סוג תוכן, {קידוד: גוף}).
+    בטוח לשימוש מכמה תהליכונים.
+    """
+
+    def __init__(self, root):
+        self.root = os.path.abspath(root)
+        self._pages = {}
+        self._manifests = {}
+        self._lock = threading.Lock()
+
+    def resolve(self, url_path):
+        """
+        ממפה נתיב URL לנתיב יחסי של קובץ בתיקיית הדוחות.
+        :return: (נתיב יחסי, None), או (None, כתובת להפניה) לתיקייה בלי '/' בסופה -
+                 כדי שהקישורים היחסיים בדף יפנו לתיקיית התיק ולא לשורש - או (None, None) אם הוא מחוץ לתיקייה או לא קיים.
+        """
+        relative = unquote(url_path).lstrip('/')
+        full_path = os.path.abspath(os.path.join(self.root, relative))
+        if os.path.commonpath([self.root, full_path]) != self.root:
+            return None, None
+        if os.path.isdir(full_path):
+            if relative and not relative.endswith('/'):
+                return None, url_path + '/'
+            full_path = os.path.join(full_path, 'index.html')
+        if not os.path.isfile(full_path) or os.path.basename(full_path) == MANIFEST_FILE:
+            return None, None
+        return os.path.relpath(full_path, self.root).replace(os.sep, '/'), None
+
+    def _manifest(self, directory):
+        """המניפסט של תיקיית דוחות, נטען מחדש רק כשקובץ המניפסט השתנה."""
+        path = os.path.join(self.root, directory, MANIFEST_FILE)
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        cached = self._manifests.get(directory)
+        if cached is None or cached[0] != mtime:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    cached = (mtime, json.load(f))
+            except (IOError, json.JSONDecodeError):
+                # Being replaced right now; the next request reads the new one
+                cached = (mtime, {})
+            self._manifests[directory] = cached
+        return cached[1]
+
+    def version(self, relative):
+        """
+        גרסת הקובץ: גיבוב הקלטים מהמניפסט הקרוב ביותר שמכיר אותו
+        (לתיק מהרישום - reports/<id>/manifest.json), ואחרת גודל וזמן שינוי.
+        """
+        parts = relative.split('/')
+        for depth in range(len(parts) - 1, -1, -1):
+            digest = self._manifest('/'.join(parts[:depth])).get('/'.join(parts[depth:]))
+            if digest:
+                return digest
+        stat = os.stat(os.path.join(self.root, relative))
+        return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+    def get(self, relative):
+        """
+        :return: (ETag, סוג תוכן, {קידוד: גוף}) של הגרסה הנוכחית, נקרא ונדחס רק בפעם הראשונה.
+                 ה-ETag הוא של הגוף הלא דחוס; לגוף דחוס מתווספת הסיומת -<קידוד> (ראה encoded_etag).
+        """
+        with self._lock:
+            version = self.version(relative)
+            page = self._pages.get(relative)
+            if page is not None and page[0] == version:
+                return page[1:]
+        with open(os.path.join(self.root, relative), 'rb') as f:
+            body = f.read()
+        content_type = mimetypes.guess_type(relative)[0] or 'application/octet-stream'
+        if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+            content_type += '; charset=utf-8'
+        bodies = {'identity': body}
+        if len(body) >= config.SERVER_COMPRESS_MIN_BYTES:
+            bodies['gzip'] = gzip.compress(body, compresslevel=6, mtime=0)
+            brotli = _brotli()
+            if brotli is not None:
+                bodies['br'] = brotli.compress(body)
+        etag = '"' + hashlib.sha256(version.encode('utf-8')).hexdigest()[:32] + '"'
+        with self._lock:
+            self._pages[relative] = (version, etag, content_type, bodies)
+        return etag, content_type, bodies
+
+
+def encoded_etag(etag, encoding):
+    """ETag חזק שונה לכל קידוד של אותה גרסה, כי הגופים שונים בבתים."""
+    return etag if encoding == 'identity' else f'{etag[:-1]}-{encoding}"'
+
+
+def _accepted_encodings(header):
+    """קידודים שהלקוח מקבל לפי Accept-Encoding (ללא אלו שסומנו q=0)."""
+    accepted = set()
+    for item in (header or '').split(','):
+        name, _, params = item.strip().partition(';')
+        if name and params.replace(' ', '') not in ('q=0', 'q=0.0'):
+            accepted.add(name.strip().lower())
+    return accepted
+
+
+class ReportRequestHandler(BaseHTTPRequestHandler):
+    """מגיש קבצים מ-PageCache עם ETag, 304 ודחיסה לפי Accept-Encoding."""
+
+    page_cache = None
+    server_version = "PortfolioReports/1.0"
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _serve(self, head):
+        url = urlsplit(self.path)
+        relative, redirect = self.page_cache.resolve(url.path)
+        if redirect is not None:
+            self.send_response(HTTPStatus.MOVED_PERMANENTLY)
+            self.send_header('Location', redirect + (f"?{url.query}" if url.query else ""))
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        if relative is None:
+            self.send_error(HTTPStatus.NOT_FOUND)
+            return
+        etag, content_type, bodies = self.page_cache.get(relative)
+        accepted = _accepted_encodings(self.headers.get('Accept-Encoding'))
+        encoding = next((name for name in ('br', 'gzip') if name in bodies and name in accepted), 'identity')
+        etag = encoded_etag(etag, encoding)
+        if etag in [tag.strip() for tag in self.headers.get('If-None-Match', '').split(',')]:
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header('ETag', etag)
+            self.send_header('Cache-Control', 'no-cache')
+            self.send_header('Vary', 'Accept-Encoding')
+            self.end_headers()
+            return
+        body = bodies[encoding]
+        self.send_response(HTTPStatus.OK)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.send_header('ETag', etag)
+        # Browsers keep the page but revalidate every time, so a refreshed report shows up immediately
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Vary', 'Accept-Encoding')
+        if encoding != 'identity':
+            self.send_header('Content-Encoding', encoding)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if config.SERVER_ACCESS_LOG:
+            super().log_message(format, *args)
+
+
+def create_server(root, host=None, port=None):
+    """יוצר שרת (לא מופעל) שמגיש את תיקיית הדוחות root."""
+    handler = type('Handler', (ReportRequestHandler,), {'page_cache': PageCache(root)})
+    host = config.SERVER_HOST if host is None else host
+    port = config.SERVER_PORT if port is None else port
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def start_background_server(root, host=None, port=None):
+    """מפעיל את השרת בתהליכון רקע (למשל לצד main.py --daemon). :return: השרת."""
+    server = create_server(root, host, port)
+    threading.Thread(target=server.serve_forever, name='report-server', daemon=True).start()
+    print(f"🌐 שרת הדוחות פועל: http://{server.server_address[0]}:{server.server_address[1]}/")
+    return server
+
+
+def serve_forever(root, host=None, port=None):
+    """מגיש את תיקיית הדוחות עד Ctrl+C."""
+    server = create_server(root, host, port)
+    print(f"🌐 שרת הדוחות פועל: http://{server.server_address[0]}:{server.server_address[1]}/ (לעצירה: Ctrl+C)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
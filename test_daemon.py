@@ -0,0 +1,57 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest import mock
+
+import config
+from daemon import next_action
+
+REFRESH = 300
+
+
+def at(day, time):
+    return datetime.strptime(f"{day} {time}", '%Y-%m-%d %H:%M')
+
+
+@mock.patch.multiple(config, MARKET_OPEN="09:30", MARKET_CLOSE="16:00", DAEMON_CLOSE_DELAY_MINUTES=20)
+class NextActionTest(unittest.TestCase):
+    # 2024-01-10 is a Wednesday, 2024-01-12 a Friday
+
+    def test_before_open_waits_for_open(self):
+        self.assertEqual(next_action(at('2024-01-10', '08:00'), None, REFRESH, intraday=True),
+                         (None, at('2024-01-10', '09:30')))
+
+    def test_before_open_without_intraday_waits_for_daily(self):
+        self.assertEqual(next_action(at('2024-01-10', '08:00'), None, REFRESH, intraday=False),
+                         (None, at('2024-01-10', '16:20')))
+
+    def test_session_refreshes_intraday(self):
+        now = at('2024-01-10', '10:00')
+        self.assertEqual(next_action(now, None, REFRESH, intraday=True), ('intraday', now + timedelta(seconds=REFRESH)))
+
+    def test_last_refresh_wakes_for_daily(self):
+        self.assertEqual(next_action(at('2024-01-10', '15:59'), None, 3600, intraday=True),
+                         ('intraday', at('2024-01-10', '16:20')))
+
+    def test_session_without_intraday_waits(self):
+        self.assertEqual(next_action(at('2024-01-10', '10:00'), None, REFRESH, intraday=False),
+                         (None, at('2024-01-10', '16:20')))
+
+    def test_between_close_and_daily(self):
+        self.assertEqual(next_action(at('2024-01-10', '16:05'), None, REFRESH, intraday=True),
+                         (None, at('2024-01-10', '16:20')))
+
+    def test_daily_after_close_delay(self):
+        now = at('2024-01-10', '16:20')
+        self.assertEqual(next_action(now, '2024-01-09', REFRESH, intraday=True), ('daily', now))
+
+    def test_daily_done_waits_for_next_open(self):
+        self.assertEqual(next_action(at('2024-01-10', '18:00'), '2024-01-10', REFRESH, intraday=True),
+                         (None, at('2024-01-11', '09:30')))
+        self.assertEqual(next_action(at('2024-01-10', '18:00'), '2024-01-10', REFRESH, intraday=False),
+                         (None, at('2024-01-11', '16:20')))
+
+    def test_weekend_waits_for_monday(self):
+        self.assertEqual(next_action(at('2024-01-12', '17:00'), '2024-01-12', REFRESH, intraday=True),
+                         (None, at('2024-01-15', '09:30')))
+        self.assertEqual(next_action(at('2024-01-13', '12:00'), '2024-01-12', REFRESH, intraday=True),
+                         (None, at('2024-01-15', '09:30')))
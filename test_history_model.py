@@ -0,0 +1,64 @@
+import json
+import math
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from history_model import DayRecord, nan_if_none, to_float
+from performance_engine import build_history_records, calculate_performance_frame
+
+
+def engine_records():
+    """Records as the daily run and the backfill store them, including a stock and a benchmark without a price."""
+    dates = pd.bdate_range('2025-06-12', periods=4)
+    prices = pd.DataFrame(np.arange(1.0, 21.0).reshape(4, 5) * 10, index=dates,
+                          columns=['NVDA', 'TSLA', 'PLTR', 'SPY', 'QQQ'])
+    prices.iloc[2, 1] = np.nan
+    prices.iloc[3, 4] = np.nan
+    performance = calculate_performance_frame(prices, prices.iloc[0].to_dict(), 100, ['NVDA', 'TSLA', 'PLTR'], ['SPY', 'QQQ'])
+    # Through JSON, as they are read back from history_data.json
+    return json.loads(json.dumps(build_history_records(performance, '2025-06-12')))
+
+
+class DayRecordTest(unittest.TestCase):
+
+    def test_round_trip(self):
+        for record in engine_records():
+            day_record = DayRecord.from_dict(record)
+            self.assertEqual(day_record.to_dict(), record)
+            self.assertEqual(json.loads(json.dumps(day_record.to_dict())), record)
+
+    def test_missing_values_round_trip_as_none(self):
+        record = engine_records()[3]
+        record['stocks_performance'][0]['percentage_return'] = None
+        day_record = DayRecord.from_dict(record)
+        self.assertEqual(day_record.to_dict(), record)
+        self.assertIsNone(day_record['benchmarks_returns']['QQQ'])
+        self.assertIsNone(day_record['outperformance']['QQQ']['outperformance'])
+
+    def test_record_without_benchmark_prices(self):
+        record = engine_records()[1]
+        del record['benchmarks_current_prices'], record['benchmarks_base_prices']
+        day_record = DayRecord.from_dict(record)
+        self.assertEqual(day_record.to_dict(), record)
+        self.assertNotIn('benchmarks_current_prices', day_record)
+        self.assertIsNone(day_record.get('benchmarks_base_prices'))
+        self.assertRaises(KeyError, lambda: day_record['benchmarks_current_prices'])
+
+    def test_invariants_are_shared_between_days(self):
+        first, second = (DayRecord.from_dict(record) for record in engine_records()[:2])
+        self.assertIs(first.invariants, second.invariants)
+
+
+class MissingValueTest(unittest.TestCase):
+
+    def test_to_float(self):
+        self.assertEqual(to_float(np.float64(1.5)), 1.5)
+        self.assertIs(type(to_float(np.int64(2))), float)
+        for value in (None, float('nan'), np.nan, pd.NA, 'abc'):
+            self.assertIsNone(to_float(value))
+
+    def test_nan_if_none(self):
+        self.assertTrue(math.isnan(nan_if_none(None)))
+        self.assertEqual(nan_if_none(2), 2.0)
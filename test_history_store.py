@@ -0,0 +1,336 @@
+import os
+import json
+import tempfile
+import unittest
+from unittest import mock
+
+import config
+from history_store import (DateIndex, JsonHistoryStore, ColumnarHistoryStore, _load_journal,
+                           compact_history_store, migrate_json_to_columnar)
+
+
+def make_record(day, scale=1.0):
+    """A record in the history_data.json layout: two stocks and one benchmark, priced at scale × base."""
+    stocks = [
+        {'symbol': symbol, 'base_price': base, 'current_price': base * scale, 'quantity': 100 / base,
+         'investment_amount': 100, 'current_value': 100 * scale, 'profit_loss': 100 * scale - 100,
+         'percentage_return': (scale - 1) * 100}
+        for symbol, base in (('NVDA', 120.0), ('TSLA', 250.0))
+    ]
+    total_return = (scale - 1) * 100
+    benchmark_return = (scale - 1) * 50
+    return {
+        'date': day,
+        'timestamp': f"{day}T16:00:00",
+        'portfolio_value': 200 * scale,
+        'total_profit': 200 * scale - 200,
+        'total_return': total_return,
+        'days_invested': 5,
+        'benchmarks_returns': {'SPY': benchmark_return},
+        'outperformance': {'SPY': {'benchmark_return': benchmark_return, 'portfolio_return': total_return,
+                                   'outperformance': total_return - benchmark_return}},
+        'stocks_performance': stocks,
+        'benchmarks_current_prices': {'SPY': 500.0 * (1 + (scale - 1) / 2)},
+        'benchmarks_base_prices': {'SPY': 500.0},
+    }
+
+
+class DateIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        self.index = DateIndex([('2024-01-03', 'c'), ('2024-01-01', 'a'), ('2024-01-05', 'e')])
+
+    def test_keys_are_sorted(self):
+        self.assertEqual(self.index.keys(), ['2024-01-01', '2024-01-03', '2024-01-05'])
+        self.assertEqual(self.index.values(), ['a', 'c', 'e'])
+        self.assertEqual(len(self.index), 3)
+
+    def test_upsert_appends_inserts_and_replaces(self):
+        self.assertFalse(self.index.upsert('2024-01-06', 'f'))
+        self.assertFalse(self.index.upsert('2024-01-02', 'b'))
+        self.assertTrue(self.index.upsert('2024-01-03', 'C'))
+        self.assertEqual(self.index.keys(), ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-05', '2024-01-06'])
+        self.assertEqual(self.index.get('2024-01-03'), 'C')
+        self.assertIn('2024-01-02', self.index)
+        self.assertIsNone(self.index.get('2024-01-04'))
+
+    def test_range_is_inclusive(self):
+        self.assertEqual(self.index.range('2024-01-01', '2024-01-03'), ['a', 'c'])
+        self.assertEqual(self.index.range('2024-01-02', '2024-01-04'), ['c'])
+        self.assertEqual(self.index.range(start='2024-01-03'), ['c', 'e'])
+        self.assertEqual(self.index.range(end='2024-01-02'), ['a'])
+        self.assertEqual(self.index.range('2024-01-06', '2024-01-09'), [])
+
+    def test_latest(self):
+        self.assertEqual(self.index.latest(), ['e'])
+        self.assertEqual(self.index.latest(2), ['c', 'e'])
+        self.assertEqual(self.index.latest(10), ['a', 'c', 'e'])
+        self.assertEqual(self.index.latest(0), [])
+
+    def test_latest_before_end(self):
+        # The previous close of a session day is the last record not after the day before it
+        self.assertEqual(self.index.latest(1, '2024-01-04'), ['c'])
+        self.assertEqual(self.index.latest(1, '2024-01-03'), ['c'])
+        self.assertEqual(self.index.latest(2, '2024-01-04'), ['a', 'c'])
+        self.assertEqual(self.index.latest(1, '2023-12-31'), [])
+
+
+class LoadJournalTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'history_data.json.journal')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _write(self, text):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def test_missing_journal(self):
+        self.assertEqual(_load_journal(self.path), ([], True))
+
+    def test_intact_journal(self):
+        entries = [{'date': '2024-01-01'}, {'date': '2024-01-02'}]
+        self._write(''.join(json.dumps(entry) + '\n' for entry in entries) + '\n')
+        self.assertEqual(_load_journal(self.path), (entries, True))
+
+    def test_torn_last_line_is_dropped(self):
+        self._write(json.dumps({'date': '2024-01-01'}) + '\n' + '{"date": "2024-01-0')
+        self.assertEqual(_load_journal(self.path), ([{'date': '2024-01-01'}], False))
+
+    def test_nothing_after_a_torn_line_is_replayed(self):
+        self._write('{"date": "2024-01-01"}\n{"da\n{"date": "2024-01-03"}\n')
+        self.assertEqual(_load_journal(self.path), ([{'date': '2024-01-01'}], False))
+
+
+class JsonHistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, 'history_data.json')
+        store = JsonHistoryStore(self.path)
+        store.upsert(make_record('2024-01-02'))
+        store.compact()
+
+    def test_close_appends_to_the_journal_only(self):
+        with open(self.path, 'rb') as f:
+            main_file = f.read()
+        store = JsonHistoryStore(self.path)
+        store.upsert(make_record('2024-01-03', 1.1))
+        store.upsert(make_record('2024-01-02', 1.05))
+        store.close()
+        with open(self.path, 'rb') as f:
+            self.assertEqual(f.read(), main_file)
+        self.assertEqual(len(_load_journal(store.journal_path)[0]), 2)
+
+        reopened = JsonHistoryStore(self.path)
+        self.assertEqual([record.to_dict() for record in reopened.records()],
+                         [make_record('2024-01-02', 1.05), make_record('2024-01-03', 1.1)])
+
+    def test_torn_journal_line_is_ignored_and_compacted_away(self):
+        store = JsonHistoryStore(self.path)
+        store.upsert(make_record('2024-01-03', 1.1))
+        store.close()
+        with open(store.journal_path, 'a', encoding='utf-8') as f:
+            f.write('{"date": "2024-01-0')
+        with mock.patch('builtins.print'):
+            reopened = JsonHistoryStore(self.path)
+        self.assertEqual(reopened.latest(1)[0].to_dict(), make_record('2024-01-03', 1.1))
+        reopened.upsert(make_record('2024-01-04', 1.2))
+        reopened.flush()
+        self.assertFalse(os.path.exists(reopened.journal_path))
+        self.assertEqual(len(JsonHistoryStore(self.path)), 3)
+
+    @mock.patch.object(config, 'HISTORY_JOURNAL_MAX_ENTRIES', 3)
+    def test_journal_is_compacted_when_full(self):
+        store = JsonHistoryStore(self.path)
+        for day, scale in (('2024-01-03', 1.1), ('2024-01-04', 1.2)):
+            store.upsert(make_record(day, scale))
+            store.flush()
+        self.assertTrue(os.path.exists(store.journal_path))
+        store.upsert(make_record('2024-01-05', 1.3))
+        store.flush()
+        self.assertFalse(os.path.exists(store.journal_path))
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual([record['date'] for record in json.load(f)],
+                             ['2024-01-02', '2024-01-03', '2024-01-04', '2024-01-05'])
+
+    def test_compact_command(self):
+        store = JsonHistoryStore(self.path)
+        store.upsert(make_record('2024-01-03', 1.1))
+        store.close()
+        with mock.patch('builtins.print'):
+            self.assertEqual(compact_history_store('json', self.path), 2)
+        self.assertFalse(os.path.exists(store.journal_path))
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)[-1], make_record('2024-01-03', 1.1))
+
+
+def flatten(value, path=''):
+    """(path, value) pairs of a record, for comparing records that were recomputed from stored columns."""
+    if isinstance(value, dict):
+        return [pair for key in value for pair in flatten(value[key], f"{path}/{key}")]
+    if isinstance(value, list):
+        return [pair for i, item in enumerate(value) for pair in flatten(item, f"{path}/{i}")]
+    return [(path, value)]
+
+
+class ColumnarHistoryStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        store = ColumnarHistoryStore(self.directory)
+        store.upsert(make_record('2024-01-02'))
+        store.upsert(make_record('2024-01-03', 1.1))
+
+    def assertRecords(self, records, expected):
+        actual = flatten([record.to_dict() for record in records])
+        expected = flatten(expected)
+        self.assertEqual([path for path, _ in actual], [path for path, _ in expected])
+        for (path, value), (_, expected_value) in zip(actual, expected):
+            if isinstance(expected_value, float):
+                self.assertAlmostEqual(value, expected_value, places=9, msg=path)
+            else:
+                self.assertEqual(value, expected_value, path)
+
+    def column_rows(self):
+        return os.path.getsize(os.path.join(self.directory, 'date.f8')) // 8
+
+    @mock.patch.object(config, 'HISTORY_MAX_DEAD_ROWS', 5)
+    def test_reupserted_day_does_not_grow_the_columns(self):
+        store = ColumnarHistoryStore(self.directory)
+        for i in range(50):
+            store.upsert(make_record('2024-01-03', 1 + i / 100))
+            self.assertEqual(len(store.records()), 2)
+            self.assertLess(self.column_rows(), 2 + 5)
+        self.assertRecords(ColumnarHistoryStore(self.directory).records(),
+                           [make_record('2024-01-02'), make_record('2024-01-03', 1.49)])
+
+    def test_compaction_keeps_live_rows_in_date_order(self):
+        store = ColumnarHistoryStore(self.directory)
+        store.upsert(make_record('2024-01-02', 1.05))
+        store.upsert(make_record('2024-01-01', 0.95))
+        self.assertEqual(self.column_rows(), 4)
+        store.compact()
+        self.assertEqual(self.column_rows(), 3)
+        store.upsert(make_record('2024-01-04', 1.2))
+        expected = [make_record('2024-01-01', 0.95), make_record('2024-01-02', 1.05),
+                    make_record('2024-01-03', 1.1), make_record('2024-01-04', 1.2)]
+        self.assertRecords(store.records(), expected)
+        self.assertRecords(ColumnarHistoryStore(self.directory).records(), expected)
+
+    def test_interrupted_compaction(self):
+        store = ColumnarHistoryStore(self.directory)
+        store.upsert(make_record('2024-01-03', 1.2))
+        expected = [make_record('2024-01-02'), make_record('2024-01-03', 1.2)]
+
+        # Crash before the new columns are marked ready: the old columns stay in place
+        with mock.patch('history_store.os.replace', side_effect=OSError("crash")):
+            self.assertRaises(OSError, store.compact)
+        reopened = ColumnarHistoryStore(self.directory)
+        self.assertEqual(self.column_rows(), 3)
+        self.assertRecords(reopened.records(), expected)
+
+        # Crash after the mark: the next open moves the new columns into place
+        with mock.patch.object(ColumnarHistoryStore, '_finish_compaction'):
+            reopened.compact()
+        self.assertEqual(self.column_rows(), 3)
+        reopened = ColumnarHistoryStore(self.directory)
+        self.assertEqual(self.column_rows(), 2)
+        self.assertRecords(reopened.records(), expected)
+        self.assertFalse({ColumnarHistoryStore.COMPACT_STAGING, ColumnarHistoryStore.COMPACT_READY}
+                         & set(os.listdir(self.directory)))
+
+
+def round_trip_records():
+    """Days written out of order, with a stock and a benchmark that have no price on one day each."""
+    records = [make_record(day, scale) for day, scale in
+               (('2024-01-04', 1.2), ('2024-01-02', 1.0), ('2024-01-05', 0.9), ('2024-01-03', 1.1))]
+    stock = records[2]['stocks_performance'][1]
+    stock.update(current_price=0, quantity=0, current_value=0, profit_loss=0, percentage_return=0)
+    records[3]['benchmarks_returns']['SPY'] = None
+    records[3]['outperformance']['SPY'].update(benchmark_return=None, outperformance=None)
+    records[3]['benchmarks_current_prices']['SPY'] = None
+    return records
+
+
+class StoreRoundTripTests:
+    """The same round trip for both backends; subclasses provide open_store()."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        self.records = round_trip_records()
+        self.expected = sorted(self.records, key=lambda record: record['date'])
+
+    def assertStoreHolds(self, store, expected):
+        self.assertRecords(store.records(), expected)
+        self.assertEqual(len(store), len(expected))
+        for record in expected:
+            self.assertIn(record['date'], store)
+            self.assertRecords([store.get(record['date'])], [record])
+        self.assertIsNone(store.get('2024-01-06'))
+        self.assertRecords(store.range('2024-01-03', '2024-01-04'), expected[1:3])
+        self.assertRecords(store.latest(2, '2024-01-04'), expected[1:3])
+
+    def assertRecords(self, records, expected):
+        actual = flatten([record.to_dict() for record in records])
+        expected = flatten(expected)
+        self.assertEqual([path for path, _ in actual], [path for path, _ in expected])
+        for (path, value), (_, expected_value) in zip(actual, expected):
+            if isinstance(expected_value, float):
+                self.assertAlmostEqual(value, expected_value, places=9, msg=path)
+            else:
+                self.assertEqual(value, expected_value, path)
+
+    def write(self, records):
+        store = self.open_store()
+        for record in records:
+            store.upsert(record)
+        store.close()
+        return store
+
+    def test_round_trip(self):
+        self.assertStoreHolds(self.write(self.records), self.expected)
+        self.assertStoreHolds(self.open_store(), self.expected)
+
+    def test_round_trip_after_compaction(self):
+        store = self.write(self.records)
+        store.upsert(make_record('2024-01-03', 1.15))
+        store.compact()
+        expected = list(self.expected)
+        expected[1] = make_record('2024-01-03', 1.15)
+        self.assertStoreHolds(store, expected)
+        self.assertStoreHolds(self.open_store(), expected)
+
+
+class JsonRoundTripTest(StoreRoundTripTests, unittest.TestCase):
+
+    def open_store(self):
+        return JsonHistoryStore(os.path.join(self.directory, 'history_data.json'))
+
+    def test_journal_replay(self):
+        store = self.write(self.records[:2])
+        store.compact()
+        self.write(self.records[2:])
+        self.assertEqual(len(_load_journal(store.journal_path)[0]), 2)
+        self.assertStoreHolds(self.open_store(), self.expected)
+
+    def test_migration_to_columnar(self):
+        self.write(self.records)
+        target = os.path.join(self.directory, 'columnar')
+        with mock.patch('builtins.print'):
+            self.assertEqual(migrate_json_to_columnar(os.path.join(self.directory, 'history_data.json'), target), 4)
+        self.assertStoreHolds(ColumnarHistoryStore(target), self.expected)
+
+
+class ColumnarRoundTripTest(StoreRoundTripTests, unittest.TestCase):
+
+    def open_store(self):
+        return ColumnarHistoryStore(self.directory)
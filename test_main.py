@@ -0,0 +1,117 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+import config
+import main
+from history_store import JsonHistoryStore
+from portfolio_registry import default_portfolio
+from price_cache import PriceCache
+from price_providers import StubProvider, set_price_provider
+
+
+class OfflineProvider:
+    name = 'offline'
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        raise ConnectionError("network is unreachable")
+
+
+class RunDailyFallbackTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.directory = tmp.name
+        patcher = mock.patch.object(config, 'PRICE_FETCH_BACKOFF_SECONDS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(main, 'generate_reports')
+        self.generate_reports = patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(set_price_provider, None)
+        self.portfolio = default_portfolio()
+        self.store = JsonHistoryStore(os.path.join(self.directory, 'history_data.json'))
+        self.stub = StubProvider.synthetic(self.portfolio.symbols, self.portfolio.base_date)
+        self.run_daily(self.stub, '2026-10-16')
+
+    def run_daily(self, provider, day):
+        set_price_provider(provider)
+        # A cache of its own for every run, as if the previous run's prices had expired
+        cache = PriceCache(os.path.join(self.directory, f"price_cache.{day}.sqlite"))
+        try:
+            with redirect_stdout(io.StringIO()):
+                main.run_daily(main.parse_args(['--no-browser']), [self.portfolio], history_stores=[self.store],
+                               cache=cache, today_date=datetime.strptime(day, '%Y-%m-%d'))
+        finally:
+            cache.close()
+
+    def test_offline_run_does_not_store_old_prices_as_today(self):
+        records = len(self.store)
+        self.run_daily(OfflineProvider(), '2026-10-20')
+        self.assertNotIn('2026-10-20', self.store)
+        self.assertEqual(len(self.store), records)
+        self.assertEqual(self.generate_reports.call_count, 1)
+
+    def test_one_failed_symbol_uses_its_stored_price(self):
+        previous = {stock['symbol']: stock['current_price'] for stock in self.store.get('2026-10-16')['stocks_performance']}
+        self.run_daily(StubProvider(self.stub.closes.drop(columns=['NVDA'])), '2026-10-20')
+        record = self.store.get('2026-10-20')
+        self.assertIsNotNone(record)
+        prices = {stock['symbol']: stock['current_price'] for stock in record['stocks_performance']}
+        self.assertEqual(prices['NVDA'], previous['NVDA'])
+        self.assertEqual(len(prices), len(self.portfolio.stocks))
+
+
+class BackfillHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.portfolio = default_portfolio()
+        self.store = JsonHistoryStore(os.path.join(tmp.name, 'history_data.json'))
+        self.closes = StubProvider.synthetic(self.portfolio.symbols, self.portfolio.base_date, '2026-10-17').closes
+
+    def backfill(self, closes, now):
+        with mock.patch.object(main, 'market_now', return_value=now), redirect_stdout(io.StringIO()):
+            return main.backfill_history(self.store, self.portfolio, closes)
+
+    def test_stock_without_base_price_is_left_out(self):
+        closes = self.closes.copy()
+        closes.loc[closes.index[0], 'NVDA'] = float('nan')
+        self.backfill(closes, datetime(2026, 10, 19, 12, 0))
+        record = self.store.get('2026-10-16')
+        symbols = [stock['symbol'] for stock in record['stocks_performance']]
+        self.assertNotIn('NVDA', symbols)
+        self.assertEqual(len(symbols), len(self.portfolio.stocks) - 1)
+        self.assertAlmostEqual(record['portfolio_value'], sum(stock['current_value'] for stock in record['stocks_performance']))
+
+    def test_open_session_is_not_stored(self):
+        added = self.backfill(self.closes, datetime(2026, 10, 16, 12, 0))
+        self.assertEqual(added, len(self.closes) - 1)
+        self.assertNotIn('2026-10-16', self.store)
+        self.assertIn('2026-10-15', self.store)
+        self.assertEqual(self.backfill(self.closes, datetime(2026, 10, 16, 16, 30)), 1)
+        self.assertIn('2026-10-16', self.store)
+
+
+class RepriceIntradayTest(unittest.TestCase):
+
+    def test_record_and_series_carry_the_interval(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        portfolio = default_portfolio()
+        store = JsonHistoryStore(os.path.join(tmp.name, 'history_data.json'))
+        closes = StubProvider.synthetic(portfolio.symbols, '2026-10-12', '2026-10-17').closes
+        base_prices = closes.iloc[0].to_dict()
+        bars = closes.iloc[-2:].set_axis(pd.DatetimeIndex(['2026-10-16 09:30', '2026-10-16 09:35']))
+        record, series = main.reprice_intraday(portfolio, store, base_prices, bars, '2026-10-16', '5m')
+        self.assertEqual(record['intraday'], {'interval': '5m', 'last_bar': '09:35'})
+        self.assertEqual(series['interval'], '5m')
+        self.assertEqual(series['times'], ['09:30', '09:35'])
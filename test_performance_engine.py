@@ -0,0 +1,156 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+
+import numpy as np
+import pandas as pd
+
+import main
+from performance_engine import build_history_records, calculate_performance_frame, performance_snapshot
+
+STOCKS = ['NVDA', 'TSLA', 'PLTR', 'VRT']
+BENCHMARKS = ['SPY', 'QQQ']
+
+
+def baseline_calculate_performance(base_prices, current_prices, investment_per_stock, ai_stocks, benchmarks_symbols):
+    """The original dict-based calculate_performance from main.py, before the vectorized engine (warning print removed)."""
+    total_investment = len(ai_stocks) * investment_per_stock
+    current_portfolio_value = 0
+    stocks_performance = []
+
+    for symbol in ai_stocks:
+        base_price = base_prices.get(symbol)
+        current_price = current_prices.get(symbol)
+
+        if base_price is not None and current_price is not None and base_price != 0:
+            quantity = investment_per_stock / base_price
+            current_value = quantity * current_price
+            profit_loss = current_value - investment_per_stock
+            percentage_return = (profit_loss / investment_per_stock) * 100
+
+            current_portfolio_value += current_value
+            stocks_performance.append({
+                'symbol': symbol,
+                'base_price': base_price,
+                'current_price': current_price,
+                'quantity': quantity,
+                'investment_amount': investment_per_stock,
+                'current_value': current_value,
+                'profit_loss': profit_loss,
+                'percentage_return': percentage_return
+            })
+        else:
+            stocks_performance.append({
+                'symbol': symbol,
+                'base_price': base_price or 0,
+                'current_price': current_price or 0,
+                'quantity': 0,
+                'investment_amount': investment_per_stock,
+                'current_value': 0,
+                'profit_loss': 0,
+                'percentage_return': 0
+            })
+
+    total_profit = current_portfolio_value - total_investment
+    total_return = (total_profit / total_investment) * 100 if total_investment != 0 else 0
+
+    benchmarks_returns = {}
+    outperformance = {}
+
+    for symbol in benchmarks_symbols:
+        base_price = base_prices.get(symbol)
+        current_price = current_prices.get(symbol)
+        if base_price is not None and current_price is not None and base_price != 0:
+            benchmark_return = ((current_price - base_price) / base_price) * 100
+            benchmarks_returns[symbol] = benchmark_return
+            outperformance[symbol] = {
+                'benchmark_return': benchmark_return,
+                'portfolio_return': total_return,
+                'outperformance': total_return - benchmark_return
+            }
+        else:
+            benchmarks_returns[symbol] = None
+            outperformance[symbol] = {
+                'benchmark_return': None,
+                'portfolio_return': total_return,
+                'outperformance': None
+            }
+
+    return {
+        'portfolio_value': current_portfolio_value,
+        'total_profit': total_profit,
+        'total_return': total_return,
+        'stocks_performance': stocks_performance,
+        'benchmarks_returns': benchmarks_returns,
+        'outperformance': outperformance
+    }
+
+
+def flatten(value, path=''):
+    """(path, value) pairs of a nested dict/list, so that two results can be compared number by number."""
+    if isinstance(value, dict):
+        return [pair for key in value for pair in flatten(value[key], f"{path}/{key}")]
+    if isinstance(value, list):
+        return [pair for i, item in enumerate(value) for pair in flatten(item, f"{path}/{i}")]
+    return [(path, value)]
+
+
+def without_nan(prices):
+    """A price row as the baseline received it: missing prices are absent, not NaN."""
+    return {symbol: price for symbol, price in prices.items() if price == price}
+
+
+class PerformanceEngineTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(7)
+        dates = pd.bdate_range('2025-06-12', periods=30)
+        symbols = STOCKS + BENCHMARKS
+        self.prices = pd.DataFrame(rng.uniform(20, 800, size=(len(dates), len(symbols))), index=dates, columns=symbols)
+        # A stock and a benchmark without a price on some days
+        self.prices.iloc[5, 1] = np.nan
+        self.prices.iloc[8, 5] = np.nan
+        self.base_prices = self.prices.iloc[0].to_dict()
+
+    def assertSameResult(self, actual, expected):
+        actual, expected = flatten(actual), flatten(expected)
+        self.assertEqual([path for path, _ in actual], [path for path, _ in expected])
+        for (path, value), (_, expected_value) in zip(actual, expected):
+            if expected_value is None or isinstance(expected_value, str):
+                self.assertEqual(value, expected_value, path)
+            else:
+                self.assertAlmostEqual(value, expected_value, places=9, msg=path)
+
+    def assertMatchesBaseline(self, prices, base_prices):
+        performance = calculate_performance_frame(prices, base_prices, 100, STOCKS, BENCHMARKS)
+        for row in range(len(prices)):
+            expected = baseline_calculate_performance(
+                without_nan(base_prices), without_nan(prices.iloc[row].to_dict()), 100, STOCKS, BENCHMARKS
+            )
+            self.assertSameResult(performance_snapshot(performance, row), expected)
+
+    def test_every_row_matches_the_baseline(self):
+        self.assertMatchesBaseline(self.prices, self.base_prices)
+
+    def test_missing_and_zero_base_prices(self):
+        base_prices = dict(self.base_prices, TSLA=0.0, PLTR=np.nan, QQQ=np.nan)
+        self.assertMatchesBaseline(self.prices, base_prices)
+
+    def test_single_snapshot_matches_the_baseline(self):
+        current_prices = without_nan(self.prices.iloc[5].to_dict())
+        with redirect_stdout(io.StringIO()):
+            actual = main.calculate_performance(self.base_prices, current_prices, 100, STOCKS, BENCHMARKS)
+        self.assertSameResult(actual, baseline_calculate_performance(self.base_prices, current_prices, 100, STOCKS, BENCHMARKS))
+
+    def test_history_records_match_the_baseline(self):
+        performance = calculate_performance_frame(self.prices, self.base_prices, 100, STOCKS, BENCHMARKS)
+        records = build_history_records(performance, '2025-06-12')
+        self.assertEqual([record['date'] for record in records], [day.strftime('%Y-%m-%d') for day in self.prices.index])
+        for row, record in enumerate(records):
+            current_prices = without_nan(self.prices.iloc[row].to_dict())
+            expected = baseline_calculate_performance(self.base_prices, current_prices, 100, STOCKS, BENCHMARKS)
+            self.assertSameResult({key: record[key] for key in expected}, expected)
+            self.assertEqual(record['days_invested'], (self.prices.index[row] - self.prices.index[0]).days)
+            self.assertEqual(record['benchmarks_current_prices'],
+                             {symbol: current_prices.get(symbol) for symbol in BENCHMARKS})
+            self.assertEqual(record['benchmarks_base_prices'], {symbol: self.base_prices[symbol] for symbol in BENCHMARKS})
@@ -0,0 +1,92 @@
+import os
+import time
+import tempfile
+import unittest
+from datetime import datetime
+from unittest import mock
+
+import config
+from price_cache import PriceCache, bar_is_final, cache_path
+from price_providers import StubProvider, set_price_provider
+
+
+class CachePathTest(unittest.TestCase):
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        patcher = mock.patch.object(config, 'PRICE_CACHE_FILE', os.path.join(tmp.name, 'price_cache.sqlite'))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(set_price_provider, None)
+
+    def test_each_provider_has_its_own_file(self):
+        self.assertEqual(cache_path('yfinance'), config.PRICE_CACHE_FILE)
+        self.assertEqual(os.path.basename(cache_path('stub')), 'price_cache.stub.sqlite')
+        self.assertEqual(os.path.basename(cache_path('fixture')), 'price_cache.fixture.sqlite')
+
+    def test_default_follows_the_current_provider(self):
+        with mock.patch.object(config, 'PRICE_PROVIDER', 'yfinance'):
+            self.assertEqual(cache_path(), config.PRICE_CACHE_FILE)
+            set_price_provider(StubProvider.synthetic(['NVDA'], config.BASE_DATE))
+            self.assertEqual(cache_path(), cache_path('stub'))
+
+    def test_stub_prices_are_not_served_to_yfinance(self):
+        stub = PriceCache(provider='stub')
+        self.addCleanup(stub.close)
+        stub.put_bars({'NVDA': {'close': 1.0}}, '2024-01-02')
+        yfinance = PriceCache(provider='yfinance')
+        self.addCleanup(yfinance.close)
+        self.assertEqual(stub.get_closes(['NVDA'], '2024-01-02'), {'NVDA': 1.0})
+        self.assertEqual(yfinance.get_closes(['NVDA'], '2024-01-02'), {})
+
+
+class PriceCacheTest(unittest.TestCase):
+    """A bar of a finished session is kept for good; today's bar before the close only for PRICE_CACHE_TTL_SECONDS."""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache = PriceCache(os.path.join(tmp.name, 'price_cache.sqlite'))
+        self.addCleanup(self.cache.close)
+        self.now = time.time()
+
+    def put(self, day, close, market_time, latest=False):
+        with mock.patch('intraday_store.market_now', return_value=market_time), \
+                mock.patch('price_cache.time.time', return_value=self.now):
+            self.cache.put_bars({'NVDA': {'close': close}}, day, latest=latest)
+
+    def closes(self, day, seconds_later):
+        with mock.patch('price_cache.time.time', return_value=self.now + seconds_later):
+            return self.cache.get_closes(['NVDA', 'TSLA'], day)
+
+    def latest_closes(self, seconds_later):
+        with mock.patch('price_cache.time.time', return_value=self.now + seconds_later):
+            return self.cache.get_latest_closes(['NVDA'])
+
+    def test_final_bar_never_expires(self):
+        self.put('2024-01-02', 100.0, datetime(2024, 1, 3, 10, 0))
+        self.assertEqual(self.closes('2024-01-02', 365 * 24 * 3600), {'NVDA': 100.0})
+
+    def test_bar_before_the_close_expires(self):
+        self.put('2024-01-02', 100.0, datetime(2024, 1, 2, 12, 0))
+        self.assertEqual(self.closes('2024-01-02', config.PRICE_CACHE_TTL_SECONDS - 1), {'NVDA': 100.0})
+        self.assertEqual(self.closes('2024-01-02', config.PRICE_CACHE_TTL_SECONDS + 1), {})
+
+    def test_bar_after_the_close_replaces_the_temporary_one(self):
+        self.put('2024-01-02', 100.0, datetime(2024, 1, 2, 12, 0))
+        self.put('2024-01-02', 101.0, datetime(2024, 1, 2, 16, 5))
+        self.assertEqual(self.closes('2024-01-02', 365 * 24 * 3600), {'NVDA': 101.0})
+
+    def test_latest_close_always_expires(self):
+        self.put('2024-01-02', 100.0, datetime(2024, 1, 3, 10, 0), latest=True)
+        self.assertEqual(self.latest_closes(config.PRICE_CACHE_TTL_SECONDS - 1), {'NVDA': 100.0})
+        self.assertEqual(self.latest_closes(config.PRICE_CACHE_TTL_SECONDS + 1), {})
+        # ...while the bar itself stays cached for its date
+        self.assertEqual(self.closes('2024-01-02', config.PRICE_CACHE_TTL_SECONDS + 1), {'NVDA': 100.0})
+
+    def test_bar_is_final(self):
+        self.assertTrue(bar_is_final('2024-01-02', datetime(2024, 1, 3, 9, 0)))
+        self.assertFalse(bar_is_final('2024-01-02', datetime(2024, 1, 2, 15, 59)))
+        self.assertTrue(bar_is_final('2024-01-02', datetime(2024, 1, 2, 16, 0)))
+        self.assertFalse(bar_is_final('2024-01-03', datetime(2024, 1, 2, 16, 0)))
@@ -0,0 +1,140 @@
+import sys
+import types
+import logging
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+import config
+import price_providers
+from price_providers import (
+    RetryableFetchError, StubProvider, YFinanceProvider, fetch_ranges, get_price_provider, plan_fetch_ranges
+)
+
+
+class PlanFetchRangesTest(unittest.TestCase):
+
+    def test_single_date_has_exclusive_end(self):
+        self.assertEqual(plan_fetch_ranges([('2024-01-05', '2024-01-05')]), [('2024-01-05', '2024-01-06')])
+
+    def test_overlapping_and_adjacent_intervals_are_merged(self):
+        intervals = [('2024-01-01', '2024-01-10'), ('2024-01-05', '2024-01-12'), ('2024-01-13', '2024-01-13')]
+        self.assertEqual(plan_fetch_ranges(intervals, max_gap_days=0), [('2024-01-01', '2024-01-14')])
+
+    def test_gap_threshold(self):
+        intervals = [('2024-01-01', '2024-01-01'), ('2024-01-05', '2024-01-05')]
+        # Three missing days in between
+        self.assertEqual(plan_fetch_ranges(intervals, max_gap_days=3), [('2024-01-01', '2024-01-06')])
+        self.assertEqual(plan_fetch_ranges(intervals, max_gap_days=2),
+                         [('2024-01-01', '2024-01-02'), ('2024-01-05', '2024-01-06')])
+
+    def test_unsorted_input(self):
+        intervals = [('2024-03-01', '2024-03-02'), ('2024-01-01', '2024-01-02')]
+        self.assertEqual(plan_fetch_ranges(intervals, max_gap_days=0),
+                         [('2024-01-01', '2024-01-03'), ('2024-03-01', '2024-03-03')])
+
+    def test_contained_interval_keeps_outer_end(self):
+        intervals = [('2024-01-01', '2024-01-31'), ('2024-01-10', '2024-01-11')]
+        self.assertEqual(plan_fetch_ranges(intervals, max_gap_days=0), [('2024-01-01', '2024-02-01')])
+
+    def test_no_intervals(self):
+        self.assertEqual(plan_fetch_ranges([]), [])
+
+
+class FlakyProvider:
+    """Fails on the first call only: for `failing` symbols (RetryableFetchError) or, without them, for the whole call."""
+
+    name = 'flaky'
+
+    def __init__(self, stub, failing=None):
+        self.stub = stub
+        self.failing = failing
+        self.calls = []
+
+    def get_bars(self, symbols, start_date_str, end_date_str):
+        self.calls.append(list(symbols))
+        frames = self.stub.get_bars(symbols, start_date_str, end_date_str)
+        if len(self.calls) == 1:
+            if not self.failing:
+                raise ConnectionError("connection reset")
+            raise RetryableFetchError(self.failing, {'close': frames['close'].drop(columns=self.failing)})
+        return frames
+
+
+class FetchRetryTest(unittest.TestCase):
+
+    symbols = ['AAPL', 'NVDA', 'TSLA']
+    ranges = [('2024-01-01', '2024-02-01')]
+
+    def setUp(self):
+        self.stub = StubProvider.synthetic(self.symbols, '2024-01-01', '2024-02-01')
+
+    def fetch(self, provider):
+        with mock.patch('builtins.print'):
+            return fetch_ranges(provider, self.symbols, self.ranges, retries=2, backoff_seconds=0)
+
+    def test_failed_symbol_is_retried_alone(self):
+        provider = FlakyProvider(self.stub, failing=['NVDA'])
+        frames, status = self.fetch(provider)
+        self.assertEqual(status, {'AAPL': 'ok', 'NVDA': 'ok', 'TSLA': 'ok'})
+        self.assertEqual(provider.calls, [self.symbols, ['NVDA']])
+        pd.testing.assert_frame_equal(frames['close'], self.stub.closes[self.symbols], check_freq=False)
+
+    def test_failed_request_is_retried(self):
+        provider = FlakyProvider(self.stub)
+        frames, status = self.fetch(provider)
+        self.assertEqual(set(status.values()), {'ok'})
+        self.assertEqual(len(provider.calls), 2)
+
+    def test_symbol_without_data_is_not_retried(self):
+        provider = FlakyProvider(StubProvider(self.stub.closes.drop(columns=['TSLA'])), failing=['NVDA'])
+        frames, status = self.fetch(provider)
+        self.assertEqual(status['TSLA'], 'missing')
+        self.assertEqual(provider.calls, [self.symbols, ['NVDA']])
+
+    def test_retries_are_bounded(self):
+        class AlwaysFailing:
+            name = 'down'
+            calls = 0
+
+            def get_bars(self, symbols, start_date_str, end_date_str):
+                AlwaysFailing.calls += 1
+                raise ConnectionError("network is unreachable")
+
+        frames, status = self.fetch(AlwaysFailing())
+        self.assertEqual(set(status.values()), {'error'})
+        self.assertEqual(AlwaysFailing.calls, 3)
+
+
+class YFinanceFailuresTest(unittest.TestCase):
+
+    @staticmethod
+    def download(tickers, **kwargs):
+        # yf.download logs failed tickers instead of raising, and returns NaN columns for them
+        logger = logging.getLogger('yfinance')
+        logger.error('\n2 Failed downloads:')
+        logger.error("['NVDA']: ConnectionError('Connection aborted.')")
+        logger.error("['XYZ']: possibly delisted; no price data found  (1d 2024-01-02 -> 2024-01-04)")
+        index = pd.DatetimeIndex(['2024-01-02', '2024-01-03'])
+        data = pd.DataFrame(np.nan, index=index, columns=pd.MultiIndex.from_product([['Close'], tickers]))
+        data[('Close', 'AAPL')] = [1.0, 2.0]
+        return data
+
+    def test_download_errors_are_retryable_but_missing_data_is_not(self):
+        with mock.patch.dict(sys.modules, {'yfinance': types.SimpleNamespace(download=self.download)}):
+            with self.assertRaises(RetryableFetchError) as raised:
+                YFinanceProvider().get_bars(['AAPL', 'NVDA', 'XYZ'], '2024-01-02', '2024-01-04')
+        self.assertEqual(raised.exception.symbols, ['NVDA'])
+        self.assertEqual(raised.exception.result['close']['AAPL'].tolist(), [1.0, 2.0])
+
+
+class StubProviderTest(unittest.TestCase):
+
+    def test_stub_prices_do_not_depend_on_symbol_order(self):
+        closes = []
+        for symbols in (['NVDA', 'SPY', 'TSLA'], ['TSLA', 'NVDA', 'SPY']):
+            with mock.patch.object(config, 'ALL_SYMBOLS', symbols), mock.patch.dict(price_providers._providers, clear=True):
+                closes.append(get_price_provider('stub').closes)
+        pd.testing.assert_frame_equal(closes[0], closes[1])
@@ -0,0 +1,23 @@
+import unittest
+from unittest import mock
+
+import config
+from report_generator import ReportGenerator
+
+
+class StyleBundleHashTest(unittest.TestCase):
+
+    @mock.patch.object(config, 'PLOTLY_JS_MODE', 'cdn')
+    def test_cdn_mode_does_not_look_up_the_plotly_version(self):
+        with mock.patch('report_generator.plotly_js_version', side_effect=AssertionError("plotly imported")):
+            ReportGenerator().style_bundle_hash()
+
+    def test_plotly_mode_and_local_version_change_the_hash(self):
+        with mock.patch.object(config, 'PLOTLY_JS_MODE', 'cdn'):
+            cdn = ReportGenerator().style_bundle_hash()
+        with mock.patch.object(config, 'PLOTLY_JS_MODE', 'local'):
+            with mock.patch('report_generator.plotly_js_version', return_value='1.0.0'):
+                local = ReportGenerator().style_bundle_hash()
+            with mock.patch('report_generator.plotly_js_version', return_value='2.0.0'):
+                upgraded = ReportGenerator().style_bundle_hash()
+        self.assertEqual(len({cdn, local, upgraded}), 3)
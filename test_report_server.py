@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+
+from report_generator import MANIFEST_FILE
+from report_server import PageCache, encoded_etag, _accepted_encodings
+
+
+class ResolveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        root = os.path.join(self.tmp.name, 'reports')
+        for relative in ('index.html', 'top_ai_10/index.html', 'top_ai_10/graphs.html', MANIFEST_FILE):
+            os.makedirs(os.path.dirname(os.path.join(root, relative)), exist_ok=True)
+            with open(os.path.join(root, relative), 'w', encoding='utf-8') as f:
+                f.write('x')
+        with open(os.path.join(self.tmp.name, 'secret.txt'), 'w', encoding='utf-8') as f:
+            f.write('x')
+        self.cache = PageCache(root)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_root_serves_index(self):
+        self.assertEqual(self.cache.resolve('/'), ('index.html', None))
+
+    def test_directory_with_slash_serves_index(self):
+        self.assertEqual(self.cache.resolve('/top_ai_10/'), ('top_ai_10/index.html', None))
+
+    def test_directory_without_slash_redirects(self):
+        self.assertEqual(self.cache.resolve('/top_ai_10'), (None, '/top_ai_10/'))
+
+    def test_file(self):
+        self.assertEqual(self.cache.resolve('/top_ai_10/graphs.html'), ('top_ai_10/graphs.html', None))
+        self.assertEqual(self.cache.resolve('/top%5Fai%5F10/graphs.html'), ('top_ai_10/graphs.html', None))
+
+    def test_missing_file(self):
+        self.assertEqual(self.cache.resolve('/nope.html'), (None, None))
+
+    def test_manifest_is_not_served(self):
+        self.assertEqual(self.cache.resolve('/' + MANIFEST_FILE), (None, None))
+
+    def test_path_outside_root(self):
+        self.assertEqual(self.cache.resolve('/../secret.txt'), (None, None))
+        self.assertEqual(self.cache.resolve('/%2E%2E/secret.txt'), (None, None))
+
+
+class EncodingTest(unittest.TestCase):
+
+    def test_encoded_etag(self):
+        self.assertEqual(encoded_etag('"abc"', 'identity'), '"abc"')
+        self.assertEqual(encoded_etag('"abc"', 'gzip'), '"abc-gzip"')
+        self.assertNotEqual(encoded_etag('"abc"', 'gzip'), encoded_etag('"abc"', 'br'))
+
+    def test_accepted_encodings(self):
+        self.assertEqual(_accepted_encodings('gzip, deflate, br'), {'gzip', 'deflate', 'br'})
+        self.assertEqual(_accepted_encodings('GZIP;q=0.5, br;q=0'), {'gzip'})
+        self.assertEqual(_accepted_encodings(None), set())